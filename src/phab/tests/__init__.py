@@ -1,6 +1,21 @@
 import pytest
 
+from typing import Iterator
+
+from utils.databases import cache
+
 
 @pytest.fixture
 def somethingThatDoesntExist() -> str:
     return "something-that-does-not-exist-ololo"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def temporaryCacheDirectory(
+    tmp_path_factory: pytest.TempPathFactory
+) -> Iterator[None]:
+    # tests should neither use nor fill the cache in the home directory
+    originalCacheDirectory = cache.cacheDirectory
+    cache.cacheDirectory = tmp_path_factory.mktemp("cache")
+    yield
+    cache.cacheDirectory = originalCacheDirectory
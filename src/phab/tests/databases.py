@@ -1,15 +1,37 @@
 import pytest
 
-from utils.databases import tap, lightcurves, simbad
-from . import somethingThatDoesntExist  # noqa: F401
+from utils.databases import (
+    tap,
+    lightcurves,
+    simbad,
+    cache,
+    throttling,
+    downloads,
+    holdings
+)
+from . import (  # noqa: F401
+    somethingThatDoesntExist,
+    temporaryCacheDirectory
+)
 
 from pyvo.dal.exceptions import DALQueryError
+from astropy import table as astropyTable
 from contextlib import nullcontext
 from packaging.version import Version
+import os
+import tempfile
+import pathlib
+import time
+import concurrent.futures
+import http.server
+import threading
+import hashlib
 import pandas
+import numpy
 import lightkurve
+from pandera import pandas as pandera
 
-from typing import Tuple, Literal
+from typing import Any, Callable, Tuple, Dict, List, Iterator, Literal
 
 
 @pytest.fixture
@@ -67,6 +89,14 @@ def test_escape_special_characters_for_adql() -> None:
     )
 
 
+def test_values_to_adql_list() -> None:
+    assert tap.valuesToAdqlList(
+        ["A2 146", "NAME Teegarden's Star"]
+    ) == "'A2 146', 'NAME Teegarden''s Star'"
+    assert tap.valuesToAdqlList([3308165, 2325762]) == "3308165, 2325762"
+    assert tap.valuesToAdqlList([]) == ""
+
+
 def test_get_parameters_that_are_double_in_nasa() -> None:
     doubles = tap.getParametersThatAreDoubleInNASA()
     assert len(doubles) > 1
@@ -127,6 +157,17 @@ def test_getting_parameter_from_padc() -> None:
     assert granuleUID == planetName
 
 
+def test_search_light_curves() -> None:
+    searchResult1 = lightcurves.searchLightCurves("LTT 1445 A", refresh=True)
+    assert len(searchResult1) > 0
+    # this one should come from the cache
+    searchResult2 = lightcurves.searchLightCurves("ltt  1445 a")
+    assert isinstance(searchResult2, lightkurve.SearchResult)
+    assert len(searchResult2) == len(searchResult1)
+    assert list(searchResult2.table["mission"]) \
+        == list(searchResult1.table["mission"])
+
+
 def test_get_light_curve_stats() -> None:
     stats = lightcurves.getLightCurveStats("LTT 1445 A", detailed=False)
     assert stats
@@ -140,6 +181,104 @@ def test_get_light_curve_stats_fail(
     assert not stats
 
 
+def test_throttling(monkeypatch: pytest.MonkeyPatch) -> None:
+    # a stopped clock, so all the requests come at once, and nothing
+    # is actually slept
+    now = 1000.0
+    delays: List[float] = []
+    monkeypatch.setattr(throttling.time, "monotonic", lambda: now)
+    monkeypatch.setattr(throttling.time, "sleep", delays.append)
+    monkeypatch.setitem(throttling.requestsPerSecond, "tests", 50)
+    monkeypatch.setattr(throttling, "_nextRequestTime", {})
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        for _ in executor.map(lambda _: throttling.wait("tests"), range(11)):
+            pass
+    # the first request goes right away, and then 10 more
+    # with 1/50 s interval between them
+    assert sorted(delays) == pytest.approx([i / 50 for i in range(1, 11)])
+
+    # once the scheduled requests are done, the next one does not wait
+    delays.clear()
+    now += 1
+    throttling.wait("tests")
+    assert delays == []
+
+    # services without a limit do not wait
+    for _ in range(100):
+        throttling.wait("some-service-without-limit")
+    assert delays == []
+
+
+def test_get_light_curve_stats_for_stars(
+    somethingThatDoesntExist: str  # noqa: F811
+) -> None:
+    stats = lightcurves.getLightCurveStatsForStars(
+        ["LTT 1445 A", somethingThatDoesntExist, "Kepler-114"],
+        maxWorkers=2
+    )
+    assert isinstance(stats, pandas.DataFrame)
+    assert list(stats.columns) == [
+        "star",
+        "mission",
+        "cadence",
+        "sector",
+        "exptime",
+        "count"
+    ]
+    assert set(stats["star"]) == {"LTT 1445 A", "Kepler-114"}
+
+
+def test_find_light_curve_products_in_mast(
+    somethingThatDoesntExist: str  # noqa: F811
+) -> None:
+    # TIC ID of the star from the FITS file in the data folder
+    products = lightcurves.findLightCurveProductsInMAST(
+        ["266744225", somethingThatDoesntExist]
+    )
+    assert isinstance(products, pandas.DataFrame)
+    assert len(products) > 0
+    assert set(products["target"]) == {"266744225"}
+    assert "TESS Sector 07" in set(products["mission"])
+
+    stats = lightcurves.getLightCurveStatsFromMAST(["266744225"])
+    assert "07" in stats["266744225"]["TESS"]["short"]["by-sectors"]
+
+
+def test_find_light_curve_products_in_mast_query(
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    queries: List[str] = []
+
+    def queryServiceInChunks(
+        tapEndpoint: str,
+        adqlQueryTemplate: str,
+        values: List[str],
+        chunkSize: int = 500
+    ) -> pandas.DataFrame:
+        queries.append(adqlQueryTemplate)
+        return pandas.DataFrame({
+            "target": ["266744225"] * 3,
+            "author": ["SPOC", "TESS-SPOC", "Kepler"],
+            "exptime": [120.0, 1800.0, 1800.0],
+            "obs_id": [
+                "tess2019006130736-s0007-0000000266744225-0131-s",
+                "hlsp_tess-spoc_tess_phot_0000000266744225-s0034_tess_v1_lc",
+                "kplr011446443_lc_Q111111111111111111"
+            ]
+        })
+
+    monkeypatch.setattr(tap, "queryServiceInChunks", queryServiceInChunks)
+    products = lightcurves.findLightCurveProductsInMAST(["266744225"])
+    # TESS-SPOC light curves are high level science products
+    assert "'HLSP'" in queries[0]
+    assert "'TESS-SPOC'" in queries[0]
+    assert list(products["mission"]) == [
+        "TESS Sector 07",
+        "TESS Sector 34",
+        "Kepler"
+    ]
+
+
 def test_get_light_curve_ids() -> None:
     ids = lightcurves.getLightCurveIDs("LTT 1445 A")
     assert ids
@@ -208,6 +347,201 @@ def test_fits_to_pandas_and_light_curve_tess_to_pandas(
     assert isinstance(pnd3, pandas.DataFrame)
     assert len(pnd3) == len(pnd2)
     assert pnd3.iloc[0, 0] == pnd2.iloc[0, 0]
+    numpy.testing.assert_array_equal(pnd3["time"], pnd1.index)
+    numpy.testing.assert_array_equal(pnd3["flux"], pnd1["pdcsap_flux"])
+    numpy.testing.assert_array_equal(
+        pnd3["fluxError"],
+        pnd1["pdcsap_flux_err"]
+    )
+
+
+def test_fits_to_pandas_columns_and_byte_order() -> None:
+    pnd = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType=None,
+        dropNanTimes=False
+    )
+    assert list(pnd.columns) == list(lightcurves.fitsFluxColumns.values())
+    for column in pnd.columns:
+        assert pnd[column].values.dtype.isnative
+    # times are not dropped, so there should be some NaN values
+    assert pnd["time"].isna().any()
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        "numpy",
+        "arrow"
+    ]
+)
+def test_fits_to_pandas_output(
+    output: Literal["numpy", "arrow"]
+) -> None:
+    fitsFilePath = (
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+    )
+    pnd = lightcurves.fitsToPandas(fitsFilePath, fitsType="tess")
+
+    if output == "arrow":
+        pytest.importorskip("pyarrow")
+    tbl = lightcurves.fitsToPandas(
+        fitsFilePath,
+        fitsType="tess",
+        output=output
+    )
+    if output == "numpy":
+        assert isinstance(tbl, dict)
+        assert list(tbl.keys()) == list(pnd.columns)
+        numpy.testing.assert_array_equal(tbl["time"], pnd["time"].values)
+    else:
+        assert not isinstance(tbl, dict)
+        assert tbl.column_names == list(pnd.columns)
+        assert tbl.num_rows == len(pnd)
+        numpy.testing.assert_array_equal(
+            tbl.column("flux").to_numpy(),
+            pnd["flux"].values
+        )
+
+    with pytest.raises(ValueError, match="Unknown output type"):
+        lightcurves.fitsToPandas(
+            fitsFilePath,
+            fitsType="tess",
+            output="excel"  # type: ignore[call-overload]
+        )
+
+
+@pytest.mark.parametrize(
+    "validation",
+    [
+        "full",
+        "fast",
+        "off"
+    ]
+)
+def test_validate_light_curve_flux_table(
+    validation: Literal["full", "fast", "off"]
+) -> None:
+    pnd = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess",
+        validation=validation
+    )
+    lightcurves.validateLightCurveFluxTable(pnd, validation)
+
+    invalidTables = [
+        pnd.assign(extra=1),
+        pnd.astype({"flux": numpy.float64}),
+        pnd.assign(time=numpy.where(pnd.index == 3, numpy.nan, pnd["time"])),
+        pnd.set_axis([0] * len(pnd), axis="index")
+    ]
+    for tbl in invalidTables:
+        if validation == "off":
+            lightcurves.validateLightCurveFluxTable(tbl, validation)
+        else:
+            with pytest.raises(Exception):
+                lightcurves.validateLightCurveFluxTable(tbl, validation)
+
+    # NaN times are fine, if they were not dropped
+    lightcurves.validateLightCurveFluxTable(
+        invalidTables[2],
+        validation,
+        nullableTime=True
+    )
+
+    with pytest.raises(ValueError, match="Unknown validation level"):
+        lightcurves.validateLightCurveFluxTable(
+            pnd,
+            "some"  # type: ignore[arg-type]
+        )
+
+
+def test_validation_levels_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    pnd = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    # what every level costs is counted in calls of the validators,
+    # so it does not depend on how fast the machine is
+    calls: Dict[str, int] = {"full": 0, "fast": 0}
+    schemaValidate = pandera.DataFrameSchema.validate
+    getFastValidator = lightcurves._getFastLightCurveFluxTableValidator
+
+    def countedSchemaValidate(
+        self: pandera.DataFrameSchema,
+        *args: Any,
+        **kwargs: Any
+    ) -> Any:
+        calls["full"] += 1
+        return schemaValidate(self, *args, **kwargs)
+
+    def countedFastValidator(
+        nullableTime: bool
+    ) -> Callable[[pandas.DataFrame], None]:
+        validate = getFastValidator(nullableTime)
+
+        def countedValidate(tbl: pandas.DataFrame) -> None:
+            calls["fast"] += 1
+            validate(tbl)
+
+        return countedValidate
+
+    monkeypatch.setattr(
+        pandera.DataFrameSchema,
+        "validate",
+        countedSchemaValidate
+    )
+    monkeypatch.setattr(
+        lightcurves,
+        "_getFastLightCurveFluxTableValidator",
+        countedFastValidator
+    )
+
+    iterations = 10
+    expectedCalls: Dict[str, Dict[str, int]] = {
+        "full": {"full": iterations, "fast": 0},
+        "fast": {"full": 0, "fast": iterations},
+        "off": {"full": 0, "fast": 0}
+    }
+    for validation, expected in expectedCalls.items():
+        calls.update({"full": 0, "fast": 0})
+        for _ in range(iterations):
+            lightcurves.validateLightCurveFluxTable(
+                pnd,
+                validation  # type: ignore[arg-type]
+            )
+        assert calls == expected, f"Validation level [{validation}]"
+
+
+# wall-clock timing depends on the machine and its load,
+# so it is only measured on request
+@pytest.mark.skipif(
+    os.environ.get("PHAB_BENCHMARKS") != "1",
+    reason="benchmark, set PHAB_BENCHMARKS=1 to run it"
+)
+def test_validation_levels_cost() -> None:
+    pnd = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    iterations = 100
+    costs: Dict[str, float] = {}
+    for validation in ["full", "fast", "off"]:
+        timeStart = time.perf_counter()
+        for _ in range(iterations):
+            lightcurves.validateLightCurveFluxTable(
+                pnd,
+                validation  # type: ignore[arg-type]
+            )
+        costs[validation] = (time.perf_counter() - timeStart) / iterations
+    print(
+        " ".join((
+            "Validation cost per table:",
+            ", ".join(f"{v}: {c * 1000:.3f} ms" for v, c in costs.items())
+        ))
+    )
+    assert costs["fast"] < costs["full"]
+    assert costs["off"] < costs["fast"]
 
 
 def test_get_object_id(
@@ -258,6 +592,100 @@ def test_get_object_id(
     assert objectID == 2325762
 
 
+def test_get_object_ids(
+    somethingThatDoesntExist: str  # noqa: F811
+) -> None:
+    oids, unresolved = simbad.getObjectIDs(
+        [
+            "A2 146",
+            somethingThatDoesntExist,
+            "A2 146",
+            "SZ  66"
+        ],
+        chunkSize=1
+    )
+    assert isinstance(oids, pandas.DataFrame)
+    assert len(oids) == 2
+    assert oids.set_index("name").at["A2 146", "oid"] == 3308165
+    assert oids.set_index("name").at["SZ  66", "oid"] == 2325762
+    assert unresolved == [somethingThatDoesntExist]
+
+
+def test_find_identificators_from_other_catalogues(
+    somethingThatDoesntExist: str  # noqa: F811
+) -> None:
+    otherIDs = simbad.findIdentificatorsFromOtherCatalogues(
+        "TWA 20",
+        [("Gaia", "DR3"), ("Gaia", "DR2"), (somethingThatDoesntExist, None)]
+    )
+    assert otherIDs["Gaia DR3"] == "6132146982868270976"
+    assert otherIDs["Gaia DR3"] == (
+        simbad.findIdentificatorFromAnotherCatalogue("TWA 20", "Gaia", "DR3")
+    )
+    assert otherIDs["Gaia DR2"] is not None
+    assert otherIDs[somethingThatDoesntExist] is None
+
+
+def test_find_identificators_from_other_catalogues_in_bulk(
+    somethingThatDoesntExist: str  # noqa: F811
+) -> None:
+    otherIDs = simbad.findIdentificatorsFromOtherCataloguesInBulk(
+        ["TWA 20", somethingThatDoesntExist],
+        [("Gaia", "DR3"), ("TIC", None)]
+    )
+    assert isinstance(otherIDs, pandas.DataFrame)
+    assert list(otherIDs.columns) == ["Gaia DR3", "TIC"]
+    assert otherIDs.at["TWA 20", "Gaia DR3"] == "6132146982868270976"
+    assert otherIDs.at[somethingThatDoesntExist, "Gaia DR3"] is None
+
+
+def test_normalize_identifier() -> None:
+    assert cache.normalizeIdentifier("SZ  66") == "SZ 66"
+    assert cache.normalizeIdentifier(" Sz 66 ") == "SZ 66"
+    assert cache.normalizeIdentifier("2MASS J15392828-3446180") \
+        == "2MASS J15392828-3446180"
+
+
+def test_cache_entries(
+    monkeypatch: pytest.MonkeyPatch,
+    somethingThatDoesntExist: str  # noqa: F811
+) -> None:
+    with tempfile.TemporaryDirectory() as tempDir:
+        monkeypatch.setattr(cache, "enabled", True)
+        monkeypatch.setattr(cache, "cacheDirectory", pathlib.Path(tempDir))
+
+        found, value = cache.getEntry("tests", somethingThatDoesntExist)
+        assert not found
+        assert value is None
+
+        cache.setEntry("tests", "A2 146", (3308165, "A2 146"))
+        found, value = cache.getEntry("tests", "A2 146")
+        assert found
+        assert value == (3308165, "A2 146")
+
+        # negative entry
+        cache.setEntry("tests", somethingThatDoesntExist, None, ttl=60)
+        found, value = cache.getEntry("tests", somethingThatDoesntExist)
+        assert found
+        assert value is None
+
+        # expired entry
+        cache.setEntry("tests", "expired", 1, ttl=0.01)
+        time.sleep(0.02)
+        found, value = cache.getEntry("tests", "expired")
+        assert not found
+
+        cache.deleteEntries("tests")
+        found, value = cache.getEntry("tests", "A2 146")
+        assert not found
+
+        # disabled cache neither reads nor writes
+        monkeypatch.setattr(cache, "enabled", False)
+        cache.setEntry("tests", "A2 146", (3308165, "A2 146"))
+        found, value = cache.getEntry("tests", "A2 146")
+        assert not found
+
+
 def test_get_stellar_parameter_from_simbad_by_main_id(
     somethingThatDoesntExist: str  # noqa: F811
 ) -> None:
@@ -307,6 +735,27 @@ def test_get_stellar_parameter_from_simbad_by_object_id() -> None:
         ))
 
 
+def test_get_stellar_parameters_from_simbad_by_object_ids() -> None:
+    oidThatDoesNotExist = 123454321
+    rez = tap.getStellarParametersFromSimbadByObjectIDs(
+        [817576, oidThatDoesNotExist],
+        {"mesVar": ["period"]}
+    )
+    assert isinstance(rez, pandas.DataFrame)
+    assert len(rez) == 1
+    # should be the same as querying the parameter individually
+    rezSingle = tap.getStellarParameterFromSimbadByObjectID(
+        817576,
+        "mesVar",
+        "period"
+    )
+    assert rezSingle is not None
+    val, ref = rezSingle
+    assert rez.at[0, "oid"] == 817576
+    assert rez.at[0, "value"] == val
+    assert rez.at[0, "reference"] == ref
+
+
 def test_get_stellar_parameter(
     somethingThatDoesntExist: str  # noqa: F811
 ) -> None:
@@ -335,3 +784,225 @@ def test_get_stellar_parameter(
                 "There shouldn't be a known object",
                 f"under the name \"{somethingThatDoesntExist}\""
             ))
+
+
+class LocalFilesHandler(http.server.BaseHTTPRequestHandler):
+    # a stand-in for MAST, serving files from memory with ranges support
+    files: Dict[str, bytes] = {}
+    requests: List[Tuple[str, str]] = []
+
+    def do_GET(self) -> None:
+        self.requests.append((self.path, self.headers.get("Range", "")))
+        data = self.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        start = 0
+        rangeHeader = self.headers.get("Range")
+        if rangeHeader is not None:
+            start = int(rangeHeader.split("=")[1].split("-")[0])
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def localFilesServer() -> Iterator[str]:
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        LocalFilesHandler
+    )
+    LocalFilesHandler.files = {
+        f"/lc{i}.fits": bytes([i]) * (1000 + i * 100) for i in range(5)
+    }
+    LocalFilesHandler.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_products(
+    monkeypatch: pytest.MonkeyPatch,
+    localFilesServer: str
+) -> None:
+    with tempfile.TemporaryDirectory() as tempDir:
+        monkeypatch.setattr(cache, "enabled", True)
+        monkeypatch.setattr(cache, "cacheDirectory", pathlib.Path(tempDir))
+        productsDirectory = pathlib.Path(tempDir) / "products"
+
+        products = [
+            {
+                "dataURI": f"{localFilesServer}/lc{i}.fits",
+                "size": 1000 + i * 100,
+                "checksum": hashlib.sha256(
+                    bytes([i]) * (1000 + i * 100)
+                ).hexdigest()
+            }
+            for i in range(5)
+        ]
+        # a broken one
+        products.append({"dataURI": f"{localFilesServer}/missing.fits"})
+
+        # an interrupted download of one of the products
+        (productsDirectory).mkdir()
+        (productsDirectory / "lc3.fits.part").write_bytes(bytes([3]) * 500)
+
+        rez = downloads.downloadProducts(
+            products,
+            productsDirectory,
+            maxWorkers=3
+        )
+        assert list(rez["dataURI"]) == [p["dataURI"] for p in products]
+        assert rez["downloaded"].iloc[:5].all()
+        assert rez["error"].iloc[:5].isna().all()
+        assert rez["error"].iloc[5] is not None
+        for i in range(5):
+            assert (productsDirectory / f"lc{i}.fits").read_bytes() == (
+                bytes([i]) * (1000 + i * 100)
+            )
+        assert ("/lc3.fits", "bytes=500-") in LocalFilesHandler.requests
+        assert not list(productsDirectory.glob("*.part"))
+
+        # second time nothing is requested
+        LocalFilesHandler.requests.clear()
+        rez = downloads.downloadProducts(products[:5], productsDirectory)
+        assert not rez["downloaded"].any()
+        assert LocalFilesHandler.requests == []
+
+        # a deleted file is downloaded again
+        (productsDirectory / "lc0.fits").unlink()
+        rez = downloads.downloadProducts(products[:5], productsDirectory)
+        assert list(rez["downloaded"]) == [True, False, False, False, False]
+
+        # tables have NaN for missing values
+        (productsDirectory / "lc1.fits").unlink()
+        productsTable = pandas.DataFrame(products[:5])
+        productsTable.loc[1, ["size", "checksum"]] = numpy.nan
+        productsTable["productFilename"] = numpy.nan
+        rez = downloads.downloadProducts(productsTable, productsDirectory)
+        assert rez["error"].isna().all()
+        assert list(rez["downloaded"]) == [False, True, False, False, False]
+        assert (productsDirectory / "lc1.fits").is_file()
+
+        # wrong checksum
+        with pytest.raises(ValueError, match="Checksum"):
+            downloads.downloadFile(
+                f"{localFilesServer}/lc1.fits",
+                productsDirectory / "other.fits",
+                expectedChecksum="0" * 64
+            )
+        assert not (productsDirectory / "other.fits").exists()
+        assert not (productsDirectory / "other.fits.part").exists()
+
+
+def test_get_product_url() -> None:
+    url = downloads.getProductURL("mast:TESS/product/some_lc.fits")
+    assert url.startswith(downloads.mastDownloadURL)
+    assert "mast%3ATESS%2Fproduct%2Fsome_lc.fits" in url
+    assert downloads.getProductURL("https://example.org/a.fits") == (
+        "https://example.org/a.fits"
+    )
+
+
+class FakeSearchResult:
+    def __init__(self, rows: List[Dict[str, object]]):
+        self.table = astropyTable.Table(rows=rows)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+def test_refresh_light_curves(
+    monkeypatch: pytest.MonkeyPatch,
+    localFilesServer: str
+) -> None:
+    fitsData = pathlib.Path(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+    ).read_bytes()
+    for s in [7, 8, 9]:
+        LocalFilesHandler.files[f"/s{s}_lc.fits"] = fitsData
+
+    def product(sector: int, exptime: float = 120) -> Dict[str, object]:
+        fileName = f"s{sector}{'' if exptime == 120 else '_fast'}_lc.fits"
+        return {
+            "mission": f"TESS Sector {sector:02d}",
+            "author": "SPOC",
+            "exptime": exptime,
+            "dataURI": f"{localFilesServer}/{fileName}",
+            "productFilename": fileName,
+            "size": len(fitsData)
+        }
+
+    searchResults = {"LTT 1445 A": [product(7), product(8)]}
+    monkeypatch.setattr(
+        lightcurves,
+        "searchLightCurves",
+        lambda starName, authorsToSearch=None, refresh=False: (
+            FakeSearchResult(
+                searchResults[cache.normalizeIdentifier(starName)]
+            )
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        monkeypatch.setattr(cache, "enabled", True)
+        monkeypatch.setattr(cache, "cacheDirectory", pathlib.Path(tempDir))
+        productsDirectory = pathlib.Path(tempDir) / "products"
+
+        rez = holdings.refreshLightCurves(["LTT 1445 A"], productsDirectory)
+        assert list(rez["sector"]) == [7, 8]
+        assert rez["error"].isna().all()
+        assert rez["converted"].all()
+        assert len(holdings.readHoldings(productsDirectory)) == 2
+        assert len(list((pathlib.Path(tempDir) / "light-curves").glob(
+            "*.npy"
+        ))) == 2
+
+        # nothing new
+        LocalFilesHandler.requests.clear()
+        rez = holdings.refreshLightCurves(["ltt  1445 a"], productsDirectory)
+        assert rez.empty
+        assert LocalFilesHandler.requests == []
+
+        # a new sector and a different cadence of an old one
+        searchResults["LTT 1445 A"] += [product(9), product(8, 20)]
+        newProducts = holdings.findNewProducts(
+            ["LTT 1445 A"],
+            holdings.readHoldings(productsDirectory)
+        )
+        assert list(zip(newProducts["sector"], newProducts["exptime"])) == [
+            (9, 120),
+            (8, 20)
+        ]
+        # the last one is not on the server
+        rez = holdings.refreshLightCurves(
+            ["LTT 1445 A"],
+            productsDirectory,
+            convert=False
+        )
+        assert list(rez["sector"]) == [9, 8]
+        assert rez["error"].iloc[0] is None
+        assert rez["error"].iloc[1] is not None
+        assert not rez["converted"].any()
+        assert sorted(r[0] for r in LocalFilesHandler.requests) == [
+            "/s8_fast_lc.fits",
+            "/s9_lc.fits"
+        ]
+        held = holdings.readHoldings(productsDirectory)
+        assert list(held["sector"]) == [7, 8, 9]
+
+        # a deleted file is not held anymore
+        pathlib.Path(held["path"].iloc[0]).unlink()
+        newProducts = holdings.findNewProducts(["LTT 1445 A"], held)
+        assert list(newProducts["sector"]) == [7, 8]
@@ -1,12 +1,19 @@
 import pytest
 
+import os
+import io
+import shutil
 import tempfile
 import pathlib
 import pandas
 import numpy
 
-from utils.files import file as fl, pickle
-from . import somethingThatDoesntExist
+from utils.files import file as fl, pickle, parquet, npy
+from utils.databases import lightcurves
+from . import (  # noqa: F401
+    somethingThatDoesntExist,
+    temporaryCacheDirectory
+)
 
 
 def test_directory_exists() -> None:
@@ -93,3 +100,156 @@ def test_merge_pickles_save_to_file() -> None:
         )
         assert isinstance(rslt, type(None))
         assert tempFilePath.exists()
+
+
+def test_ingest_light_curves_to_parquet() -> None:
+    pytest.importorskip("pyarrow")
+
+    with tempfile.TemporaryDirectory() as storeDirectory:
+        ingested = parquet.ingestLightCurvesToParquet(
+            "./data",
+            storeDirectory,
+            maxWorkers=2
+        )
+        assert len(ingested) == 1
+        assert ingested.iloc[0]["mission"] == "TESS"
+        assert ingested.iloc[0]["target"] == "266744225"
+        assert ingested.iloc[0]["sector"] == 7
+
+        # already ingested files are skipped
+        ingestedAgain = parquet.ingestLightCurvesToParquet(
+            "./data",
+            storeDirectory
+        )
+        assert len(ingestedAgain) == 0
+        assert len(parquet.readManifest(storeDirectory)) == 1
+
+        lc = parquet.readLightCurvesFromParquet(
+            storeDirectory,
+            targets=["266744225"]
+        )
+        pnd = lightcurves.fitsToPandas(
+            "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+            fitsType="tess",
+            qualityBitmask="none"
+        )
+        assert len(lc) == len(pnd) == ingested.iloc[0]["rows"]
+        assert list(lc.columns) == [
+            "time", "flux", "fluxError", "quality",
+            "mission", "target", "sector"
+        ]
+        numpy.testing.assert_array_equal(lc["time"], pnd["time"])
+        numpy.testing.assert_array_equal(lc["flux"], pnd["flux"])
+
+        lcOtherSector = parquet.readLightCurvesFromParquet(
+            storeDirectory,
+            sectors=[8]
+        )
+        assert len(lcOtherSector) == 0
+
+
+def test_ingest_light_curves_to_parquet_again() -> None:
+    pytest.importorskip("pyarrow")
+
+    with tempfile.TemporaryDirectory() as fitsDirectory, \
+            tempfile.TemporaryDirectory() as storeDirectory:
+        fitsFile = pathlib.Path(fitsDirectory) / (
+            "tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+        )
+        shutil.copy(f"./data/{fitsFile.name}", fitsFile)
+        # a modification time that does not survive being written
+        # to a CSV file as a float and read back
+        mtimeNs = 1700000000245631488
+        os.utime(fitsFile, ns=(mtimeNs, mtimeNs))
+        mtime = fitsFile.stat().st_mtime
+        assert pandas.read_csv(
+            io.StringIO(pandas.DataFrame({"mtime": [mtime]}).to_csv())
+        )["mtime"][0] != mtime
+
+        ingested = parquet.ingestLightCurvesToParquet(
+            fitsDirectory,
+            storeDirectory,
+            maxWorkers=1
+        )
+        assert len(ingested) == 1
+        ingestedAgain = parquet.ingestLightCurvesToParquet(
+            fitsDirectory,
+            storeDirectory,
+            maxWorkers=1
+        )
+        assert len(ingestedAgain) == 0
+
+        # a changed file is ingested again and replaces its manifest row
+        os.utime(fitsFile, ns=(mtimeNs + 10**9, mtimeNs + 10**9))
+        ingestedAgain = parquet.ingestLightCurvesToParquet(
+            fitsDirectory,
+            storeDirectory,
+            maxWorkers=1
+        )
+        assert len(ingestedAgain) == 1
+        manifest = parquet.readManifest(storeDirectory)
+        assert len(manifest) == 1
+        assert manifest.iloc[0]["mtime"] == mtimeNs + 10**9
+        assert len(
+            (pathlib.Path(storeDirectory) / parquet.manifestFileName)
+            .read_text().splitlines()
+        ) == 2
+
+
+def test_open_cached_light_curve(monkeypatch: pytest.MonkeyPatch) -> None:
+    fitsFilePath = (
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+    )
+    with tempfile.TemporaryDirectory() as cacheDirectory:
+        monkeypatch.setattr(
+            npy,
+            "lightCurvesCacheDirectory",
+            pathlib.Path(cacheDirectory)
+        )
+        lc = npy.openCachedLightCurve(fitsFilePath, fitsType="tess")
+        assert isinstance(lc, dict)
+        assert len(list(pathlib.Path(cacheDirectory).glob("*.npy"))) == 1
+
+        lcCached = npy.openCachedLightCurve(fitsFilePath, fitsType="tess")
+        assert isinstance(lcCached, dict)
+        assert isinstance(lcCached["flux"].base, numpy.memmap)
+        assert not lcCached["flux"].flags.writeable
+        original = lightcurves.fitsToPandas(
+            fitsFilePath,
+            fitsType="tess",
+            output="numpy"
+        )
+        for column, values in original.items():
+            numpy.testing.assert_array_equal(lcCached[column], values)
+            assert lcCached[column].dtype == values.dtype
+
+        # a different conversion is cached separately
+        lcNone = npy.openCachedLightCurve(
+            fitsFilePath,
+            fitsType="tess",
+            qualityBitmask="none",
+            output="pandas"
+        )
+        assert isinstance(lcNone, pandas.DataFrame)
+        assert len(lcNone) > len(lcCached["time"])
+        assert len(list(pathlib.Path(cacheDirectory).glob("*.npy"))) == 2
+        del lc, lcCached, lcNone
+
+        # changed FITS file invalidates the cached conversion
+        with tempfile.TemporaryDirectory() as fitsDirectory:
+            fitsCopyPath = pathlib.Path(fitsDirectory) / "copy_lc.fits"
+            fitsCopyPath.write_bytes(pathlib.Path(fitsFilePath).read_bytes())
+            cachedBefore = set(pathlib.Path(cacheDirectory).glob("*.npy"))
+            npy.openCachedLightCurve(fitsCopyPath, fitsType="tess")
+            npyFile = (
+                set(pathlib.Path(cacheDirectory).glob("*.npy")) - cachedBefore
+            ).pop()
+            cachedAt = npyFile.stat().st_mtime_ns
+            npy.openCachedLightCurve(fitsCopyPath, fitsType="tess")
+            assert npyFile.stat().st_mtime_ns == cachedAt
+            os.utime(fitsCopyPath, (0, 0))
+            npy.openCachedLightCurve(fitsCopyPath, fitsType="tess")
+            assert npyFile.stat().st_mtime_ns != cachedAt
+
+        npy.deleteCachedLightCurves()
+        assert not any(pathlib.Path(cacheDirectory).iterdir())
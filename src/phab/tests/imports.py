@@ -0,0 +1,99 @@
+import pytest
+
+import os
+import sys
+import subprocess
+import pathlib
+import json
+
+import utils
+
+from typing import List
+
+heavyDependencies: List[str] = [
+    "lightkurve",
+    "astropy",
+    "pandera",
+    "matplotlib",
+    "astroquery",
+    "pyvo"
+]
+
+
+def importInSubprocess(modules: List[str]) -> dict:
+    # a fresh interpreter, otherwise everything is already imported
+    # by other tests
+    rez = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "\n".join((
+                "import sys, time, json",
+                "timeStart = time.perf_counter()",
+                *[f"import {m}" for m in modules],
+                "print(json.dumps({",
+                "    'time': time.perf_counter() - timeStart,",
+                "    'modules': list(sys.modules.keys())",
+                "}))"
+            ))
+        ],
+        cwd=pathlib.Path(utils.__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(rez.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "utils.databases.lightcurves",
+        "utils.databases.simbad",
+        "utils.databases.tap",
+        "utils.databases.downloads",
+        "utils.databases.holdings",
+        "utils.math.statistics",
+        "utils.files.pickle",
+        "utils.files.parquet",
+        "utils.files.npy",
+        "utils.timeseries.stitching",
+        "utils.timeseries.binning",
+        "utils.timeseries.collection",
+        "utils.timeseries.periodograms",
+        "utils.timeseries.detrending",
+        "utils.timeseries.sharing"
+    ]
+)
+def test_heavy_dependencies_are_not_imported(module: str) -> None:
+    rez = importInSubprocess([module])
+    importedModules = [
+        m for m in rez["modules"] if m.split(".")[0] in heavyDependencies
+    ]
+    assert not importedModules, \
+        " ".join((
+            f"Importing [{module}] should not import these modules",
+            f"until they are used: {importedModules}"
+        ))
+
+
+# wall-clock timing depends on the machine and its load,
+# so it is only measured on request
+@pytest.mark.skipif(
+    os.environ.get("PHAB_BENCHMARKS") != "1",
+    reason="benchmark, set PHAB_BENCHMARKS=1 to run it"
+)
+def test_import_time() -> None:
+    rezPackage = importInSubprocess([
+        "utils.databases.lightcurves",
+        "utils.databases.simbad",
+        "utils.databases.tap"
+    ])
+    rezDependencies = importInSubprocess(heavyDependencies)
+    print(
+        " ".join((
+            f"Package modules import time: {rezPackage['time']:.3f} s,",
+            f"heavy dependencies import time: {rezDependencies['time']:.3f} s"
+        ))
+    )
+    assert rezPackage["time"] < rezDependencies["time"] / 2
@@ -0,0 +1,608 @@
+import pytest
+
+import concurrent.futures
+import gc
+import pickle
+import subprocess
+import sys
+import tempfile
+import pathlib
+import pandas
+import numpy
+
+from utils.timeseries import (
+    stitching,
+    binning,
+    periodograms,
+    detrending,
+    sharing
+)
+from utils.timeseries.collection import LightCurveCollection
+
+from multiprocessing import shared_memory
+from typing import List
+
+
+def makeSectors(
+    overlapping: bool,
+    seed: int = 42
+) -> List[pandas.DataFrame]:
+    rng = numpy.random.default_rng(seed)
+    sectors: List[pandas.DataFrame] = []
+    for s in range(5):
+        start = s * (5 if overlapping else 30)
+        time = numpy.sort(rng.uniform(start, start + 25, 1000 + s * 100))
+        sectors.append(
+            pandas.DataFrame({
+                "time": time,
+                "flux": rng.normal(100 * (s + 1), 1, len(time)).astype(
+                    numpy.float32
+                ),
+                "fluxError": rng.uniform(0.5, 1, len(time)).astype(
+                    numpy.float32
+                )
+            })
+        )
+    # not in the order of time
+    return sectors[::-1]
+
+
+@pytest.mark.parametrize(
+    "overlapping",
+    [
+        True,
+        False
+    ]
+)
+@pytest.mark.parametrize(
+    "chunkSize",
+    [
+        1,
+        77,
+        1000000
+    ]
+)
+def test_stitch_light_curves(overlapping: bool, chunkSize: int) -> None:
+    sectors = makeSectors(overlapping)
+
+    lc = stitching.stitchLightCurves(sectors, chunkSize=chunkSize)
+    assert isinstance(lc, pandas.DataFrame)
+
+    naive = pandas.concat(
+        [
+            s.assign(
+                flux=s["flux"] / s["flux"].median(),
+                fluxError=s["fluxError"] / s["flux"].median()
+            )
+            for s in sectors
+        ]
+    ).sort_values("time", kind="stable").reset_index(drop=True)
+
+    assert len(lc) == len(naive)
+    assert numpy.all(numpy.diff(lc["time"]) >= 0)
+    numpy.testing.assert_array_equal(lc["time"], naive["time"])
+    numpy.testing.assert_allclose(lc["flux"], naive["flux"], rtol=1e-6)
+    numpy.testing.assert_allclose(
+        lc["fluxError"],
+        naive["fluxError"],
+        rtol=1e-6
+    )
+    # after normalization all the sectors are around 1
+    assert abs(float(lc["flux"].median()) - 1) < 0.01
+
+
+def test_stitch_light_curves_to_files() -> None:
+    sectors = makeSectors(overlapping=True)
+    with tempfile.TemporaryDirectory() as outputDirectory:
+        lc = stitching.stitchLightCurves(
+            [{c: s[c].values for c in s.columns} for s in sectors],
+            normalization=None,
+            chunkSize=100,
+            outputDirectoryPath=outputDirectory,
+            output="numpy"
+        )
+        assert isinstance(lc, dict)
+        assert len(lc["time"]) == sum(len(s) for s in sectors)
+        assert numpy.all(numpy.diff(lc["time"]) >= 0)
+        del lc
+
+        flux = numpy.load(
+            pathlib.Path(outputDirectory) / "flux.npy",
+            mmap_mode="r"
+        )
+        assert flux.dtype == numpy.float32
+        assert numpy.isclose(
+            numpy.sort(flux).sum(),
+            sum(s["flux"].sum() for s in sectors),
+            rtol=1e-5
+        )
+        del flux
+
+
+def test_stitch_light_curves_nan_times() -> None:
+    sectors = makeSectors(overlapping=False)
+    sectors[0].loc[3, "time"] = numpy.nan
+    with pytest.raises(ValueError, match="NaN times"):
+        stitching.stitchLightCurves(sectors)
+
+
+@pytest.mark.parametrize(
+    "method",
+    [
+        "mean",
+        "median"
+    ]
+)
+def test_bin_light_curve(method: str) -> None:
+    lc = makeSectors(overlapping=False)[-1]
+    lc.loc[5, "flux"] = numpy.nan
+    binWidth = 0.5
+
+    binned = binning.binLightCurve(
+        lc,
+        binWidth=binWidth,
+        method=method  # type: ignore[arg-type]
+    )
+    assert isinstance(binned, pandas.DataFrame)
+
+    usable = lc.dropna(subset=["flux"])
+    grouped = usable.groupby(
+        numpy.floor((usable["time"] - lc["time"].min()) / binWidth)
+    ).agg(method)
+    assert len(binned) == len(grouped)
+    numpy.testing.assert_allclose(binned["time"], grouped["time"])
+    numpy.testing.assert_allclose(binned["flux"], grouped["flux"], rtol=1e-6)
+    assert binned["flux"].dtype == numpy.float32
+
+
+def test_bin_light_curve_by_cadence() -> None:
+    cadence = 20 / (24 * 60 * 60)
+    time = numpy.arange(600) * cadence
+    # a gap, after which bins should still be aligned to the cadences grid
+    time = numpy.delete(time, numpy.arange(100, 143))
+    lc = {
+        "time": time,
+        "flux": numpy.ones(len(time), dtype=numpy.float32),
+        "fluxError": numpy.full(len(time), 0.1, dtype=numpy.float32)
+    }
+    binned = binning.binLightCurveByCadence(
+        lc,
+        binFactor=6,
+        cadence=cadence,
+        method="weighted",
+        output="numpy"
+    )
+    assert isinstance(binned, dict)
+    # 100 bins, except the ones that fall into the gap entirely
+    assert len(binned["time"]) == 100 - 6
+    numpy.testing.assert_allclose(binned["flux"], 1)
+    # full bins have 6 rows
+    numpy.testing.assert_allclose(
+        binned["fluxError"][0],
+        0.1 / numpy.sqrt(6),
+        rtol=1e-6
+    )
+
+
+def test_bin_light_curve_by_signal_to_noise() -> None:
+    time = numpy.arange(1000, dtype=numpy.float64)
+    # the second half is a lot noisier
+    fluxError = numpy.where(time < 500, 0.01, 0.1).astype(numpy.float32)
+    lc = {
+        "time": time,
+        "flux": numpy.ones(len(time), dtype=numpy.float32),
+        "fluxError": fluxError
+    }
+    binned = binning.binLightCurveBySignalToNoise(
+        lc,
+        targetSignalToNoise=200,
+        output="numpy"
+    )
+    assert isinstance(binned, dict)
+    snr = binned["flux"] / binned["fluxError"]
+    # except for the last (incomplete) bin
+    assert numpy.all(snr[:-1] >= 200 * 0.999)
+    # bins are wider where the noise is higher
+    binWidths = numpy.diff(binned["time"])
+    assert binWidths[-2] > binWidths[0]
+
+    # a row with a lot of signal does not leave the next bins short of it
+    snrSquared = numpy.array([0.5, 3.4, 0.2, 0.9, 0.9, 0.9])
+    binned = binning.binLightCurveBySignalToNoise(
+        {
+            "time": numpy.arange(len(snrSquared), dtype=numpy.float64),
+            "flux": numpy.ones(len(snrSquared)),
+            "fluxError": 1 / numpy.sqrt(snrSquared)
+        },
+        targetSignalToNoise=1,
+        output="numpy"
+    )
+    assert isinstance(binned, dict)
+    numpy.testing.assert_allclose(
+        binned["flux"] / binned["fluxError"],
+        numpy.sqrt([3.9, 1.1, 1.8])
+    )
+    snrSquared = numpy.random.default_rng(5).exponential(1, 10000) ** 4
+    binned = binning.binLightCurveBySignalToNoise(
+        {
+            "time": numpy.arange(len(snrSquared), dtype=numpy.float64),
+            "flux": numpy.ones(len(snrSquared)),
+            "fluxError": 1 / numpy.sqrt(snrSquared)
+        },
+        targetSignalToNoise=5,
+        output="numpy"
+    )
+    assert isinstance(binned, dict)
+    snr = binned["flux"] / binned["fluxError"]
+    assert numpy.all(snr[:-1] >= 5 * (1 - 1e-9))
+
+    with pytest.raises(ValueError):
+        binning.binLightCurveBySignalToNoise(lc, targetSignalToNoise=0)
+
+
+def test_bin_light_curve_weighted_unusable_errors() -> None:
+    time = numpy.arange(100, dtype=numpy.float64)
+    fluxError = numpy.full(len(time), 0.01)
+    fluxError[[3, 15, 27]] = [numpy.nan, 0, -0.01]
+    # a bin with nothing but unusable errors
+    fluxError[40:50] = numpy.nan
+    lc = {
+        "time": time,
+        "flux": numpy.ones(len(time)),
+        "fluxError": fluxError
+    }
+    binned = binning.binLightCurve(
+        lc,
+        binWidth=10,
+        method="weighted",
+        output="numpy"
+    )
+    assert isinstance(binned, dict)
+    assert len(binned["flux"]) == 9
+    for column in ["time", "flux", "fluxError"]:
+        assert numpy.all(numpy.isfinite(binned[column]))
+    numpy.testing.assert_allclose(binned["flux"], 1)
+    assert binned["fluxError"][0] == pytest.approx(0.01 / 3)
+
+    binned = binning.binLightCurveBySignalToNoise(
+        lc,
+        targetSignalToNoise=300,
+        output="numpy"
+    )
+    assert isinstance(binned, dict)
+    assert numpy.all(numpy.isfinite(binned["flux"]))
+    snr = binned["flux"] / binned["fluxError"]
+    assert numpy.all(snr[:-1] >= 300 * 0.999)
+
+
+def test_light_curve_collection() -> None:
+    sectors = makeSectors(overlapping=False)
+    sectors[1].loc[7, "flux"] = numpy.nan
+    targets = ["B", "A", "B", "C", "A"]
+    sectorNumbers = [3, 2, 1, 5, 4]
+
+    lcs = LightCurveCollection.fromLightCurves(
+        sectors,
+        targets=targets,
+        sectors=sectorNumbers
+    )
+    assert len(lcs) == len(sectors)
+    assert lcs.getTargets() == ["A", "B", "C"]
+    assert list(lcs.getIndex()["sector"]) == [2, 4, 1, 3, 5]
+
+    # light curves of a target are slices of the collection arrays
+    lcB = lcs.getTarget("B")
+    assert isinstance(lcB, dict)
+    assert numpy.shares_memory(lcB["time"], lcs.time)
+    numpy.testing.assert_array_equal(
+        lcB["time"],
+        numpy.concatenate((sectors[2]["time"], sectors[0]["time"]))
+    )
+    with pytest.raises(ValueError):
+        lcs.getTarget("D")
+    # a target split into several runs of light curves
+    with pytest.raises(ValueError, match="runs"):
+        LightCurveCollection(
+            lcs.time,
+            lcs.flux,
+            lcs.fluxError,
+            lcs.offsets,
+            numpy.array(["A", "B", "A", "B", "C"]),
+            lcs.sectors
+        )
+
+    medians = lcs.median("flux")
+    expectedOrder = [1, 4, 2, 0, 3]
+    numpy.testing.assert_allclose(
+        medians,
+        [sectors[i]["flux"].median() for i in expectedOrder],
+        rtol=1e-6
+    )
+    numpy.testing.assert_allclose(
+        lcs.mean("flux"),
+        [sectors[i]["flux"].mean() for i in expectedOrder],
+        rtol=1e-5
+    )
+    numpy.testing.assert_allclose(
+        lcs.reduce(numpy.maximum, "time"),
+        [sectors[i]["time"].max() for i in expectedOrder]
+    )
+
+    normalized = lcs.normalize()
+    numpy.testing.assert_allclose(normalized.median("flux"), 1, rtol=1e-6)
+
+    with tempfile.TemporaryDirectory() as collectionDirectory:
+        lcs.save(collectionDirectory)
+        lcsLoaded = LightCurveCollection.load(collectionDirectory)
+        assert isinstance(lcsLoaded.flux, numpy.memmap)
+        assert lcsLoaded.getTargets() == lcs.getTargets()
+        lcC = lcsLoaded.getLightCurve(4, output="pandas")
+        assert isinstance(lcC, pandas.DataFrame)
+        numpy.testing.assert_array_equal(lcC["flux"], sectors[3]["flux"])
+        del lcsLoaded, lcC
+
+
+def test_periodograms_peaks() -> None:
+    rng = numpy.random.default_rng(7)
+    periods = {"A": 1.3, "B": 3.7, "C": 0.45}
+    lightCurves = {}
+    for i, (target, period) in enumerate(periods.items()):
+        time = numpy.sort(rng.uniform(0, 27 + i, 3000))
+        lightCurves[target] = pandas.DataFrame({
+            "time": time,
+            "flux": (
+                1
+                + 0.01 * numpy.sin(2 * numpy.pi * time / period)
+                + rng.normal(0, 0.002, len(time))
+            ).astype(numpy.float32),
+            "fluxError": numpy.full(len(time), 0.002, dtype=numpy.float32)
+        })
+    lightCurves["A"].loc[10, "flux"] = numpy.nan
+    # not enough data
+    lightCurves["D"] = lightCurves["A"].iloc[:2]
+
+    peaks = periodograms.getPeriodogramsPeaks(
+        lightCurves,
+        minimumPeriod=0.2,
+        maximumPeriod=10,
+        peaksCount=2,
+        maxWorkers=2,
+        targetsPerTask=2
+    )
+    assert list(peaks.columns) == [
+        "target", "peak", "period", "frequency", "power"
+    ]
+    assert list(peaks["target"]) == ["A", "A", "B", "B", "C", "C"]
+    topPeaks = peaks.query("peak == 1").set_index("target")
+    for target, period in periods.items():
+        assert abs(topPeaks.loc[target, "period"] - period) / period < 0.01
+    assert numpy.all(
+        peaks.groupby("target")["power"].apply(
+            lambda p: numpy.all(numpy.diff(p) <= 0)
+        )
+    )
+
+    peaksInProcess = periodograms.getPeriodogramsPeaks(
+        LightCurveCollection.fromLightCurves(
+            list(lightCurves.values()),
+            targets=list(lightCurves.keys())
+        ),
+        minimumPeriod=0.2,
+        maximumPeriod=10,
+        peaksCount=2,
+        maxWorkers=1
+    )
+    pandas.testing.assert_frame_equal(peaks, peaksInProcess)
+
+    with pytest.raises(ValueError):
+        periodograms.getFrequencyGrid(10, minimumPeriod=6)
+
+
+@pytest.mark.parametrize("maxWorkers", [1, 2])
+def test_periodograms_peaks_keep_flux_precision(maxWorkers: int) -> None:
+    # a small variation on top of a large flux level is lost in `float32`
+    rng = numpy.random.default_rng(3)
+    time = numpy.sort(rng.uniform(0, 27, 5000))
+    lightCurves = {
+        "A": {
+            "time": time,
+            "flux": 1e6 + 1e-3 * numpy.sin(2 * numpy.pi * time / 3.3),
+            "fluxError": numpy.full(len(time), 1e-4)
+        }
+    }
+    peaks = periodograms.getPeriodogramsPeaks(
+        lightCurves,
+        minimumPeriod=0.2,
+        maximumPeriod=14,
+        maxWorkers=maxWorkers
+    )
+    assert abs(peaks.loc[0, "period"] - 3.3) / 3.3 < 0.01
+
+
+@pytest.mark.parametrize(
+    "method",
+    [
+        "median",
+        "savgol"
+    ]
+)
+def test_detrend_light_curve(method: str) -> None:
+    cadence = 2 / (24 * 60)
+    time = numpy.concatenate((
+        numpy.arange(0, 12, cadence),
+        # a gap after which the level is different
+        numpy.arange(14, 26, cadence)
+    ))
+    rng = numpy.random.default_rng(3)
+    trend = numpy.where(time < 13, 1000 + 5 * time, 800 - 3 * time)
+    lc = pandas.DataFrame({
+        "time": time,
+        "flux": (trend + rng.normal(0, 0.5, len(time))).astype(numpy.float32),
+        "fluxError": numpy.full(len(time), 0.5, dtype=numpy.float32)
+    })
+    lc.loc[100, "flux"] = numpy.nan
+    # a flare should stay after detrending
+    lc.loc[2000:2004, "flux"] += 50
+
+    detrended = detrending.detrendLightCurve(
+        lc,
+        windowLength=0.5,
+        method=method  # type: ignore[arg-type]
+    )
+    assert isinstance(detrended, pandas.DataFrame)
+    assert len(detrended) == len(lc)
+    assert detrended["flux"].dtype == numpy.float32
+    assert numpy.isnan(detrended.loc[100, "flux"])
+    usable = detrended["flux"].drop(index=range(1990, 2015)).dropna()
+    assert abs(float(usable.median()) - 1) < 1e-4
+    assert float(usable.std()) < 0.001
+    assert float(detrended.loc[2002, "flux"]) > 1.03
+
+    trendValues = detrending.getTrend(
+        lc["time"].values[::-1],
+        lc["flux"].values[::-1],
+        windowLength=0.5,
+        method=method  # type: ignore[arg-type]
+    )
+    numpy.testing.assert_allclose(
+        lc["flux"] / trendValues[::-1],
+        detrended["flux"],
+        rtol=1e-6
+    )
+
+
+def test_detrend_collection_and_normalize() -> None:
+    sectors = makeSectors(overlapping=False)
+    lcs = LightCurveCollection.fromLightCurves(
+        sectors,
+        targets=["A", "A", "B", "B", "C"]
+    )
+
+    detrended = detrending.detrendCollection(lcs, windowLength=2)
+    numpy.testing.assert_allclose(detrended.median("flux"), 1, rtol=1e-3)
+    detrendedInParallel = detrending.detrendCollection(
+        lcs,
+        windowLength=2,
+        maxWorkers=2,
+        lightCurvesPerTask=2
+    )
+    numpy.testing.assert_array_equal(
+        detrended.flux,
+        detrendedInParallel.flux
+    )
+    lc = lcs.getLightCurve(3)
+    numpy.testing.assert_allclose(
+        detrended.getLightCurve(3)["flux"],
+        detrending.detrendLightCurve(
+            lc,
+            windowLength=2,
+            output="numpy"
+        )["flux"],
+        rtol=1e-6
+    )
+
+    normalized = detrending.normalizeLightCurve(
+        {c: lcs.getTarget("A")[c] for c in ["time", "flux", "fluxError"]},
+        sectorLabels=numpy.repeat([1, 2], numpy.diff(lcs.offsets)[:2]),
+        output="numpy"
+    )
+    assert isinstance(normalized, dict)
+    numpy.testing.assert_allclose(
+        normalized["flux"],
+        lcs.normalize().getTarget("A")["flux"],
+        rtol=1e-6
+    )
+
+    numpy.testing.assert_array_equal(
+        detrending.getSegmentLabels(numpy.array([1, 2, 5, 5.1]), maxGap=1),
+        [0, 0, 1, 1]
+    )
+    with pytest.raises(ValueError):
+        detrending.getSegmentLabels(numpy.array([2, 1]))
+
+
+def getSharedTargetFluxSum(
+    handle: sharing.SharedArraysHandle,
+    target: str
+) -> float:
+    lcs = sharing.attachLightCurves(handle)
+    flux = lcs.getTarget(target)["flux"]
+    return float(numpy.nansum(flux))
+
+
+def test_shared_light_curves() -> None:
+    sectors = makeSectors(overlapping=False)
+    lightCurves = {t: s for t, s in zip(["C", "A", "B", "E", "D"], sectors)}
+
+    with sharing.shareLightCurves(lightCurves) as shared:
+        # the handle is what goes to workers, not the arrays
+        assert len(pickle.dumps(shared.handle)) < 1000
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            sums = list(
+                executor.map(
+                    getSharedTargetFluxSum,
+                    [shared.handle] * len(lightCurves),
+                    lightCurves.keys()
+                )
+            )
+        numpy.testing.assert_allclose(
+            sums,
+            [s["flux"].sum() for s in lightCurves.values()],
+            rtol=1e-5
+        )
+
+        lcs = sharing.attachLightCurves(shared.handle)
+        assert lcs.getTargets() == ["A", "B", "C", "D", "E"]
+        assert shared.handle.name in sharing.getAttachedBlocks()
+        blockName = shared.handle.name
+        del lcs
+    # released on leaving the block
+    assert blockName not in sharing.getAttachedBlocks()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=blockName)
+
+    # released when the owner is garbage-collected
+    sharedArrays = sharing.SharedArrays({"values": numpy.arange(10)})
+    blockName = sharedArrays.handle.name
+    del sharedArrays
+    gc.collect()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=blockName)
+
+    with pytest.raises(ValueError):
+        sharing.SharedArrays({"values": numpy.array([{}, None])})
+
+
+def test_shared_arrays_views_outlive_close() -> None:
+    # in a separate process, as using an unmapped block crashes it
+    rez = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "\n".join((
+                "import gc, numpy",
+                "from utils.timeseries import sharing",
+                "shared = sharing.SharedArrays({'a': numpy.arange(1000.0)})",
+                "ownerView = shared.arrays['a']",
+                "attachedView = shared.handle.attach()['a']",
+                "sharedLcs = sharing.shareLightCurves({",
+                "    'A': {",
+                "        'time': numpy.arange(5.0),",
+                "        'flux': numpy.ones(5),",
+                "        'fluxError': numpy.ones(5)",
+                "    }",
+                "})",
+                "lcs = sharing.attachLightCurves(sharedLcs.handle)",
+                "shared.close()",
+                "sharedLcs.close()",
+                "gc.collect()",
+                "sharing.detachAll()",
+                "print(ownerView.sum(), attachedView.sum(), lcs.flux.sum())"
+            ))
+        ],
+        cwd=pathlib.Path(sharing.__file__).parent.parent.parent,
+        capture_output=True,
+        text=True
+    )
+    assert rez.returncode == 0, rez.stderr
+    assert rez.stdout.split() == ["499500.0", "499500.0", "5.0"]
@@ -0,0 +1,74 @@
+"""
+Deferred importing of heavy dependencies.
+"""
+
+import importlib
+import types
+
+from typing import Any
+
+
+class LazyModule(types.ModuleType):
+    """
+    A placeholder for a module that is not imported until one of its
+    attributes is accessed for the first time. After that all of the module
+    attributes are copied into the placeholder, so subsequent accesses cost
+    the same as with a regularly imported module.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+
+    def _load(self) -> types.ModuleType:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+
+def lazyImport(moduleName: str) -> Any:
+    """
+    Get a placeholder for the module, which will be actually imported
+    on the first access to any of its attributes. Typed as `Any`, so
+    the placeholder can be used just like the real module.
+
+    Example:
+
+    ``` py
+    from phab.utils._lazy import lazyImport
+
+    lightkurve = lazyImport("lightkurve")
+    # nothing has been imported yet
+
+    lightkurve.search_lightcurve("Kepler-114")
+    # now it has been
+    ```
+    """
+    return LazyModule(moduleName)
+
+
+def importOptional(moduleName: str, extra: str) -> Any:
+    """
+    Import a module from an optional dependency. If it is not installed,
+    then the raised `ImportError` tells which extra of the package
+    provides it.
+
+    Example:
+
+    ``` py
+    from phab.utils._lazy import importOptional
+
+    pyarrow = importOptional("pyarrow", "arrow")
+    ```
+    """
+    try:
+        return importlib.import_module(moduleName)
+    except ImportError as ex:
+        raise ImportError(
+            " ".join((
+                f"This functionality requires {moduleName} package,",
+                f"you can install it with `pip install phab-utils[{extra}]`"
+            ))
+        ) from ex
@@ -0,0 +1,219 @@
+"""
+Local persistent cache for results of remote queries, such as resolving
+star names to SIMBAD object identificators. Cache entries are stored
+in an [SQLite](https://sqlite.org/) database file, so they survive between
+runs, and looking up a cached value does not require any network
+round trips.
+
+The cache is enabled by default. It can be disabled either
+by setting `utils.databases.cache.enabled` to `False` or by setting
+`PHAB_CACHE` environment variable to `0`/`no`/`off`/`false`/`disable`.
+"""
+
+import os
+import pathlib
+import sqlite3
+import pickle
+import threading
+import time
+
+from typing import Optional, Any, Dict, Tuple
+
+from ..logs.log import logger
+
+enabled: bool = True
+"""
+Flag for enabling the cache. When it is set to `False`, nothing is read
+from the cache and nothing is written to it.
+"""
+
+if "PHAB_CACHE" in os.environ:
+    enabledValue: str = os.environ["PHAB_CACHE"].lower()
+    if enabledValue in ["0", "no", "off", "false", "disable"]:
+        enabled = False
+
+cacheDirectory: pathlib.Path = pathlib.Path(
+    os.environ.get(
+        "PHAB_CACHE_DIRECTORY",
+        pathlib.Path.home() / ".cache" / "phab"
+    )
+)
+"""
+Directory where cache files are stored. By default it is `~/.cache/phab`,
+and it can be overridden with `PHAB_CACHE_DIRECTORY` environment variable.
+"""
+
+cacheFileName: str = "cache.sqlite"
+"""
+Name of the SQLite database file inside `cacheDirectory`.
+"""
+
+negativeEntriesTTL: float = 7 * 24 * 60 * 60
+"""
+For how long (*in seconds*) to remember that something was not found.
+Positive results (*such as found identificators*) do not expire by default,
+but SIMBAD might get to know about a new object or a new identificator,
+so misses should be re-checked every once in a while.
+"""
+
+# SQLite connections cannot be shared between threads, so there is one
+# connection per thread (and per process, as forked processes inherit
+# the parent's thread-local data)
+_connections = threading.local()
+
+
+def _getConnection() -> sqlite3.Connection:
+    cacheFile: pathlib.Path = cacheDirectory / cacheFileName
+    connections: Dict[Tuple[int, str], sqlite3.Connection] = getattr(
+        _connections,
+        "byFile",
+        {}
+    )
+    connectionKey = (os.getpid(), str(cacheFile))
+    connection = connections.get(connectionKey)
+    if connection is None:
+        logger.debug(f"Opening cache database: {cacheFile}")
+        cacheDirectory.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(cacheFile, timeout=30)
+        # allows reading while some other process is writing
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            " ".join((
+                "CREATE TABLE IF NOT EXISTS entries (",
+                "namespace TEXT NOT NULL,",
+                "key TEXT NOT NULL,",
+                "value BLOB,",
+                "expires REAL,",
+                "PRIMARY KEY (namespace, key)",
+                ")"
+            ))
+        )
+        connection.commit()
+        connections[connectionKey] = connection
+        _connections.byFile = connections
+    return connection
+
+
+def normalizeIdentifier(name: str) -> str:
+    """
+    Normalize an object name/identificator for using it as a cache key:
+    collapse repeated whitespaces, trim leading/trailing ones and upper-case
+    everything. That way, for example, `Sz 66`, `SZ  66` (*note the two
+    spaces, which is how SIMBAD stores it*) and ` sz 66 ` all end up being
+    the same key.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import cache
+
+    print(cache.normalizeIdentifier("Sz  66"))
+    # SZ 66
+    ```
+    """
+    return " ".join(name.split()).upper()
+
+
+def getEntry(
+    namespace: str,
+    key: str
+) -> Tuple[bool, Any]:
+    """
+    Get a value from the cache. Returns a tuple of two values: whether
+    there is a (*not yet expired*) entry for this key, and the value itself.
+    The first one is needed to tell a cached `None`, which is a valid
+    value for "*nothing was found*", from a value that was never cached.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import cache
+
+    found, value = cache.getEntry("some-namespace", "some-key")
+    if found:
+        print(f"Cached value: {value}")
+    else:
+        print("There is nothing in the cache for this key")
+    ```
+    """
+    if not enabled:
+        return (False, None)
+
+    row = _getConnection().execute(
+        " ".join((
+            "SELECT value FROM entries",
+            "WHERE namespace = ? AND key = ?",
+            "AND (expires IS NULL OR expires > ?)"
+        )),
+        (namespace, key, time.time())
+    ).fetchone()
+    if row is None:
+        return (False, None)
+    return (True, pickle.loads(row[0]))
+
+
+def setEntry(
+    namespace: str,
+    key: str,
+    value: Any,
+    ttl: Optional[float] = None
+) -> None:
+    """
+    Put a value into the cache, replacing the existing entry for this key,
+    if any. The value can be anything that can be pickled. If `ttl`
+    (*in seconds*) is `None`, then the entry never expires.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import cache
+
+    cache.setEntry("some-namespace", "some-key", {"oid": 3308165})
+    # remember a miss for a day
+    cache.setEntry("some-namespace", "another-key", None, ttl=24 * 60 * 60)
+    ```
+    """
+    if not enabled:
+        return
+
+    connection = _getConnection()
+    connection.execute(
+        " ".join((
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires)",
+            "VALUES (?, ?, ?, ?)"
+        )),
+        (
+            namespace,
+            key,
+            pickle.dumps(value),
+            (time.time() + ttl) if ttl is not None else None
+        )
+    )
+    connection.commit()
+
+
+def deleteEntries(namespace: Optional[str] = None) -> None:
+    """
+    Delete all the entries of the given namespace from the cache,
+    or the entire cache, if `namespace` is `None`.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import cache
+
+    cache.deleteEntries("simbad-object-ids")
+    ```
+    """
+    if not enabled:
+        return
+
+    connection = _getConnection()
+    if namespace is None:
+        connection.execute("DELETE FROM entries")
+    else:
+        connection.execute(
+            "DELETE FROM entries WHERE namespace = ?",
+            (namespace,)
+        )
+    connection.commit()
@@ -0,0 +1,394 @@
+"""
+Downloading light curves products (*FITS files*) in parallel, with
+resuming interrupted downloads and with a local index of already
+downloaded products, so repeated requests for the same products do not
+go to the network at all.
+
+The index is kept in `utils.databases.cache`, so it is shared between
+runs and processes, and it is disabled together with the cache.
+"""
+
+import pathlib
+import os
+import hashlib
+import concurrent.futures
+import urllib.parse
+import pandas
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List
+)
+
+from .._lazy import lazyImport
+from ..databases import cache, throttling
+from ..logs.log import logger
+
+if TYPE_CHECKING:
+    import requests
+    import lightkurve
+else:
+    requests = lazyImport("requests")
+
+productsDirectory: Optional[pathlib.Path] = None
+"""
+Default directory for downloaded products. If it is `None`, then it is
+`products` subdirectory of `utils.databases.cache.cacheDirectory`.
+"""
+
+mastDownloadURL: str = "https://mast.stsci.edu/api/v0.1/Download/file"
+"""
+MAST endpoint for downloading a product by its `dataURI`.
+"""
+
+downloadChunkSize: int = 1024 * 1024
+"""
+Size (*in bytes*) of chunks in which files are downloaded and written.
+"""
+
+_productsCacheNamespace: str = "downloaded-products"
+
+
+def _getProductsDirectory(
+    directoryPath: Optional[Union[str, pathlib.Path]]
+) -> pathlib.Path:
+    if directoryPath is not None:
+        return pathlib.Path(directoryPath)
+    if productsDirectory is not None:
+        return productsDirectory
+    return cache.cacheDirectory / "products"
+
+
+def getProductURL(dataURI: str) -> str:
+    """
+    Get URL for downloading a product. Products from MAST search results
+    have URIs like `mast:TESS/product/some_lc.fits`, and those are
+    downloaded from `utils.databases.downloads.mastDownloadURL`. Anything
+    that already is an HTTP(S) URL is returned as it is.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import downloads
+
+    url = downloads.getProductURL(
+        "mast:TESS/product/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+    )
+    print(url)
+    ```
+    """
+    if dataURI.startswith(("http://", "https://")):
+        return dataURI
+    return f"{mastDownloadURL}?{urllib.parse.urlencode({'uri': dataURI})}"
+
+
+def getFileChecksum(filePath: Union[str, pathlib.Path]) -> str:
+    """
+    Calculate SHA-256 checksum of a file, reading it in chunks.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import downloads
+
+    checksum = downloads.getFileChecksum(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+    )
+    print(checksum)
+    ```
+    """
+    sha256 = hashlib.sha256()
+    with open(filePath, "rb") as f:
+        for chunk in iter(lambda: f.read(downloadChunkSize), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def downloadFile(
+    url: str,
+    filePath: Union[str, pathlib.Path],
+    expectedSize: Optional[int] = None,
+    expectedChecksum: Optional[str] = None,
+    timeout: float = 60
+) -> pathlib.Path:
+    """
+    Download a file. The data is written to a `.part` file next
+    to the target one, and if that file already exists (*because
+    a previous download was interrupted*), then only the rest of the file
+    is requested (*with HTTP `Range` header*). When the download is
+    complete, the size (*the expected one or the one from the server
+    response*) and the SHA-256 checksum (*if expected one is provided*)
+    are verified, and only then the `.part` file is renamed
+    to the target one. If verification fails, the `.part` file
+    is deleted and `ValueError` is raised.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import downloads
+
+    downloads.downloadFile(
+        "https://example.org/some_lc.fits",
+        "/tmp/some_lc.fits"
+    )
+    ```
+    """
+    targetFile = pathlib.Path(filePath)
+    targetFile.parent.mkdir(parents=True, exist_ok=True)
+    partFile = targetFile.with_name(f"{targetFile.name}.part")
+
+    alreadyHave: int = partFile.stat().st_size if partFile.exists() else 0
+    totalSize: Optional[int] = expectedSize
+    # if the expected size is known, then a complete `.part` file
+    # only needs to be verified
+    if expectedSize is None or alreadyHave < expectedSize:
+        if urllib.parse.urlparse(url).hostname == "mast.stsci.edu":
+            throttling.wait("mast")
+        headers: Dict[str, str] = {}
+        if alreadyHave > 0:
+            logger.debug(
+                f"Resuming download of [{url}] from byte {alreadyHave}"
+            )
+            headers["Range"] = f"bytes={alreadyHave}-"
+        response = requests.get(
+            url,
+            headers=headers,
+            stream=True,
+            timeout=timeout
+        )
+        if response.status_code == 416:  # Range Not Satisfiable
+            response.close()
+            logger.debug(
+                f"Cannot resume download of [{url}], starting over"
+            )
+            alreadyHave = 0
+            response = requests.get(url, stream=True, timeout=timeout)
+        with response:
+            response.raise_for_status()
+            if alreadyHave > 0 and response.status_code != 206:
+                logger.debug(
+                    f"Server does not support resuming, starting over [{url}]"
+                )
+                alreadyHave = 0
+            contentLength = response.headers.get("Content-Length")
+            # compressed responses are decompressed while reading,
+            # so their length says nothing about the file size
+            if (
+                totalSize is None
+                and contentLength is not None
+                and not response.headers.get("Content-Encoding")
+            ):
+                totalSize = alreadyHave + int(contentLength)
+            with open(partFile, "ab" if alreadyHave > 0 else "wb") as f:
+                for chunk in response.iter_content(
+                    chunk_size=downloadChunkSize
+                ):
+                    f.write(chunk)
+
+    downloadedSize = partFile.stat().st_size
+    if totalSize is not None and downloadedSize != totalSize:
+        partFile.unlink()
+        raise ValueError(
+            " ".join((
+                f"Downloaded file size ({downloadedSize}) of [{url}]",
+                f"does not match the expected size ({totalSize})"
+            ))
+        )
+    if expectedChecksum is not None:
+        checksum = getFileChecksum(partFile)
+        if checksum.lower() != expectedChecksum.lower():
+            partFile.unlink()
+            raise ValueError(
+                " ".join((
+                    f"Checksum of the downloaded [{url}] ({checksum})",
+                    f"does not match the expected one ({expectedChecksum})"
+                ))
+            )
+
+    os.replace(partFile, targetFile)
+    return targetFile
+
+
+def getCachedProduct(dataURI: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the index entry of a product (*its `path`, `size` and `sha256`*),
+    if it has been downloaded already and the file is still there
+    and has the same size.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import downloads
+
+    product = downloads.getCachedProduct(
+        "mast:TESS/product/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits"
+    )
+    if product is not None:
+        print(f"Already downloaded to {product['path']}")
+    ```
+    """
+    isCached, entry = cache.getEntry(_productsCacheNamespace, dataURI)
+    if not isCached or entry is None:
+        return None
+    productFile = pathlib.Path(entry["path"])
+    if (
+        not productFile.is_file()
+        or
+        productFile.stat().st_size != entry["size"]
+    ):
+        logger.debug(f"Cached product [{dataURI}] is missing or changed")
+        return None
+    return entry
+
+
+def _downloadProduct(
+    product: Dict[str, Any],
+    directory: pathlib.Path,
+    verifyCachedChecksums: bool,
+    timeout: float
+) -> Dict[str, Any]:
+    dataURI: str = product["dataURI"]
+    expectedSize: Optional[int] = (
+        int(product["size"])
+        if product.get("size") is not None
+        and not pandas.isna(product["size"])
+        else None
+    )
+    expectedChecksum: Optional[str] = (
+        str(product["checksum"])
+        if product.get("checksum") is not None
+        and not pandas.isna(product["checksum"])
+        else None
+    )
+
+    cachedProduct = getCachedProduct(dataURI)
+    if cachedProduct is not None and (
+        expectedSize is None or cachedProduct["size"] == expectedSize
+    ):
+        if (
+            not verifyCachedChecksums
+            or
+            getFileChecksum(cachedProduct["path"]) == cachedProduct["sha256"]
+        ):
+            return {**cachedProduct, "dataURI": dataURI, "downloaded": False}
+
+    fileName: str = (
+        str(product["productFilename"])
+        if product.get("productFilename")
+        and not pandas.isna(product["productFilename"])
+        else pathlib.PurePosixPath(urllib.parse.urlparse(dataURI).path).name
+    )
+    productFile = downloadFile(
+        getProductURL(dataURI),
+        directory / fileName,
+        expectedSize=expectedSize,
+        expectedChecksum=expectedChecksum,
+        timeout=timeout
+    )
+    entry: Dict[str, Any] = {
+        "path": str(productFile.resolve()),
+        "size": productFile.stat().st_size,
+        "sha256": getFileChecksum(productFile)
+    }
+    cache.setEntry(_productsCacheNamespace, dataURI, entry)
+    return {**entry, "dataURI": dataURI, "downloaded": True}
+
+
+def downloadProducts(
+    products: Union[
+        "lightkurve.SearchResult",
+        pandas.DataFrame,
+        List[Dict[str, Any]]
+    ],
+    directoryPath: Optional[Union[str, pathlib.Path]] = None,
+    maxWorkers: int = 4,
+    verifyCachedChecksums: bool = False,
+    timeout: float = 60
+) -> pandas.DataFrame:
+    """
+    Download products in parallel with `maxWorkers` threads. Products
+    can be a `lightkurve.SearchResult` (*for example, from
+    `utils.databases.lightcurves.searchLightCurves()`*), a Pandas table
+    or a list of dictionaries. Each product needs a `dataURI` (*MAST URI
+    or a plain URL*) and can have `size` (*expected size in bytes*),
+    `checksum` (*expected SHA-256 checksum*) and `productFilename`
+    (*name of the file in `directoryPath`*).
+
+    Products that are in the index of downloaded products and whose
+    files are still in place are not downloaded again. With
+    `verifyCachedChecksums` set to `True` their checksums are also
+    verified (*which means reading the files*), and products
+    with a mismatching checksum are downloaded again. Interrupted
+    downloads are resumed (*see
+    `utils.databases.downloads.downloadFile()`*).
+
+    Resulting table has a row per product: `dataURI`, `path` to the file,
+    its `size` and `sha256`, whether it was `downloaded` now or taken
+    from the index, and `error`, if it failed to download.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves, downloads
+
+    searchResult = lightcurves.searchLightCurves("LTT 1445 A")
+    products = downloads.downloadProducts(searchResult, maxWorkers=8)
+    print(products[["path", "downloaded", "error"]])
+
+    # this time nothing is downloaded
+    products = downloads.downloadProducts(searchResult)
+    ```
+    """
+    productsList: List[Dict[str, Any]]
+    if isinstance(products, list):
+        productsList = products
+    else:
+        productsTable = products
+        if not isinstance(productsTable, pandas.DataFrame):
+            # lightkurve search results
+            productsTable = products.table.to_pandas()
+        productsList = productsTable.to_dict(orient="records")
+    uniqueProducts: Dict[str, Dict[str, Any]] = {}
+    for product in productsList:
+        if not product.get("dataURI"):
+            raise ValueError(f"Product {product} has no dataURI")
+        # the same product can be in the list several times,
+        # but it should be downloaded only once
+        uniqueProducts.setdefault(product["dataURI"], product)
+    productsList = list(uniqueProducts.values())
+
+    directory = _getProductsDirectory(directoryPath)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    results: List[Dict[str, Any]] = []
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=maxWorkers
+    ) as executor:
+        futures = {
+            executor.submit(
+                _downloadProduct,
+                product,
+                directory,
+                verifyCachedChecksums,
+                timeout
+            ): product["dataURI"]
+            for product in productsList
+        }
+        for future in concurrent.futures.as_completed(futures):
+            dataURI = futures[future]
+            try:
+                results.append({**future.result(), "error": None})
+            except Exception as ex:
+                logger.error(f"Failed to download [{dataURI}]: {ex}")
+                results.append({"dataURI": dataURI, "error": str(ex)})
+
+    # keep the order of the products
+    order = {p["dataURI"]: i for i, p in enumerate(productsList)}
+    return pandas.DataFrame(
+        sorted(results, key=lambda r: order[r["dataURI"]]),
+        columns=["dataURI", "path", "size", "sha256", "downloaded", "error"]
+    )
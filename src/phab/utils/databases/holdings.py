@@ -0,0 +1,319 @@
+"""
+Keeping a watch-list of targets light curves up to date: finding which
+light curves products are not held locally yet and fetching only those.
+
+Held products are listed in a holdings file in the products directory,
+one row per product with its target, mission, author, sector, exposure
+time and where its file is. A product is considered to be held
+if there is a row with the same target, mission, author, sector
+and exposure time, and its file is still in place. So after a new data
+release refreshing a watch-list only downloads (*and converts*) the new
+sectors, and everything else is just a MAST search, which might also
+come from the cache.
+"""
+
+import pathlib
+import concurrent.futures
+import pandas
+
+from typing import Optional, Union, List, Dict, Literal
+
+from ..databases import cache, downloads, lightcurves
+from ..files import npy
+from ..logs.log import logger
+
+holdingsFileName: str = "_holdings.csv"
+"""
+Name of the holdings file in the products directory.
+"""
+
+_holdingsColumns: List[str] = [
+    "target",
+    "mission",
+    "author",
+    "sector",
+    "exptime",
+    "dataURI",
+    "path"
+]
+
+_holdingsKey: List[str] = ["target", "mission", "author", "sector", "exptime"]
+
+_missionsFitsTypes: Dict[str, Literal["tess", "kepler"]] = {
+    "TESS": "tess",
+    "Kepler": "kepler",
+    "K2": "kepler"
+}
+
+
+def readHoldings(
+    directoryPath: Optional[Union[str, pathlib.Path]] = None
+) -> pandas.DataFrame:
+    """
+    Read the holdings file of the products directory (*by default
+    the one of `utils.databases.downloads`*). If there is no holdings
+    file yet, then the table is empty.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import holdings
+
+    held = holdings.readHoldings("/path/to/products")
+    print(held.groupby("target")["sector"].count())
+    ```
+    """
+    holdingsFile = (
+        downloads._getProductsDirectory(directoryPath) / holdingsFileName
+    )
+    if not holdingsFile.is_file():
+        return pandas.DataFrame(columns=_holdingsColumns)
+    return pandas.read_csv(
+        holdingsFile,
+        dtype={"target": str, "sector": "Int64", "exptime": float}
+    )
+
+
+def _getHoldingsKeys(tbl: pandas.DataFrame) -> pandas.Series:
+    return pandas.Series(
+        list(zip(
+            tbl["target"].map(cache.normalizeIdentifier),
+            tbl["mission"],
+            tbl["author"],
+            tbl["sector"].astype(int),
+            tbl["exptime"].astype(float)
+        )),
+        index=tbl.index,
+        dtype=object
+    )
+
+
+def _searchProducts(
+    starName: str,
+    authorsToSearch: Optional[List[str]],
+    refreshSearch: bool
+) -> pandas.DataFrame:
+    searchResult = lightcurves.searchLightCurves(
+        starName,
+        authorsToSearch,
+        refresh=refreshSearch
+    )
+    if len(searchResult) == 0:
+        return pandas.DataFrame(
+            columns=[*_holdingsKey, "dataURI", "productFilename", "size"]
+        )
+    tbl: pandas.DataFrame = searchResult.table.to_pandas()
+    tbl = tbl[tbl["author"].isin(lightcurves.authors.keys())]
+    sectors = pandas.to_numeric(lightcurves.extractSectors(tbl))
+    unknownSectors = sectors.isna()
+    if unknownSectors.any():
+        logger.debug(
+            " ".join((
+                f"Skipping {unknownSectors.sum()} products of [{starName}]",
+                "without a sector"
+            ))
+        )
+    return pandas.DataFrame({
+        "target": starName,
+        "mission": tbl["author"].map(
+            {a: lightcurves.authors[a]["mission"] for a in lightcurves.authors}
+        ),
+        "author": tbl["author"],
+        "sector": sectors.astype("Int64"),
+        "exptime": tbl["exptime"].astype(float),
+        "dataURI": tbl["dataURI"],
+        "productFilename": tbl["productFilename"],
+        "size": tbl["size"]
+    })[~unknownSectors]
+
+
+def findNewProducts(
+    starNames: List[str],
+    held: Optional[pandas.DataFrame] = None,
+    authorsToSearch: Optional[List[str]] = None,
+    refreshSearch: bool = True,
+    maxWorkers: int = 8
+) -> pandas.DataFrame:
+    """
+    Search for light curves products of the stars with
+    `utils.databases.lightcurves.searchLightCurves` (*in parallel
+    by `maxWorkers` threads*) and get the ones that are not in `held`
+    (*a table from `utils.databases.holdings.readHoldings()`*), comparing
+    them by target, mission, author, sector and exposure time. Sectors
+    are extracted with `utils.databases.lightcurves.extractSectors()`,
+    and products without a sector are skipped.
+
+    By default MAST is queried regardless of the cached search results,
+    as the point is to find what is new there. Stars that failed
+    to be searched are logged and skipped.
+
+    Returns a table with `target`, `mission`, `author`, `sector`,
+    `exptime`, `dataURI`, `productFilename` and `size` columns, which can
+    be given to `utils.databases.downloads.downloadProducts()`.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import holdings
+
+    newProducts = holdings.findNewProducts(
+        ["LTT 1445 A", "TWA 20"],
+        holdings.readHoldings()
+    )
+    print(newProducts[["target", "mission", "sector", "exptime"]])
+    ```
+    """
+    uniqueNames: List[str] = list(dict.fromkeys(starNames))
+    productsByStar: Dict[str, pandas.DataFrame] = {}
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=maxWorkers
+    ) as executor:
+        futures = {
+            executor.submit(
+                _searchProducts,
+                starName,
+                authorsToSearch,
+                refreshSearch
+            ): starName
+            for starName in uniqueNames
+        }
+        for future in concurrent.futures.as_completed(futures):
+            starName = futures[future]
+            try:
+                productsByStar[starName] = future.result()
+            except Exception as ex:
+                logger.warning(
+                    f"Failed to search light curves of [{starName}]. {ex}"
+                )
+
+    found: List[pandas.DataFrame] = [
+        productsByStar[s] for s in uniqueNames if s in productsByStar
+    ]
+    products: pandas.DataFrame = (
+        pandas.concat(found, ignore_index=True) if found
+        else pandas.DataFrame(
+            columns=[*_holdingsKey, "dataURI", "productFilename", "size"]
+        )
+    )
+    if held is None or held.empty or products.empty:
+        return products
+
+    # products whose files are gone are not held anymore
+    held = held[[pathlib.Path(p).is_file() for p in held["path"]]]
+    heldKeys = set(_getHoldingsKeys(held))
+    isHeld = pandas.Series(
+        [k in heldKeys for k in _getHoldingsKeys(products)],
+        index=products.index,
+        dtype=bool
+    )
+    logger.debug(
+        " ".join((
+            f"Found {len(products)} products,",
+            f"{isHeld.sum()} of them are already held"
+        ))
+    )
+    return products[~isHeld].reset_index(drop=True)
+
+
+def refreshLightCurves(
+    starNames: List[str],
+    directoryPath: Optional[Union[str, pathlib.Path]] = None,
+    authorsToSearch: Optional[List[str]] = None,
+    refreshSearch: bool = True,
+    maxWorkers: int = 4,
+    convert: bool = True,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = "default"
+) -> pandas.DataFrame:
+    """
+    Bring light curves of a watch-list of stars up to date: find products
+    that are not held yet with `utils.databases.holdings.findNewProducts()`,
+    download only those with `utils.databases.downloads.downloadProducts()`
+    into the products directory and add them to its holdings file.
+    If `convert` is `True`, then new FITS files are also converted
+    with `utils.files.npy.openCachedLightCurve()`, so later they are
+    opened from the cache right away.
+
+    Returns a table of the new products with `target`, `mission`,
+    `author`, `sector`, `exptime`, `dataURI`, `path`, `downloaded`,
+    `converted` and `error` columns. Products that failed to download
+    are not added to the holdings, so they are tried again on the next
+    refresh.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import holdings
+
+    watchList = ["LTT 1445 A", "TWA 20", "Kepler-114"]
+    # the first time everything is downloaded
+    holdings.refreshLightCurves(watchList, "/path/to/products")
+    # and after that only new sectors
+    newSectors = holdings.refreshLightCurves(watchList, "/path/to/products")
+    print(newSectors[["target", "mission", "sector", "error"]])
+    ```
+    """
+    directory = downloads._getProductsDirectory(directoryPath)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    newProducts = findNewProducts(
+        starNames,
+        readHoldings(directory),
+        authorsToSearch,
+        refreshSearch,
+        maxWorkers=maxWorkers
+    )
+    resultColumns: List[str] = [
+        *_holdingsColumns,
+        "downloaded",
+        "converted",
+        "error"
+    ]
+    if newProducts.empty:
+        logger.debug("There are no new light curves products")
+        return pandas.DataFrame(columns=resultColumns)
+
+    downloaded = downloads.downloadProducts(
+        newProducts,
+        directory,
+        maxWorkers=maxWorkers
+    )
+    # the same product can be found for several targets
+    results = newProducts.merge(
+        downloaded[["dataURI", "path", "downloaded", "error"]],
+        on="dataURI",
+        how="left"
+    )
+
+    converted: List[bool] = []
+    for product in results.itertuples():
+        if not convert or not pandas.isna(product.error):
+            converted.append(False)
+            continue
+        try:
+            npy.openCachedLightCurve(
+                product.path,
+                fitsType=_missionsFitsTypes.get(str(product.mission)),
+                qualityBitmask=qualityBitmask
+            )
+            converted.append(True)
+        except Exception as ex:
+            logger.error(f"Failed to convert [{product.path}]: {ex}")
+            converted.append(False)
+    results["converted"] = converted
+
+    succeeded = results["error"].isna()
+    if succeeded.any():
+        holdingsFile = directory / holdingsFileName
+        results.loc[succeeded, _holdingsColumns].to_csv(
+            holdingsFile,
+            mode="a",
+            header=not holdingsFile.is_file(),
+            index=False
+        )
+    logger.debug(
+        " ".join((
+            f"Added {succeeded.sum()} new products,",
+            f"failed: {(~succeeded).sum()}"
+        ))
+    )
+    return results[resultColumns]
@@ -2,20 +2,46 @@
 Getting light curves data.
 """
 
-import lightkurve
-from astropy.table import Table
 import pandas
-from pandera import pandas as pandera
 import numpy
 import pathlib
 import re
-from packaging.version import Version
+import functools
+import concurrent.futures
 
-from typing import Optional, Dict, List, Pattern, Literal
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List,
+    Tuple,
+    Pattern,
+    Callable,
+    Literal,
+    overload
+)
 
+from .._lazy import lazyImport, importOptional
+from ..databases import cache, throttling, tap
 from ..files import file as fl
 from ..logs.log import logger
 
+if TYPE_CHECKING:
+    import lightkurve
+    from astropy import table as astropyTable
+    from astropy.io import fits as astropyFits
+    import pyarrow
+    from pandera import pandas as pandera
+else:
+    # those take a while to import (lightkurve alone takes seconds, as it
+    # also imports matplotlib), so they are imported on the first use
+    lightkurve = lazyImport("lightkurve")
+    astropyTable = lazyImport("astropy.table")
+    astropyFits = lazyImport("astropy.io.fits")
+    pandera = lazyImport("pandera.pandas")
+
 # apparently, one cannot set long/short threshold,
 # hence this dictionary
 #
@@ -79,24 +105,243 @@ missionSectorRegExes: Dict[str, Pattern] = {
 Dictionary of regular expressions for extracting sectors.
 """
 
-lightCurveFluxTableSchema = pandera.DataFrameSchema(
-    {
-        "time": pandera.Column(numpy.float64),
-        "flux": pandera.Column(numpy.float32, nullable=True),
-        "fluxError": pandera.Column(numpy.float32, nullable=True)
-    },
-    index=pandera.Index(int, unique=True),
-    strict=True,  # only specified columns are allowed
-    coerce=False  # do not cast other types to the specified one
-)
+searchResultsTTL: float = 24 * 60 * 60
+"""
+For how long (*in seconds*) search results
+of `utils.databases.lightcurves.searchLightCurves` are kept
+in `utils.databases.cache`. New sectors do not appear that often,
+so there is no need to query MAST every time.
+"""
+
+_searchResultsCacheNamespace: str = "lightkurve-search-results"
+
+fitsFluxColumns: Dict[str, str] = {
+    "TIME": "time",
+    "PDCSAP_FLUX": "flux",
+    "PDCSAP_FLUX_ERR": "fluxError"
+}
+"""
+Columns of light curves FITS files that are taken
+by `utils.databases.lightcurves.fitsToPandas` and their names
+in the resulting table. Other columns of the file (*centroids,
+backgrounds, SAP fluxes, etc*) are not read at all.
+"""
+
+
+lightCurveFluxTableColumns: Dict[str, Tuple[Any, bool]] = {
+    "time": (numpy.float64, False),
+    "flux": (numpy.float32, True),
+    "fluxError": (numpy.float32, True)
+}
+"""
+Columns of light curve flux tables: their types and whether they can
+have NaN values. Both the pandera schema
+(*`utils.databases.lightcurves.getLightCurveFluxTableSchema()`*) and
+the fast validator are made from this.
+"""
+
+validationLevel: Literal["full", "fast", "off"] = "full"
 """
-Table schema for light curve fluxes.
+Default validation level of light curve flux tables, which is used
+when a function does not get a particular level in its `validation`
+argument:
+
+- `full` - validation with the pandera schema;
+- `fast` - the same checks (*columns, their types, NaN times and
+index uniqueness*) done directly, without pandera, which is a lot
+cheaper, but its errors are plain `ValueError` exceptions with less
+details;
+- `off` - no validation at all, for tables that come from a trusted
+pipeline, such as bulk ingestion of thousands of files.
 """
 
 
+@functools.lru_cache(maxsize=None)
+def getLightCurveFluxTableSchema(
+    nullableTime: bool = False
+) -> "pandera.DataFrameSchema":
+    """
+    Table schema for light curve fluxes. It is created on the first call
+    (*so pandera is not imported until it is actually needed*) and then
+    the same schema object is returned. With `nullableTime` set to `True`
+    the time column is allowed to have NaN values (*for tables created
+    without dropping NaN times*).
+
+    The schema is also available as `lightCurveFluxTableSchema` attribute
+    of this module.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+
+    lightcurves.getLightCurveFluxTableSchema().validate(someTable)
+    ```
+    """
+    return pandera.DataFrameSchema(
+        {
+            c: pandera.Column(
+                dtype,
+                nullable=nullable or (c == "time" and nullableTime)
+            )
+            for c, (dtype, nullable) in lightCurveFluxTableColumns.items()
+        },
+        index=pandera.Index(int, unique=True),
+        strict=True,  # only specified columns are allowed
+        coerce=False  # do not cast other types to the specified one
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _getFastLightCurveFluxTableValidator(
+    nullableTime: bool
+) -> Callable[[pandas.DataFrame], None]:
+    # everything that does not depend on the table is prepared only once
+    expectedColumns = set(lightCurveFluxTableColumns.keys())
+    expectedTypes: List[Tuple[str, numpy.dtype]] = [
+        (c, numpy.dtype(dtype))
+        for c, (dtype, _) in lightCurveFluxTableColumns.items()
+    ]
+    notNullableColumns: List[str] = [
+        c for c, (_, nullable) in lightCurveFluxTableColumns.items()
+        if not (nullable or (c == "time" and nullableTime))
+    ]
+
+    def validate(tbl: pandas.DataFrame) -> None:
+        if len(tbl.columns) != len(expectedColumns) or (
+            set(tbl.columns) != expectedColumns
+        ):
+            raise ValueError(
+                " ".join((
+                    f"Light curve table columns {list(tbl.columns)}",
+                    f"do not match the expected ones {expectedColumns}"
+                ))
+            )
+        for c, dtype in expectedTypes:
+            if tbl[c].dtype != dtype:
+                raise ValueError(
+                    " ".join((
+                        f"Light curve table column [{c}] is {tbl[c].dtype},",
+                        f"but it should be {dtype}"
+                    ))
+                )
+        for c in notNullableColumns:
+            if numpy.isnan(tbl[c].values).any():
+                raise ValueError(
+                    f"Light curve table column [{c}] has NaN values"
+                )
+        # the usual index is a range, which is unique by definition
+        if not isinstance(tbl.index, pandas.RangeIndex):
+            if not pandas.api.types.is_integer_dtype(tbl.index.dtype):
+                raise ValueError(
+                    "Light curve table index should be of integer type"
+                )
+            if not tbl.index.is_unique:
+                raise ValueError("Light curve table index should be unique")
+
+    return validate
+
+
+def validateLightCurveFluxTable(
+    tbl: pandas.DataFrame,
+    validation: Optional[Literal["full", "fast", "off"]] = None,
+    nullableTime: bool = False
+) -> None:
+    """
+    Validate a light curve flux table at the given level or at the default
+    `utils.databases.lightcurves.validationLevel`, if the level is not set.
+    Raises an exception, if the table is not valid.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+
+    lightcurves.validateLightCurveFluxTable(someTable, validation="fast")
+
+    # or for everything
+    lightcurves.validationLevel = "off"
+    ```
+    """
+    level = validation if validation is not None else validationLevel
+    if level == "full":
+        getLightCurveFluxTableSchema(nullableTime).validate(tbl)
+    elif level == "fast":
+        _getFastLightCurveFluxTableValidator(nullableTime)(tbl)
+    elif level == "off":
+        pass
+    else:
+        raise ValueError(f"Unknown validation level: {level}")
+
+
+def __getattr__(name: str) -> Any:
+    if name == "lightCurveFluxTableSchema":
+        return getLightCurveFluxTableSchema()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def searchLightCurves(
+    starName: str,
+    authorsToSearch: Optional[List[str]] = None,
+    refresh: bool = False
+) -> "lightkurve.SearchResult":
+    """
+    Search for light curves products of a given star with
+    `lightkurve.search_lightcurve()`, but first check if there are already
+    search results for this star (*and the same set of authors*)
+    in `utils.databases.cache`. Found results are put into the cache
+    for `utils.databases.lightcurves.searchResultsTTL` seconds.
+
+    If `authorsToSearch` is `None`, then all the authors from
+    `utils.databases.lightcurves.authors` are searched. If `refresh` is
+    `True`, then cached results are ignored, and MAST is queried again.
+    Requests to MAST are limited with `utils.databases.throttling`.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+
+    searchResult = lightcurves.searchLightCurves("LTT 1445 A")
+    print(searchResult)
+    # this one does not go to MAST
+    searchResult = lightcurves.searchLightCurves("LTT 1445 A")
+    # and this one does
+    searchResult = lightcurves.searchLightCurves("LTT 1445 A", refresh=True)
+    ```
+    """
+    authorsList: List[str] = sorted(
+        authorsToSearch if authorsToSearch is not None else authors.keys()
+    )
+    cacheKey: str = " | ".join((
+        cache.normalizeIdentifier(starName),
+        ",".join(authorsList)
+    ))
+
+    if not refresh:
+        isCached, tbl = cache.getEntry(_searchResultsCacheNamespace, cacheKey)
+        if isCached:
+            logger.debug(f"Found cached search results for [{starName}]")
+            return lightkurve.SearchResult(tbl)
+
+    throttling.wait("mast")
+    lghtcrvs = lightkurve.search_lightcurve(
+        starName,
+        author=tuple(authorsList)
+    )
+    cache.setEntry(
+        _searchResultsCacheNamespace,
+        cacheKey,
+        lghtcrvs.table,
+        ttl=searchResultsTTL
+    )
+    return lghtcrvs
+
+
 def getLightCurveStats(
     starName: str,
-    detailed: bool = True
+    detailed: bool = True,
+    refresh: bool = False
 ) -> Dict[str, Dict]:
     """
     Gather statistics about available cadence values for a given star.
@@ -105,6 +350,10 @@ def getLightCurveStats(
     cadence values count by sectors, so resulting statistics will only
     contain total count of values.
 
+    Search results come from `utils.databases.lightcurves.searchLightCurves`,
+    so they might be cached. Set `refresh` to `True` to query MAST
+    regardless of the cache.
+
     Example:
 
     ``` py
@@ -161,90 +410,405 @@ def getLightCurveStats(
     """
     stats: Dict[str, Dict] = {}
 
-    lghtcrvs = lightkurve.search_lightcurve(
-        starName,
-        author=tuple(authors.keys())
-    )
+    lghtcrvs = searchLightCurves(starName, refresh=refresh)
     if len(lghtcrvs) != 0:
         tbl: pandas.DataFrame = lghtcrvs.table.to_pandas()[
             ["author", "exptime", "mission"]
         ]
         logger.debug(tbl)
+        stats = _searchTableToStats(tbl, detailed)
+    return stats
+
+
+def extractSectors(tbl: pandas.DataFrame) -> pandas.Series:
+    """
+    Extract sectors (*quarters, campaigns*) from `mission` values
+    (*such as `TESS Sector 07`*) of a table of found light curves products
+    with `utils.databases.lightcurves.missionSectorRegExes`, using
+    the regular expression of the mission of every product `author`.
+    Returns sectors as strings (*as they are in `mission` values*),
+    and products without a sector get NaN.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+
+    searchResult = lightcurves.searchLightCurves("LTT 1445 A")
+    sectors = lightcurves.extractSectors(searchResult.table.to_pandas())
+    print(sectors.dropna().astype(int).unique())
+    ```
+    """
+    authorMissions = tbl["author"].map(
+        {a: authors[a]["mission"] for a in authors}
+    )
+    # extract all the sectors at once (one regular expression
+    # per mission, applied to the entire column)
+    sectors = pandas.Series(numpy.nan, index=tbl.index, dtype=object)
+    missionGroups = tbl.groupby(authorMissions).groups
+    for mission, missionRows in missionGroups.items():
+        sectors.loc[missionRows] = tbl.loc[
+            missionRows,
+            "mission"
+        ].str.extract(missionSectorRegExes[str(mission)])[0]
+    return sectors
+
+
+def _searchTableToStats(
+    tbl: pandas.DataFrame,
+    detailed: bool,
+    skipUnknownSectors: bool = False
+) -> Dict[str, Dict]:
+    """
+    Statistics for `utils.databases.lightcurves.getLightCurveStats` out of
+    a table of found light curves products, which needs to have `author`,
+    `exptime` and `mission` columns. Products without a sector in their
+    `mission` value either fail the detailed statistics or, if
+    `skipUnknownSectors` is `True`, only count in the total.
+    """
+    stats: Dict[str, Dict] = {}
+
+    unknownAuthors = set(tbl["author"]) - set(authors.keys())
+    if unknownAuthors:
+        raise ValueError(f"Unknown author: {sorted(unknownAuthors)[0]}")
+
+    if detailed:
+        tbl = tbl.assign(sector=extractSectors(tbl))
+
+    author: str  # for mypy, but even then it is not happy with something else
+    for author, group in (tbl.groupby("author")):  # type:ignore[assignment] # ya hz
+        mission = authors[author]["mission"]
+        if not stats.get(mission):
+            stats[mission] = {}
+        for cadence in ["long", "short", "fast"]:
+            if cadence in authors[author]["cadence"]:
+                stats[mission][cadence] = {}
+                cadenceValues: List[int] = (
+                    authors[author]["cadence"][cadence]
+                )
+                cadences: pandas.DataFrame
+                if len(cadenceValues) > 0:  # take only specified values
+                    # perhaps both of these should be normalized to int
+                    cadences = group[group["exptime"].isin(cadenceValues)]
+                else:  # any value is good
+                    cadences = group
+
+                # total count
+                stats[mission][cadence]["total"] = len(cadences)
+
+                if detailed:
+                    # count by sectors
+                    missingSectors = cadences["sector"].isna()
+                    if missingSectors.any() and skipUnknownSectors:
+                        cadences = cadences[~missingSectors]
+                    elif missingSectors.any():
+                        raise ValueError(
+                            " ".join((
+                                "Couldn't extract sector from",
+                                "this mission value:",
+                                cadences.loc[missingSectors, "mission"].iloc[0]
+                            ))
+                        )
+                    # save the cadence/exptime too (assuming
+                    # that it is the same for every sector entry)
+                    bySectors = cadences.groupby(
+                        "sector",
+                        sort=False
+                    )["exptime"].agg(["first", "size"])
+                    stats[mission][cadence]["by-sectors"] = {
+                        sector: {
+                            "exptime": exptime,
+                            "count": int(count)
+                        }
+                        for sector, exptime, count in zip(
+                            bySectors.index,
+                            bySectors["first"].values,
+                            bySectors["size"].values
+                        )
+                    }
+    return stats
+
+
+def getLightCurveStatsForStars(
+    starNames: List[str],
+    maxWorkers: int = 8,
+    refresh: bool = False
+) -> pandas.DataFrame:
+    """
+    Gather statistics about available cadence values for many stars
+    at once. Stars are processed in parallel by `maxWorkers` threads,
+    each doing the same as `utils.databases.lightcurves.getLightCurveStats`,
+    while the rate of requests to MAST is limited
+    by `utils.databases.throttling`.
+
+    Returns a [Pandas](https://pandas.pydata.org) table with `star`,
+    `mission`, `cadence`, `sector`, `exptime` and `count` columns, one row
+    per sector. Stars without any light curves are not in the table, and
+    stars that failed to be processed are logged and skipped.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+
+    stats = lightcurves.getLightCurveStatsForStars(
+        ["LTT 1445 A", "Kepler-114", "TWA 20"],
+        maxWorkers=4
+    )
+    print(stats)
+    # total count of TESS fast cadence sectors per star
+    print(
+        stats.query("mission == 'TESS' and cadence == 'fast'")
+        .groupby("star")["count"].sum()
+    )
+    ```
+    """
+    columns: List[str] = [
+        "star",
+        "mission",
+        "cadence",
+        "sector",
+        "exptime",
+        "count"
+    ]
+    uniqueNames: List[str] = list(dict.fromkeys(starNames))
+    rowsByStar: Dict[str, List[tuple]] = {}
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=maxWorkers
+    ) as executor:
+        futures = {
+            executor.submit(
+                getLightCurveStats,
+                starName,
+                detailed=True,
+                refresh=refresh
+            ): starName
+            for starName in uniqueNames
+        }
+        for future in concurrent.futures.as_completed(futures):
+            starName = futures[future]
+            try:
+                stats = future.result()
+            except Exception as ex:
+                logger.warning(
+                    f"Failed to get light curves stats for [{starName}]. {ex}"
+                )
+                continue
+            rowsByStar[starName] = [
+                (starName, mission, cadence, sector, s["exptime"], s["count"])
+                for mission in stats
+                for cadence in stats[mission]
+                for sector, s in stats[mission][cadence]["by-sectors"].items()
+            ]
+            logger.debug(
+                " ".join((
+                    f"Got light curves stats for [{starName}]",
+                    f"({len(rowsByStar)}/{len(uniqueNames)})"
+                ))
+            )
+
+    return pandas.DataFrame(
+        # keep the original order of stars
+        [
+            r for starName in uniqueNames
+            for r in rowsByStar.get(starName, [])
+        ],
+        columns=columns
+    )
+
+
+def findLightCurveProductsInMAST(
+    targets: Union[List[str], pandas.DataFrame],
+    searchRadius: float = 2 / 3600,
+    chunkSize: int = 500
+) -> pandas.DataFrame:
+    """
+    Find light curves products for many targets at once with
+    a [CAOM](https://mast.stsci.edu/vo-tap/) TAP service of MAST
+    (*`mast` in `utils.databases.tap.services`*), instead of running
+    `lightkurve.search_lightcurve()` for every target.
+
+    Targets can be either:
+
+    - a list of names, which are compared with `target_name` values
+    in the `ivoa.obscore` table. Note that MAST uses its own target names,
+    for example TIC IDs for TESS (*`266744225`*) or KIC/EPIC IDs for Kepler
+    and K2 (*`kplr011904151`*), so you might need to find those first,
+    for example with
+    `utils.databases.simbad.findIdentificatorsFromOtherCataloguesInBulk`;
+    - a [Pandas](https://pandas.pydata.org) table with `name`, `ra`
+    and `dec` columns (*in degrees*), which is uploaded to the service,
+    and then products are matched by coordinates within `searchRadius`
+    (*in degrees*).
+
+    Returns a Pandas table with `target`, `author`, `exptime`, `mission`
+    and `obs_id` columns, where `author`, `exptime` and `mission` have
+    the same meaning and format as in `lightkurve.search_lightcurve()`
+    results. Kepler observations in CAOM cover all the quarters at once,
+    so their `mission` value is just `Kepler` without a quarter.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    import pandas
+
+    products = lightcurves.findLightCurveProductsInMAST(
+        pandas.DataFrame(
+            {
+                "name": ["LTT 1445 A", "Kepler-114"],
+                "ra": [45.4625, 298.0946],
+                "dec": [-16.5934, 42.4553]
+            }
+        )
+    )
+    print(products)
+    ```
+    """
+    columns: List[str] = ["target", "author", "exptime", "mission", "obs_id"]
+    selectAndFilter: Dict[str, str] = {
+        "select": " ".join((
+            "SELECT {target} AS target, o.provenance_name AS author,",
+            "o.t_exptime AS exptime, o.obs_id"
+        )),
+        "where": " ".join((
+            "o.dataproduct_type = 'timeseries'",
+            # light curves of some authors (*such as TESS-SPOC*) are
+            # high level science products, which are in their own collection
+            "AND o.obs_collection IN ({})".format(
+                tap.valuesToAdqlList(
+                    sorted(set(a["mission"] for a in authors.values()))
+                    + ["HLSP"]
+                )
+            ),
+            "AND o.provenance_name IN ({})".format(
+                tap.valuesToAdqlList(list(authors.keys()))
+            )
+        ))
+    }
+
+    products: Optional[pandas.DataFrame] = None
+    if isinstance(targets, pandas.DataFrame):
+        missingColumns = {"name", "ra", "dec"} - set(targets.columns)
+        if missingColumns:
+            raise ValueError(
+                f"Targets table has no columns: {sorted(missingColumns)}"
+            )
+        results = tap.queryService(
+            tap.getServiceEndpoint("mast"),
+            " ".join((
+                selectAndFilter["select"].format(target="t.name"),
+                "FROM ivoa.obscore AS o",
+                "JOIN TAP_UPLOAD.targets AS t ON 1 = CONTAINS(",
+                "POINT('ICRS', o.s_ra, o.s_dec),",
+                f"CIRCLE('ICRS', t.ra, t.dec, {searchRadius}))",
+                f"WHERE {selectAndFilter['where']}"
+            )),
+            tryToReExecuteOnFailure=False,
+            uploads={
+                "targets": astropyTable.Table.from_pandas(
+                    targets[["name", "ra", "dec"]]
+                )
+            }
+        )
+        if results:
+            products = results.to_table().to_pandas()
+    else:
+        products = tap.queryServiceInChunks(
+            tap.getServiceEndpoint("mast"),
+            " ".join((
+                selectAndFilter["select"].format(target="o.target_name"),
+                "FROM ivoa.obscore AS o",
+                f"WHERE {selectAndFilter['where']}",
+                "AND o.target_name IN ({values})"
+            )),
+            list(dict.fromkeys(targets)),
+            chunkSize
+        )
+
+    if products is None:
+        return pandas.DataFrame(columns=columns)
+
+    # make `mission` values look like the ones in lightkurve search results
+    sectorsInObsIDs: Dict[str, Tuple[str, Pattern]] = {
+        "TESS": (
+            "Sector",
+            # tess2019006130736-s0007-0000000266744225-0131-s
+            # hlsp_tess-spoc_tess_phot_0000000266744225-s0007_tess_v1_lc
+            re.compile(r"-s(\d{4})[-_]")
+        ),
+        "K2": (
+            "Campaign",
+            # ktwo201367065-c01_lc
+            re.compile(r"-c(\d+)_")
+        )
+    }
+    products["mission"] = products["author"].map(
+        {a: authors[a]["mission"] for a in authors}
+    )
+    for mission, (sectorWord, sectorRE) in sectorsInObsIDs.items():
+        missionRows = products["mission"] == mission
+        sectors = pandas.to_numeric(
+            products.loc[missionRows, "obs_id"].str.extract(sectorRE)[0]
+        )
+        knownSectors = sectors.notna()
+        products.loc[sectors[knownSectors].index, "mission"] = [
+            f"{mission} {sectorWord} {int(sector):02d}"
+            for sector in sectors[knownSectors]
+        ]
+
+    return products[columns].reset_index(drop=True)
+
+
+def getLightCurveStatsFromMAST(
+    targets: Union[List[str], pandas.DataFrame],
+    detailed: bool = True,
+    searchRadius: float = 2 / 3600
+) -> Dict[str, Dict[str, Dict]]:
+    """
+    Gather statistics about available cadence values for many targets
+    at once, based on products found
+    with `utils.databases.lightcurves.findLightCurveProductsInMAST`.
+    Returns a dictionary of targets with statistics in the same format
+    as `utils.databases.lightcurves.getLightCurveStats`, except that
+    Kepler products without a quarter only count in the totals.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+
+    stats = lightcurves.getLightCurveStatsFromMAST(["266744225", "98796344"])
+    for target in stats:
+        print(f"{target}: {stats[target]}")
+    ```
+    """
+    stats: Dict[str, Dict[str, Dict]] = {}
+
+    products = findLightCurveProductsInMAST(targets, searchRadius)
+    for target, group in products.groupby("target", sort=False):
+        stats[str(target)] = _searchTableToStats(
+            group,
+            detailed,
+            skipUnknownSectors=True
+        )
 
-        author: str  # for mypy, but even then it is not happy with something else
-        for author, group in (tbl.groupby("author")):  # type:ignore[assignment] # ya hz
-            if author not in authors:
-                raise ValueError(f"Unknown author: {author}")
-            mission = authors[author]["mission"]
-            if not stats.get(mission):
-                stats[mission] = {}
-            for cadence in ["long", "short", "fast"]:
-                if cadence in authors[author]["cadence"]:
-                    stats[mission][cadence] = {}
-                    cadenceValues: List[int] = (
-                        authors[author]["cadence"][cadence]
-                    )
-                    cadences: pandas.DataFrame
-                    if len(cadenceValues) > 0:  # take only specified values
-                        # perhaps both of these should be normalized to int
-                        cadences = group.query("exptime == @cadenceValues")
-                    else:  # any value is good
-                        cadences = group
-
-                    # total count
-                    stats[mission][cadence]["total"] = len(cadences)
-
-                    if detailed:
-                        # count by sectors
-                        stats[mission][cadence]["by-sectors"] = {}
-                        for m in cadences["mission"]:
-                            # logger.debug(cadences.query("mission == @m")[
-                            #     "exptime"
-                            # ].values)
-                            sectorMatch = re.search(
-                                missionSectorRegExes[mission],
-                                m
-                            )
-                            if not sectorMatch:
-                                raise ValueError(
-                                    " ".join((
-                                        "Couldn't extract sector from",
-                                        f"this mission value: {m}"
-                                    ))
-                                )
-                            sector = sectorMatch.group(1)
-                            if not stats[mission][cadence]["by-sectors"].get(
-                                sector
-                            ):  # this sector hasn't been added yet
-                                stats[mission][cadence]["by-sectors"][
-                                    sector
-                                ] = {}
-                                # save the cadence/exptime too (assuming
-                                # that it is the same for every sector entry)
-                                stats[mission][cadence]["by-sectors"][sector][
-                                    "exptime"
-                                ] = cadences.query("mission == @m")[
-                                    "exptime"
-                                ].values[0]  # there must be a better way
-                            try:
-                                stats[mission][cadence][
-                                    "by-sectors"
-                                ][sector]["count"] += 1
-                            except KeyError:
-                                stats[mission][cadence][
-                                    "by-sectors"
-                                ][sector]["count"] = 1
     return stats
 
 
 def getLightCurveIDs(
-    starName: str
+    starName: str,
+    refresh: bool = False
 ) -> Dict[str, List[str]]:
     """
     Based on available cadence values statistics for a given star,
     get names of missions and cadences. For instance, in order to pass
     them to `altaipony.lcio.from_mast()`.
 
+    The statistics come from `utils.databases.lightcurves.getLightCurveStats`,
+    and the `refresh` argument is passed to it.
+
     Example:
 
     ``` py
@@ -280,7 +844,8 @@ def getLightCurveIDs(
 
     stats: Dict[str, Dict] = getLightCurveStats(
         starName,
-        detailed=False
+        detailed=False,
+        refresh=refresh
     )
     if not stats:
         raise ValueError("Didn't find any results for this star")
@@ -317,20 +882,162 @@ def getLightCurveIDs(
     return lightCurveIDs
 
 
+@overload
+def fluxColumnsToOutput(
+    columns: Dict[str, numpy.ndarray],
+    output: Literal["pandas"] = ...
+) -> pandas.DataFrame:
+    ...
+
+
+@overload
+def fluxColumnsToOutput(
+    columns: Dict[str, numpy.ndarray],
+    output: Literal["numpy"]
+) -> Dict[str, numpy.ndarray]:
+    ...
+
+
+@overload
+def fluxColumnsToOutput(
+    columns: Dict[str, numpy.ndarray],
+    output: Literal["arrow"]
+) -> "pyarrow.Table":
+    ...
+
+
+@overload
+def fluxColumnsToOutput(
+    columns: Dict[str, numpy.ndarray],
+    output: Literal["pandas", "numpy", "arrow"] = ...
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    ...
+
+
+def fluxColumnsToOutput(
+    columns: Dict[str, numpy.ndarray],
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Make a light curve table of the requested kind from a dictionary
+    of columns arrays (*such as `time`, `flux` and `fluxError`*):
+
+    - `pandas` - a Pandas table, created in one go from the arrays;
+    - `numpy` - the same dictionary of NumPy arrays, nothing is created;
+    - `arrow` - a [PyArrow](https://arrow.apache.org/docs/python/) table,
+    which requires `pyarrow` package (*`pip install phab-utils[arrow]`*).
+
+    The arrays are expected to be in native byte order, as both Pandas
+    and PyArrow do not work (*well*) with anything else.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    import numpy
+
+    tbl = lightcurves.fluxColumnsToOutput(
+        {
+            "time": numpy.array([1.0, 2.0, 3.0]),
+            "flux": numpy.array([10.0, 11.0, 9.0], dtype=numpy.float32),
+            "fluxError": numpy.array([0.1, 0.1, 0.2], dtype=numpy.float32)
+        },
+        output="arrow"
+    )
+
+    #print(tbl)
+    ```
+    """
+    if output == "pandas":
+        return pandas.DataFrame(columns, copy=False)
+    elif output == "numpy":
+        return columns
+    elif output == "arrow":
+        return importOptional("pyarrow", "arrow").table(columns)
+    else:
+        raise ValueError(f"Unknown output type: {output}")
+
+
+@overload
+def fitsToPandas(
+    fitsFilePath: str,
+    fitsType: Optional[Literal["tess", "kepler"]] = ...,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = ...,
+    dropNanTimes: bool = ...,
+    convertTimesToSeconds: bool = ...,
+    output: Literal["pandas"] = ...,
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> pandas.DataFrame:
+    ...
+
+
+@overload
+def fitsToPandas(
+    fitsFilePath: str,
+    fitsType: Optional[Literal["tess", "kepler"]] = ...,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = ...,
+    dropNanTimes: bool = ...,
+    convertTimesToSeconds: bool = ...,
+    *,
+    output: Literal["numpy"],
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> Dict[str, numpy.ndarray]:
+    ...
+
+
+@overload
+def fitsToPandas(
+    fitsFilePath: str,
+    fitsType: Optional[Literal["tess", "kepler"]] = ...,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = ...,
+    dropNanTimes: bool = ...,
+    convertTimesToSeconds: bool = ...,
+    *,
+    output: Literal["arrow"],
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> "pyarrow.Table":
+    ...
+
+
+@overload
+def fitsToPandas(
+    fitsFilePath: str,
+    fitsType: Optional[Literal["tess", "kepler"]] = ...,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = ...,
+    dropNanTimes: bool = ...,
+    convertTimesToSeconds: bool = ...,
+    output: Literal["pandas", "numpy", "arrow"] = ...,
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    ...
+
+
 def fitsToPandas(
     fitsFilePath: str,
     fitsType: Optional[Literal["tess", "kepler"]] = None,
     qualityBitmask: Literal["none", "default", "hard", "hardest"] = "default",
     dropNanTimes: bool = True,
-    convertTimesToSeconds: bool = False
-) -> pandas.DataFrame:
+    convertTimesToSeconds: bool = False,
+    output: Literal["pandas", "numpy", "arrow"] = "pandas",
+    validation: Optional[Literal["full", "fast", "off"]] = None
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
     """
     Open a generic light curves [FITS](https://en.wikipedia.org/wiki/FITS) file
     and create a Pandas table from it. Only the fluxes, their times
-    and errors columns are taken.
+    and errors columns are taken (*see
+    `utils.databases.lightcurves.fitsFluxColumns`*).
+
+    The file is memory-mapped, and only the columns that are needed
+    (*plus `QUALITY`, if `fitsType` is set*) are read and converted.
 
     Handles the big/little endians problem when converting from FITS to Pandas.
 
+    The `output` argument sets what kind of table is returned
+    (*see `utils.databases.lightcurves.fluxColumnsToOutput()`*), and
+    the schema validation is only done for `pandas` output. The `validation`
+    argument sets the validation level (*see
+    `utils.databases.lightcurves.validationLevel`*).
+
     Example:
 
     ``` py
@@ -345,101 +1052,181 @@ def fitsToPandas(
     )
 
     #print(pnd)
+
+    # just the arrays, without creating a Pandas table
+    arrays = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess",
+        output="numpy"
+    )
+
+    #print(arrays["flux"])
     ```
     """
-    lc = None
+    columns = _readFitsFluxColumns(
+        fitsFilePath,
+        fitsType,
+        qualityBitmask,
+        dropNanTimes,
+        convertTimesToSeconds
+    )
+
+    flux = fluxColumnsToOutput(columns, output)
+    if output == "pandas":
+        validateLightCurveFluxTable(
+            flux,
+            validation,
+            nullableTime=not dropNanTimes
+        )
+
+    return flux
+
+
+def _readFitsFluxColumns(
+    fitsFilePath: str,
+    fitsType: Optional[Literal["tess", "kepler"]],
+    qualityBitmask: Literal["none", "default", "hard", "hardest"],
+    dropNanTimes: bool,
+    convertTimesToSeconds: bool,
+    extraFitsColumns: Optional[Dict[str, str]] = None
+) -> Dict[str, numpy.ndarray]:
     fitsFile: Optional[pathlib.Path] = fl.fileExists(fitsFilePath)
     if fitsFile is None:
         raise ValueError(
             f"Provided path to [{fitsFilePath}] seems to be wrong"
         )
-    else:
-        lc = Table.read(fitsFile)
-
-    # exclude values which do not satisfy the required quality
-    if fitsType is not None:
-        msk = None
-        if fitsType == "tess":
-            msk = lightkurve.utils.TessQualityFlags.create_quality_mask(
-                quality_array=lc["QUALITY"],
-                bitmask=qualityBitmask
-            )
-        elif fitsType == "kepler":
-            msk = lightkurve.utils.KeplerQualityFlags.create_quality_mask(
-                quality_array=lc["QUALITY"],
-                bitmask=qualityBitmask
-            )
-        else:
-            print(
-                " ".join((
-                    "[WARNING] Unknown FITS type, don't know",
-                    "which quality mask to use"
-                ))
-            )
-        lc = lc[msk]
-
-    narr = numpy.array(lc)
-    # FITS stores data in big-endian, but pandas works with little-endian,
-    # so the byte order needs to be swapped
-    # https://stackoverflow.com/a/30284033/1688203
-    if Version(numpy.__version__) > Version("1.26.4"):
-        # if that doesn't work, then you might need to downgrade to 1.26.4
-        narr = narr.view(narr.dtype.newbyteorder()).byteswap()
-    else:
-        # have to ignore this in mypy
-        narr = narr.byteswap().newbyteorder()  # type: ignore[attr-defined]
 
-    # astropy.time does not(?) support NaN
-    if dropNanTimes:
-        nantimes = numpy.isnan(narr["TIME"].data)
-        if numpy.any(nantimes):
-            print(
-                " ".join((
-                    f"[DEBUG] {numpy.sum(nantimes)} rows were excluded,",
-                    "because their time values are NaN"
-                ))
+    columns: Dict[str, numpy.ndarray] = {}
+    # the file is memory-mapped, so only the pages of the needed columns
+    # are actually read from disk, and nothing gets copied until
+    # the selected rows of these columns are converted
+    with astropyFits.open(fitsFile, memmap=True) as fitsHDUs:
+        lcData = fitsHDUs[1].data
+
+        # exclude values which do not satisfy the required quality
+        msk: Optional[numpy.ndarray] = None
+        if fitsType is not None:
+            if fitsType == "tess":
+                msk = lightkurve.utils.TessQualityFlags.create_quality_mask(
+                    quality_array=lcData.field("QUALITY"),
+                    bitmask=qualityBitmask
+                )
+            elif fitsType == "kepler":
+                msk = lightkurve.utils.KeplerQualityFlags.create_quality_mask(
+                    quality_array=lcData.field("QUALITY"),
+                    bitmask=qualityBitmask
+                )
+            else:
+                print(
+                    " ".join((
+                        "[WARNING] Unknown FITS type, don't know",
+                        "which quality mask to use"
+                    ))
+                )
+
+        # astropy.time does not(?) support NaN
+        if dropNanTimes:
+            nantimes = numpy.isnan(lcData.field("TIME"))
+            if msk is not None:
+                # only count the rows that passed the quality mask
+                nantimes &= msk
+                msk = msk & ~nantimes
+            else:
+                msk = ~nantimes
+            if numpy.any(nantimes):
+                print(
+                    " ".join((
+                        f"[DEBUG] {numpy.sum(nantimes)} rows were excluded,",
+                        "because their time values are NaN"
+                    ))
+                )
+
+        for fitsColumn, column in {
+            **fitsFluxColumns,
+            **(extraFitsColumns or {})
+        }.items():
+            values = lcData.field(fitsColumn)
+            if msk is not None:
+                values = values[msk]
+            # FITS stores data in big-endian, but pandas works with
+            # native (little-endian) byte order, and `astype()` does both
+            # the swapping and the copying out of the memory-mapped file
+            columns[column] = values.astype(
+                values.dtype.newbyteorder("="),
+                copy=True
             )
-        narr = narr[~nantimes]
-
-    # apparently, one cannot just take columns from `lc`/`narr` directly,
-    # hence this intermediate table
-    pndraw = pandas.DataFrame(narr)
-    logger.debug(f"Light curve table columns: {pndraw.columns}")
-
-    flux = pandas.DataFrame(
-        columns=[
-            "time",
-            "flux",
-            "fluxError"
-        ]
-    )
-    flux["time"] = pndraw["TIME"]
-    flux["flux"] = pndraw["PDCSAP_FLUX"]
-    flux["fluxError"] = pndraw["PDCSAP_FLUX_ERR"]
 
-    # in case excluding NaN times right after `Table.read()` is less efficient
-    # if dropNanTimes:
-    #     flux = flux.dropna(subset=["time"])
+    logger.debug(f"Light curve table columns: {list(columns.keys())}")
 
     if convertTimesToSeconds:
-        flux["time"] = flux["time"] * 24 * 60 * 60
+        columns["time"] = columns["time"] * 24 * 60 * 60
 
-    if dropNanTimes:
-        lightCurveFluxTableSchema.validate(flux)
-    else:
-        lightCurveFluxTableSchema.update_column(
-            "time",
-            dtype=numpy.float64,
-            nullable=True
-        ).validate(flux)
+    return columns
 
-    return flux
 
+def _lightCurveColumnToArray(column: Any) -> numpy.ndarray:
+    """
+    Get a plain NumPy array in native byte order from a light curve
+    column, which can be a (*masked*) quantity. Masked values become NaN,
+    just like they do in `to_pandas()`.
+    """
+    mask = getattr(column, "mask", None)
+    values = getattr(column, "unmasked", column)
+    values = numpy.asarray(getattr(values, "value", values))
+    values = values.astype(values.dtype.newbyteorder("="), copy=False)
+    if mask is not None and numpy.any(mask):
+        values = numpy.where(mask, numpy.nan, values).astype(values.dtype)
+    return values
 
+
+@overload
 def lightCurveTessToPandas(
-    lightKurve: lightkurve.lightcurve.TessLightCurve,
-    convertTimesToSeconds: bool = False
+    lightKurve: "lightkurve.lightcurve.TessLightCurve",
+    convertTimesToSeconds: bool = ...,
+    output: Literal["pandas"] = ...,
+    validation: Optional[Literal["full", "fast", "off"]] = ...
 ) -> pandas.DataFrame:
+    ...
+
+
+@overload
+def lightCurveTessToPandas(
+    lightKurve: "lightkurve.lightcurve.TessLightCurve",
+    convertTimesToSeconds: bool = ...,
+    *,
+    output: Literal["numpy"],
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> Dict[str, numpy.ndarray]:
+    ...
+
+
+@overload
+def lightCurveTessToPandas(
+    lightKurve: "lightkurve.lightcurve.TessLightCurve",
+    convertTimesToSeconds: bool = ...,
+    *,
+    output: Literal["arrow"],
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> "pyarrow.Table":
+    ...
+
+
+@overload
+def lightCurveTessToPandas(
+    lightKurve: "lightkurve.lightcurve.TessLightCurve",
+    convertTimesToSeconds: bool = ...,
+    output: Literal["pandas", "numpy", "arrow"] = ...,
+    validation: Optional[Literal["full", "fast", "off"]] = ...
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    ...
+
+
+def lightCurveTessToPandas(
+    lightKurve: "lightkurve.lightcurve.TessLightCurve",
+    convertTimesToSeconds: bool = False,
+    output: Literal["pandas", "numpy", "arrow"] = "pandas",
+    validation: Optional[Literal["full", "fast", "off"]] = None
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
     """
     Converting a TESS light curve object to a Pandas table. In general,
     it does almost the same thing as
@@ -447,6 +1234,9 @@ def lightCurveTessToPandas(
     but here there it uses a TESS-specific reading function, and also
     there is no need to drop NaN times "manually" (*and fiddle with endians?*).
 
+    The `output` and `validation` arguments are the same as in
+    `utils.databases.lightcurves.fitsToPandas()`.
+
     Example:
 
     ``` py
@@ -475,24 +1265,21 @@ def lightCurveTessToPandas(
     #print(pnd)
     ```
     """
-    pndraw = lightKurve.to_pandas()
-    logger.debug(f"Light curve table columns: {pndraw.columns}")
-
-    flux = pandas.DataFrame(
-        columns=[
-            "time",
-            "flux",
-            "fluxError"
-        ]
-    )
-
-    flux["time"] = pndraw.index
-    flux["flux"] = pndraw["pdcsap_flux"].values
-    flux["fluxError"] = pndraw["pdcsap_flux_err"].values
+    # taking only the needed columns straight from the light curve,
+    # as `to_pandas()` would convert all of them
+    columns: Dict[str, numpy.ndarray] = {
+        # values in the light curve's time format (BTJD), the same
+        # as in the index of `to_pandas()` result
+        "time": _lightCurveColumnToArray(lightKurve.time.value),
+        "flux": _lightCurveColumnToArray(lightKurve["pdcsap_flux"]),
+        "fluxError": _lightCurveColumnToArray(lightKurve["pdcsap_flux_err"])
+    }
 
     if convertTimesToSeconds:
-        flux["time"] = flux["time"] * 24 * 60 * 60
+        columns["time"] = columns["time"] * 24 * 60 * 60
 
-    lightCurveFluxTableSchema.validate(flux)
+    flux = fluxColumnsToOutput(columns, output)
+    if output == "pandas":
+        validateLightCurveFluxTable(flux, validation)
 
     return flux
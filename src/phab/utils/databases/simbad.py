@@ -3,14 +3,92 @@ Getting data from [SIMBAD](https://simbad.u-strasbg.fr/simbad/)
 astronomical database.
 """
 
-from astroquery.simbad import Simbad
-from astroquery import __version__ as astroqueryVersion  # noqa: F401
+import pandas
 import re
+import functools
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Dict,
+    List,
+    Tuple,
+    Pattern,
+    cast
+)
+
+from .._lazy import lazyImport
+from ..logs.log import logger
+from ..databases import tap, cache
 
-from typing import Optional, Any, List
+if TYPE_CHECKING:
+    import astroquery
+    from astroquery import simbad as astroquerySimbad
+else:
+    # those take a while to import, so they are imported on the first use
+    astroquery = lazyImport("astroquery")
+    astroquerySimbad = lazyImport("astroquery.simbad")
 
-from ..logs.log import logger
-from ..databases import tap
+_objectIDsCacheNamespace: str = "simbad-object-ids"
+_otherIDsCacheNamespace: str = "simbad-other-ids"
+_aliasesCacheNamespace: str = "simbad-aliases"
+
+
+def __getattr__(name: str) -> Any:
+    # these used to be imported directly into this module,
+    # so they are still available from it
+    if name == "astroqueryVersion":
+        return astroquery.__version__
+    if name == "Simbad":
+        return astroquerySimbad.Simbad
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _getIDcolumnKey(ids: Any) -> str:
+    """
+    Get the key of identificators column in the table returned
+    by `astroquery.simbad.Simbad.query_objectids()`.
+    """
+    # before astroquery version 0.4.8 this table had
+    # an upper-cased `ID` column key, but starting
+    # with version 0.4.8 it is now lower-cased `id`
+    #
+    # https://github.com/astropy/astropy/issues/17695
+    idColumnKey: str = "ID"
+    # or compare `astroquery.__version__` with `0.4.7`
+    if idColumnKey not in ids.colnames:
+        logger.debug(
+            " ".join((
+                "There is no upper-cased [ID] key",
+                "in the resulting table, will try",
+                "with lower-cased [id] key"
+            ))
+        )
+        idColumnKey = idColumnKey.lower()  # "id"
+        if idColumnKey not in ids.colnames:
+            errorMsg = " ".join((
+                "SIMBAD results table has neither [ID]",
+                "nor [id] column"
+            ))
+            logger.error(errorMsg)
+            if len(ids.colnames) > 0:
+                logger.debug(
+                    " ".join((
+                        "Here are all the columns/keys",
+                        "in this table:",
+                        ", ".join(ids.colnames)
+                    ))
+                )
+            else:
+                logger.debug(
+                    " ".join((
+                        "There are no columns/keys",
+                        "in this table at all"
+                    ))
+                )
+            raise KeyError(errorMsg)
+    return idColumnKey
 
 
 def findIdentificatorFromAnotherCatalogue(
@@ -43,10 +121,49 @@ def findIdentificatorFromAnotherCatalogue(
     )
     print(otherID)
     ```
+
+    Results (*including the cases when nothing was found*) are stored
+    in `utils.databases.cache`, so the same star will not be queried again.
     """
+    cacheKey: str = " | ".join((
+        cache.normalizeIdentifier(starName),
+        cache.normalizeIdentifier(
+            f"{otherIDname} {otherIDversion}"
+            if otherIDversion else otherIDname
+        ),
+        "without prefix" if withoutIDprefix else "with prefix"
+    ))
+    isCached, otherID = cache.getEntry(_otherIDsCacheNamespace, cacheKey)
+    if isCached:
+        logger.debug(
+            f"Found cached [{otherIDname}] identificator for [{starName}]"
+        )
+        return otherID
+
+    otherID = _findIdentificatorFromAnotherCatalogue(
+        starName,
+        otherIDname,
+        otherIDversion,
+        withoutIDprefix
+    )
+    cache.setEntry(
+        _otherIDsCacheNamespace,
+        cacheKey,
+        otherID,
+        ttl=(None if otherID is not None else cache.negativeEntriesTTL)
+    )
+    return otherID
+
+
+def _findIdentificatorFromAnotherCatalogue(
+    starName: str,
+    otherIDname: str,
+    otherIDversion: Optional[str],
+    withoutIDprefix: bool
+) -> Optional[str]:
     otherID = None
 
-    otherIDs = Simbad.query_objectids(starName)
+    otherIDs = astroquerySimbad.Simbad.query_objectids(starName)
     if otherIDs is None:
         logger.warning(
             " ".join((
@@ -57,44 +174,7 @@ def findIdentificatorFromAnotherCatalogue(
     else:
         logger.debug(f"Checking SIMBAD IDs for [{starName}]:")
 
-        # before astroquery version 0.4.8 this table had
-        # an upper-cased `ID` column key, but starting
-        # with version 0.4.8 it is now lower-cased `id`
-        #
-        # https://github.com/astropy/astropy/issues/17695
-        idColumnKey: str = "ID"
-        # or compare `astroquery.__version__` with `0.4.7`
-        if idColumnKey not in otherIDs.colnames:
-            logger.debug(
-                " ".join((
-                    "There is no upper-cased [ID] key",
-                    "in the resulting table, will try",
-                    "with lower-cased [id] key"
-                ))
-            )
-            idColumnKey = idColumnKey.lower()  # "id"
-            if idColumnKey not in otherIDs.colnames:
-                errorMsg = " ".join((
-                    "SIMBAD results table has neither [ID]",
-                    "nor [id] column"
-                ))
-                logger.error(errorMsg)
-                if len(otherIDs.colnames) > 0:
-                    logger.debug(
-                        " ".join((
-                            "Here are all the columns/keys",
-                            "in this table:",
-                            ", ".join(otherIDs.colnames)
-                        ))
-                    )
-                else:
-                    logger.debug(
-                        " ".join((
-                            "There are no columns/keys",
-                            "in this table at all"
-                        ))
-                    )
-                raise KeyError(errorMsg)
+        idColumnKey: str = _getIDcolumnKey(otherIDs)
 
         for oid in otherIDs:
             idCandidate: str = oid[idColumnKey]
@@ -117,6 +197,210 @@ def findIdentificatorFromAnotherCatalogue(
     return otherID
 
 
+@functools.lru_cache(maxsize=None)
+def _catalogueIDprefixPattern(idToLookFor: str) -> Pattern:
+    """
+    Compiled (*once per catalogue name and version*) regular expression
+    for matching identificators of a particular catalogue and stripping
+    the catalogue prefix from them.
+    """
+    # whitespace after the catalogue name is required, otherwise
+    # `HD` would also match `HDE 123`
+    return re.compile(
+        rf"^{re.escape(idToLookFor)}\s+",
+        re.IGNORECASE
+    )
+
+
+def findIdentificatorsFromOtherCatalogues(
+    starName: str,
+    catalogues: List[Tuple[str, Optional[str]]],
+    withoutIDprefix: bool = True
+) -> Dict[str, Optional[str]]:
+    """
+    Finds object identificators from several catalogues at once. It does
+    the same thing as
+    `utils.databases.simbad.findIdentificatorFromAnotherCatalogue`
+    (*except that an identificator needs to start with the catalogue name
+    and version, not just contain it*), but the list of identificators
+    is fetched from SIMBAD only once, and then all the requested catalogues
+    are looked up in it.
+
+    Catalogues are passed as a list of `(name, version)` tuples, where
+    version can be `None`. Returns a dictionary with `name version` keys
+    and found identificators (*or `None`*) as values.
+
+    The list of identificators is stored in `utils.databases.cache`, so
+    the next call for the same star will not query SIMBAD at all, even
+    if it is for different catalogues.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import simbad
+
+    otherIDs = simbad.findIdentificatorsFromOtherCatalogues(
+        "TWA 20",
+        [
+            ("Gaia", "DR3"),
+            ("TIC", None),
+            ("2MASS", None)
+        ]
+    )
+    for catalogue, otherID in otherIDs.items():
+        print(f"{catalogue}: {otherID}")
+    ```
+    """
+    otherIDs: Dict[str, Optional[str]] = {}
+
+    cacheKey: str = cache.normalizeIdentifier(starName)
+    isCached, aliases = cache.getEntry(_aliasesCacheNamespace, cacheKey)
+    if isCached:
+        logger.debug(f"Found cached SIMBAD IDs for [{starName}]")
+    else:
+        aliases = None
+        ids = astroquerySimbad.Simbad.query_objectids(starName)
+        if ids is not None:
+            idColumnKey: str = _getIDcolumnKey(ids)
+            aliases = [str(i) for i in ids[idColumnKey]]
+        cache.setEntry(
+            _aliasesCacheNamespace,
+            cacheKey,
+            aliases,
+            ttl=(None if aliases is not None else cache.negativeEntriesTTL)
+        )
+    if aliases is None:
+        logger.warning(
+            " ".join((
+                "SIMBAD database doesn't have information",
+                f"about [{starName}]"
+            ))
+        )
+        return {
+            (f"{n} {v}" if v else n): None for n, v in catalogues
+        }
+
+    # index of identificators by their first word, which usually is
+    # the catalogue name, so looking up a catalogue does not require
+    # scanning all the identificators
+    aliasesIndex: Dict[str, List[str]] = {}
+    for a in aliases:
+        firstWord: str = a.split(maxsplit=1)[0].lower() if a.strip() else ""
+        aliasesIndex.setdefault(firstWord, []).append(a)
+
+    for n, v in catalogues:
+        idToLookFor: str = f"{n} {v}" if v else n
+        prefixRE = _catalogueIDprefixPattern(idToLookFor)
+        otherIDs[idToLookFor] = None
+        for a in aliasesIndex.get(n.split(maxsplit=1)[0].lower(), []):
+            if prefixRE.match(a):
+                otherIDs[idToLookFor] = (
+                    prefixRE.sub("", a, count=1) if withoutIDprefix else a
+                )
+                break
+
+    return otherIDs
+
+
+def findIdentificatorsFromOtherCataloguesInBulk(
+    starNames: List[str],
+    catalogues: List[Tuple[str, Optional[str]]],
+    withoutIDprefix: bool = True,
+    chunkSize: int = 500
+) -> pandas.DataFrame:
+    """
+    Finds identificators from several catalogues for a list of stars
+    at once. It does the same thing as
+    `utils.databases.simbad.findIdentificatorFromAnotherCatalogue`,
+    but instead of fetching the list of identificators for every star
+    separately, it joins the `ident` table with itself, so all the
+    identificators of all the stars are fetched with one query
+    per `chunkSize` stars (*see `utils.databases.tap.queryServiceInChunks`*).
+
+    Catalogues are passed as a list of `(name, version)` tuples, where
+    version can be `None`. An identificator belongs to a catalogue, if
+    it starts with the catalogue name and version (*case-insensitively*).
+
+    Returns a [Pandas](https://pandas.pydata.org) table indexed by
+    star names, with a column per catalogue (*named as `name version`*).
+    If there is no identificator from some catalogue for some star, then
+    the cell is `None`. Just like with `utils.databases.simbad.getObjectIDs`,
+    star names need to be exactly as SIMBAD has them.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import simbad
+
+    otherIDs = simbad.findIdentificatorsFromOtherCataloguesInBulk(
+        ["TWA 20", "A2 146", "PPM 725297"],
+        [
+            ("Gaia", "DR2"),
+            ("Gaia", "DR3"),
+            ("TIC", None),
+            ("2MASS", None)
+        ]
+    )
+    print(otherIDs)
+    print(otherIDs.at["TWA 20", "Gaia DR3"])
+    ```
+    """
+    uniqueNames: List[str] = list(dict.fromkeys(starNames))
+    idsToLookFor: List[str] = [
+        f"{n} {v}" if v else n for n, v in catalogues
+    ]
+
+    otherIDs = pandas.DataFrame(
+        None,
+        index=pandas.Index(uniqueNames, name="name"),
+        columns=idsToLookFor,
+        dtype=object
+    )
+
+    aliases = tap.queryServiceInChunks(
+        tap.getServiceEndpoint("simbad"),
+        " ".join((
+            "SELECT i1.id AS name, i2.id AS alias",
+            "FROM ident AS i1",
+            "JOIN ident AS i2 ON i1.oidref = i2.oidref",
+            "WHERE i1.id IN ({values})",
+            # there is no need to get all the identificators, only the ones
+            # that might belong to requested catalogues
+            "AND ({})".format(
+                " OR ".join(
+                    "LOWER(i2.id) LIKE '{} %'".format(
+                        i.lower().replace("'", "''")
+                    )
+                    for i in idsToLookFor
+                )
+            )
+        )),
+        uniqueNames,
+        chunkSize
+    )
+    if aliases is None:
+        logger.warning(
+            "SIMBAD database doesn't have information about any of these stars"
+        )
+        return otherIDs
+
+    for i in idsToLookFor:
+        prefixRE = _catalogueIDprefixPattern(i)
+        catalogueIDs = aliases[aliases["alias"].str.match(prefixRE)]
+        if catalogueIDs.empty:
+            continue
+        # if a star has more than one identificator from the same catalogue,
+        # then take the first one, like the non-bulk function does
+        catalogueIDs = catalogueIDs.drop_duplicates(subset="name")
+        otherIDs.loc[catalogueIDs["name"], i] = (
+            catalogueIDs["alias"].str.replace(prefixRE, "", regex=True)
+            if withoutIDprefix
+            else catalogueIDs["alias"]
+        ).values
+
+    return otherIDs.where(otherIDs.notna(), None)
+
+
 def getObjectID(
     starName: str,
     fallbackToLikeInsteadOfEqual: bool = False,
@@ -130,7 +414,9 @@ def getObjectID(
     The discovery process is to compare all the known object identificators
     with the `main_id` field value (*also from the `basic` table*). It is
     not clear, how exactly SIMBAD maintainers choose the main ID for an object,
-    so one has to iterate through all the identificators known to SIMBAD.
+    so one has to check all the identificators known to SIMBAD. That is done
+    with a single query, and if several identificators match, then the first
+    one (*in the order SIMBAD returns them*) is taken.
 
     ## Some problems with strings
 
@@ -143,7 +429,9 @@ def getObjectID(
 
     This workaround/fallback is disabled by default, so if you'd like to get
     those potentially incorrect results, then you can enable it by setting
-    `fallbackToLikeInsteadOfEqual` parameter to `True`.
+    `fallbackToLikeInsteadOfEqual` parameter to `True`. The `LIKE` conditions
+    are added to the same query, and an exact match always wins over
+    a `LIKE` match.
 
     Also, the `problematicIdentifiersPrefixes` parameter limits the list
     of such problematic identifiers, and so far `SZ  *` pattern (*note
@@ -179,8 +467,65 @@ def getObjectID(
     else:
         print("No results")
     ```
+
+    Results (*including the cases when nothing was found*) are stored
+    in `utils.databases.cache`, so the same star will not be queried again.
+    Names are normalized for the cache (*see
+    `utils.databases.cache.normalizeIdentifier`*), so `Sz 66` and `SZ  66`
+    share the same cache entry.
+    """
+    cacheKey: str = _objectIDcacheKey(
+        starName,
+        fallbackToLikeInsteadOfEqual,
+        problematicIdentifiersPrefixes
+    )
+    isCached, cachedValue = cache.getEntry(_objectIDsCacheNamespace, cacheKey)
+    if isCached:
+        logger.debug(f"Found cached SIMBAD object ID for [{starName}]")
+        return cachedValue[0] if cachedValue is not None else None
+
+    objectID = _getObjectID(
+        starName,
+        fallbackToLikeInsteadOfEqual,
+        problematicIdentifiersPrefixes
+    )
+    cache.setEntry(
+        _objectIDsCacheNamespace,
+        cacheKey,
+        objectID,
+        ttl=(None if objectID is not None else cache.negativeEntriesTTL)
+    )
+    return objectID[0] if objectID is not None else None
+
+
+def _objectIDcacheKey(
+    starName: str,
+    fallbackToLikeInsteadOfEqual: bool = False,
+    problematicIdentifiersPrefixes: List[str] = []
+) -> str:
+    # results found with the LIKE fallback might differ from the ones found
+    # without it, so those are cached separately
+    cacheKey: str = cache.normalizeIdentifier(starName)
+    if fallbackToLikeInsteadOfEqual:
+        cacheKey = " | ".join((
+            cacheKey,
+            "LIKE",
+            ",".join(problematicIdentifiersPrefixes).upper()
+        ))
+    return cacheKey
+
+
+def _getObjectID(
+    starName: str,
+    fallbackToLikeInsteadOfEqual: bool,
+    problematicIdentifiersPrefixes: List[str]
+) -> Optional[Tuple[int, str]]:
+    """
+    Does the actual querying for `utils.databases.simbad.getObjectID`.
+    Returns the object ID together with its `main_id` value.
     """
     oid: Optional[int] = None
+    mainID: Optional[str] = None
 
     # check if this name is already the main ID
     logger.debug(f"Checking whether [{starName}] is already the main ID")
@@ -194,6 +539,7 @@ def getObjectID(
     )
     if rez:
         oid = rez[0]["oid"]
+        mainID = starName
         logger.debug(
             " ".join((
                 "- yes, that is already the main ID,",
@@ -208,7 +554,7 @@ def getObjectID(
                 "all the other identificators"
             ))
         )
-        ids = Simbad.query_objectids(starName)
+        ids = astroquerySimbad.Simbad.query_objectids(starName)
         if ids is None:
             logger.warning(
                 " ".join((
@@ -219,136 +565,254 @@ def getObjectID(
         else:
             logger.debug(f"Checking SIMBAD IDs for [{starName}]:")
 
-            # before astroquery version 0.4.8 this table had
-            # an upper-cased `ID` column key, but starting
-            # with version 0.4.8 it is now lower-cased `id`
-            #
-            # https://github.com/astropy/astropy/issues/17695
-            idColumnKey: str = "ID"
-            # or compare `astroquery.__version__` with `0.4.7`
-            if idColumnKey not in ids.colnames:
-                logger.debug(
-                    " ".join((
-                        "There is no upper-cased [ID] key",
-                        "in the resulting table, will try",
-                        "with lower-cased [id] key"
-                    ))
-                )
-                idColumnKey = idColumnKey.lower()  # "id"
-                if idColumnKey not in ids.colnames:
-                    errorMsg = " ".join((
-                        "SIMBAD results table has neither [ID]",
-                        "nor [id] column"
-                    ))
-                    logger.error(errorMsg)
-                    if len(ids.colnames) > 0:
-                        logger.debug(
-                            " ".join((
-                                "Here are all the columns/keys",
-                                "in this table:",
-                                ", ".join(ids.colnames)
-                            ))
-                        )
-                    else:
-                        logger.debug(
-                            " ".join((
-                                "There are no columns/keys",
-                                "in this table at all"
-                            ))
-                        )
-                    raise KeyError(errorMsg)
+            idColumnKey: str = _getIDcolumnKey(ids)
 
+            idValues: List[str] = []
             for id in ids:
                 idValue: str = id[idColumnKey]
                 logger.debug(f"- {idValue}")
-
                 if idValue == starName:
                     logger.debug(
                         f"...the [{idValue}] has already been tested, skipping"
                     )
                     continue
+                idValues.append(idValue)
+
+            # fallback for known problematic identifiers: database returns
+            # identifiers like `Sz  66`, but the actual `main_id` field
+            # will contain all capital `SZ  *`, and for some reason
+            # it can only be found with LIKE instead of `=`
+            likePatterns: List[str] = []
+            if fallbackToLikeInsteadOfEqual:
+                likePatterns = [
+                    idValue.upper() for idValue in idValues
+                    if idValue.upper().startswith(
+                        tuple(problematicIdentifiersPrefixes)
+                    )
+                ]
+                if likePatterns:
+                    logger.debug(
+                        " ".join((
+                            "These are known problematic identifiers,",
+                            "so they will also be checked with LIKE:",
+                            ", ".join(f"[{p}]" for p in likePatterns)
+                        ))
+                    )
+
+            # all the identificators (and LIKE fallbacks) are checked
+            # with one query instead of a query per identificator
+            rez = None
+            if idValues:
                 rez = tap.queryService(
                     tap.getServiceEndpoint("simbad"),
                     " ".join((
-                        "SELECT oid",
+                        "SELECT oid, main_id, update_date",
                         "FROM basic",
-                        f"WHERE main_id = '{idValue}'"
-                    ))
+                        f"WHERE main_id IN ({tap.valuesToAdqlList(idValues)})",
+                        *[
+                            "OR main_id LIKE '{}'".format(
+                                p.replace("'", "''")
+                            )
+                            for p in likePatterns
+                        ]
+                    )),
+                    # values are already escaped
+                    tryToReExecuteOnFailure=False
                 )
-                if rez:
-                    oid = rez[0]["oid"]
-                    logger.debug(
-                        " ".join((
-                            f"The [{idValue}] is the main ID for",
-                            f"[{starName}], SIMBAD object ID is: {oid}"
-                        ))
-                    )
-                    break
-                else:  # fallback for known problematic identifiers
-                    # database returns identifiers like `Sz  66`,
-                    # but the actual `main_id` field will contain
-                    # all capital `SZ  *`
-                    idValueUppercased = idValue.upper()
-                    if (
-                        fallbackToLikeInsteadOfEqual
-                        and
-                        idValueUppercased.startswith(
-                            tuple(problematicIdentifiersPrefixes)
+            if rez:
+                candidates = rez.to_table().to_pandas()
+                candidatesMainIDs: List[str] = list(candidates["main_id"])
+
+                # exact match always beats LIKE match, and the order
+                # of identificators is preserved
+                for idValue in idValues:
+                    if idValue in candidatesMainIDs:
+                        oid = int(
+                            candidates["oid"].iloc[
+                                candidatesMainIDs.index(idValue)
+                            ]
                         )
-                        # idValueUppercased.startswith(
-                        #     # a bit of an abomination to uppercase the list
-                        #     tuple(
-                        #         list(
-                        #             map(
-                        #                 str.upper,
-                        #                 problematicIdentifiersPrefixes
-                        #             )
-                        #         )
-                        #     )
-                        # )
-                    ):
+                        mainID = idValue
                         logger.debug(
                             " ".join((
-                                "Did not find SIMBAD object ID for",
-                                f"[{idValue}], but it is a known problematic",
-                                "identifier, so will try a fallback with LIKE"
+                                f"The [{idValue}] is the main ID for",
+                                f"[{starName}], SIMBAD object ID is: {oid}"
                             ))
                         )
-                        rez = tap.queryService(
-                            tap.getServiceEndpoint("simbad"),
-                            # not sure if `ORDER BY update_date` is correct
-                            # here, but there is already nothing correct about
-                            # using `LIKE` instead of strict `=`, so
-                            " ".join((
-                                "SELECT TOP 1 oid",
-                                "FROM basic",
-                                f"WHERE main_id LIKE '{idValueUppercased}'",
-                                "ORDER BY update_date DESC"
-                            ))
+                        break
+
+                if oid is None and likePatterns:
+                    # not sure if ordering by `update_date` is correct
+                    # here, but there is already nothing correct about
+                    # using `LIKE` instead of strict `=`, so
+                    candidates = candidates.sort_values(
+                        "update_date",
+                        ascending=False,
+                        kind="stable"
+                    )
+                    likeMatch: Optional[Tuple[int, str]] = None
+                    for p in likePatterns:
+                        likeRE = re.compile(
+                            "".join(
+                                ".*" if c == "%" else "." if c == "_"
+                                else re.escape(c)
+                                for c in p
+                            )
                         )
-                        if rez:
-                            oid = rez[0]["oid"]
-                            logger.debug(
-                                " ".join((
-                                    f"The [{idValueUppercased}] is the main",
-                                    f"ID for [{starName}], SIMBAD object ID",
-                                    f"is: {oid}"
-                                ))
+                        matches = candidates[
+                            candidates["main_id"].map(
+                                lambda m: likeRE.fullmatch(m) is not None
                             )
-                            logger.warning(
-                                " ".join((
-                                    "Managed to find the SIMBAD object ID,",
-                                    "but be aware that it was found with",
-                                    "a fallback for problematic identifiers,",
-                                    "which means using LIKE in the WHERE",
-                                    "clause, so the result is not guaranteed",
-                                    "to be correct; and if you would like",
-                                    "to disable this fallback, then set",
-                                    "fallbackToLikeInsteadOfEqual to False"
-                                ))
+                        ]
+                        if not matches.empty:
+                            likeMatch = (
+                                int(matches["oid"].iloc[0]),
+                                matches["main_id"].iloc[0]
                             )
                             break
-    return oid
+                    # LIKE on the server side might be more relaxed than
+                    # this, so if nothing matched here, then take the most
+                    # recently updated of whatever was found
+                    if likeMatch is None:
+                        likeMatch = (
+                            int(candidates["oid"].iloc[0]),
+                            candidates["main_id"].iloc[0]
+                        )
+                    oid, mainID = likeMatch
+                    logger.debug(
+                        " ".join((
+                            f"The [{mainID}] is the main ID for",
+                            f"[{starName}], SIMBAD object ID is: {oid}"
+                        ))
+                    )
+                    logger.warning(
+                        " ".join((
+                            "Managed to find the SIMBAD object ID,",
+                            "but be aware that it was found with",
+                            "a fallback for problematic identifiers,",
+                            "which means using LIKE in the WHERE",
+                            "clause, so the result is not guaranteed",
+                            "to be correct; and if you would like",
+                            "to disable this fallback, then set",
+                            "fallbackToLikeInsteadOfEqual to False"
+                        ))
+                    )
+    return (oid, cast(str, mainID)) if oid is not None else None
+
+
+def getObjectIDs(
+    starNames: List[str],
+    chunkSize: int = 500
+) -> Tuple[pandas.DataFrame, List[str]]:
+    """
+    Finds object identificators for a list of stars at once. Unlike
+    `utils.databases.simbad.getObjectID`, which queries SIMBAD several times
+    for every star, this function joins the `ident` table (*all the known
+    identificators of all the objects*) with the `basic` table, so the whole
+    list is resolved with one query per `chunkSize` names
+    (*see `utils.databases.tap.queryServiceInChunks`*).
+
+    Returns a tuple of two values:
+
+    1. a [Pandas](https://pandas.pydata.org) table with `name`, `oid`
+    and `main_id` columns, one row per resolved name;
+    2. a list of names which SIMBAD does not know about.
+
+    The names need to be exactly as SIMBAD has them (*for example,
+    `* alf Cen` and not `alf Cen`*), so if some of them end up unresolved,
+    you might still want to try those one by one
+    with `utils.databases.simbad.getObjectID`.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import simbad
+
+    oids, unresolved = simbad.getObjectIDs(
+        ["A2 146", "PPM 725297", "CD-29 2360", "some-star-that-does-not-exist"]
+    )
+    print(oids)
+    if unresolved:
+        print(f"Could not resolve: {unresolved}")
+    ```
+    """
+    # unique names, but preserving the original order
+    uniqueNames: List[str] = list(dict.fromkeys(starNames))
+
+    cachedOIDs: List[Tuple[str, int, str]] = []
+    knownToBeMissing: List[str] = []
+    namesToQuery: List[str] = []
+    for n in uniqueNames:
+        isCached, cachedValue = cache.getEntry(
+            _objectIDsCacheNamespace,
+            _objectIDcacheKey(n)
+        )
+        if not isCached:
+            namesToQuery.append(n)
+        elif cachedValue is None:
+            knownToBeMissing.append(n)
+        else:
+            cachedOIDs.append((n, cachedValue[0], cachedValue[1]))
+    logger.debug(
+        " ".join((
+            "Names found in cache:",
+            f"{len(cachedOIDs) + len(knownToBeMissing)},",
+            f"names to query: {len(namesToQuery)}"
+        ))
+    )
+
+    queriedOIDs: Optional[pandas.DataFrame] = None
+    if namesToQuery:
+        queriedOIDs = tap.queryServiceInChunks(
+            tap.getServiceEndpoint("simbad"),
+            " ".join((
+                "SELECT i.id AS name, b.oid, b.main_id",
+                "FROM ident AS i",
+                "JOIN basic AS b ON i.oidref = b.oid",
+                "WHERE i.id IN ({values})"
+            )),
+            namesToQuery,
+            chunkSize
+        )
+    if queriedOIDs is not None:
+        queriedOIDs = queriedOIDs[["name", "oid", "main_id"]].drop_duplicates(
+            subset="name"
+        )
+        for n, oid, mainID in queriedOIDs.itertuples(index=False):
+            # only positive results are cached here, because names that
+            # are not exactly as SIMBAD has them might still be resolved
+            # by `getObjectID()`
+            cache.setEntry(
+                _objectIDsCacheNamespace,
+                _objectIDcacheKey(n),
+                (int(oid), mainID)
+            )
+
+    oids: pandas.DataFrame = pandas.DataFrame(
+        cachedOIDs,
+        columns=["name", "oid", "main_id"]
+    )
+    if queriedOIDs is not None:
+        oids = (
+            pandas.concat([oids, queriedOIDs], ignore_index=True)
+            if not oids.empty
+            else queriedOIDs
+        )
+    # restore the original order of names
+    resolvedNames = set(oids["name"])
+    oids = oids.set_index("name").reindex(
+        [n for n in uniqueNames if n in resolvedNames]
+    ).reset_index()
+
+    unresolved: List[str] = [
+        n for n in uniqueNames if n not in resolvedNames
+    ]
+    if unresolved:
+        logger.debug(
+            f"SIMBAD could not resolve {len(unresolved)} names: {unresolved}"
+        )
+
+    return oids, unresolved
 
 
 def getStellarParameter(
@@ -398,3 +862,49 @@ def getStellarParameter(
         )
 
     return rez
+
+
+def getStellarParameters(
+    starNames: List[str],
+    parameters: Dict[str, List[str]]
+) -> pandas.DataFrame:
+    """
+    A convenience function for querying SIMBAD for stellar parameters
+    of many stars at once:
+
+    1. Finds SIMBAD's object IDs by the star names
+    (*with `utils.databases.simbad.getObjectIDs`*);
+    2. Queries for stellar parameters by those object IDs
+    (*with `utils.databases.tap.getStellarParametersFromSimbadByObjectIDs`*).
+
+    Returns the same table as the latter, but with an additional `name`
+    column. Stars that could not be resolved are not in the table.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import simbad
+
+    rez = simbad.getStellarParameters(
+        ["PPM 725297", "CD-29 2360"],
+        {"mesVar": ["period"]}
+    )
+    for r in rez.itertuples():
+        print(f"{r.name}, {r.parameter}: {r.value} ({r.reference})")
+    ```
+    """
+    oids, unresolved = getObjectIDs(starNames)
+    if unresolved:
+        logger.warning(
+            f"Could not find SIMBAD object IDs for: {', '.join(unresolved)}"
+        )
+
+    params = tap.getStellarParametersFromSimbadByObjectIDs(
+        [int(oid) for oid in oids["oid"]],
+        parameters
+    )
+    return oids[["name", "oid"]].astype({"oid": int}).merge(
+        params,
+        on="oid",
+        how="inner"
+    )
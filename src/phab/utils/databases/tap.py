@@ -10,14 +10,30 @@ via [TAP](https://ivoa.net/documents/TAP/) interface.
 #     ...
 # ]
 
-import pyvo
+import pandas
 import re
 
-from typing import Optional, Dict, List, Tuple, Any, cast
-
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Dict,
+    List,
+    Tuple,
+    Any,
+    Sequence,
+    cast
+)
+
+from .._lazy import lazyImport
 from ..logs.log import logger
 from ..strings import extraction, conversion
 
+if TYPE_CHECKING:
+    import pyvo
+else:
+    # takes a while to import, so it is imported on the first use
+    pyvo = lazyImport("pyvo")
+
 services: Dict[str, Dict] = {
     "nasa":
     {
@@ -53,6 +69,11 @@ services: Dict[str, Dict] = {
     {
         "endpoint": "http://simbad.cds.unistra.fr/simbad/sim-tap/sync"
         # does not support CAST, so no "drops-leading-zero-on-cast-to-varchar"
+    },
+    "mast":
+    {
+        # CAOM (Common Archive Observation Model) service
+        "endpoint": "https://mast.stsci.edu/vo-tap/api/v0.1/caom"
     }
 }
 """
@@ -172,13 +193,18 @@ def escapeSpecialCharactersForAdql(rawQuery: str) -> str:
 def queryService(
     tapEndpoint: str,
     adqlQuery: str,
-    tryToReExecuteOnFailure: bool = True
-) -> Optional[pyvo.dal.tap.TAPResults]:
+    tryToReExecuteOnFailure: bool = True,
+    uploads: Optional[Dict[str, Any]] = None
+) -> Optional["pyvo.dal.tap.TAPResults"]:
     """
     Send [ADQL](https://ivoa.net/documents/ADQL/) request to the TAP service
     and return results. Those can be then converted to
     a [Pandas](https://pandas.pydata.org) table.
 
+    Tables passed in `uploads` (*for example, Astropy tables*) are uploaded
+    to the service together with the query, and then they can be joined
+    in the query as `TAP_UPLOAD.TABLE_NAME_HERE`.
+
     Example:
 
     ``` py
@@ -203,7 +229,7 @@ def queryService(
     logger.debug(f"ADQL query to execute: {adqlQuery}")
     results = None
     try:
-        results = tapService.search(adqlQuery)
+        results = tapService.search(adqlQuery, uploads=uploads)
     except pyvo.dal.exceptions.DALQueryError as ex:
         if tryToReExecuteOnFailure:
             logger.warning(
@@ -215,7 +241,7 @@ def queryService(
             )
             adqlQueryEscaped = escapeSpecialCharactersForAdql(adqlQuery)
             logger.debug(f"Escaped ADQL query to execute: {adqlQueryEscaped}")
-            results = tapService.search(adqlQueryEscaped)
+            results = tapService.search(adqlQueryEscaped, uploads=uploads)
         else:
             raise
     if results is not None and len(results) > 0:
@@ -225,6 +251,94 @@ def queryService(
         return None
 
 
+def valuesToAdqlList(values: Sequence[Any]) -> str:
+    """
+    Format a list of values for using it inside `IN (...)` in ADQL query.
+    Strings are put in single quotes (*with single quotes inside of them
+    escaped by doubling*), everything else is taken as it is.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import tap
+
+    print(tap.valuesToAdqlList(["A2 146", "NAME Teegarden's Star"]))
+    # 'A2 146', 'NAME Teegarden''s Star'
+    print(tap.valuesToAdqlList([3308165, 2325762]))
+    # 3308165, 2325762
+    ```
+    """
+    return ", ".join(
+        "'{}'".format(v.replace("'", "''")) if isinstance(v, str) else str(v)
+        for v in values
+    )
+
+
+def queryServiceInChunks(
+    tapEndpoint: str,
+    adqlQueryTemplate: str,
+    values: Sequence[Any],
+    chunkSize: int = 500
+) -> Optional[pandas.DataFrame]:
+    """
+    Execute the same [ADQL](https://ivoa.net/documents/ADQL/) query
+    for a (*potentially long*) list of values, splitting it into chunks
+    of `chunkSize` values each, so there is one request per chunk instead
+    of one request per value. The `{values}` placeholder in the query
+    template is replaced with the chunk values
+    (*formatted with `utils.databases.tap.valuesToAdqlList`*).
+
+    Results of all the chunks are concatenated into one
+    [Pandas](https://pandas.pydata.org) table. If there are no results
+    at all, then `None` is returned.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import tap
+
+    tbl = tap.queryServiceInChunks(
+        tap.getServiceEndpoint("simbad"),
+        " ".join((
+            "SELECT oid, main_id",
+            "FROM basic",
+            "WHERE main_id IN ({values})"
+        )),
+        ["A2 146", "CD-29 2360", "PPM 725297"],
+        chunkSize=2
+    )
+    if tbl is not None:
+        print(tbl)
+    else:
+        print("No results")
+    ```
+    """
+    if chunkSize < 1:
+        raise ValueError("Chunk size has to be a positive number")
+
+    frames: List[pandas.DataFrame] = []
+    for chunkStart in range(0, len(values), chunkSize):
+        chunk = values[chunkStart:chunkStart + chunkSize]
+        logger.debug(
+            " ".join((
+                f"Querying values {chunkStart + 1}-{chunkStart + len(chunk)}",
+                f"out of {len(values)}"
+            ))
+        )
+        results = queryService(
+            tapEndpoint,
+            adqlQueryTemplate.replace("{values}", valuesToAdqlList(chunk)),
+            # values are already escaped
+            tryToReExecuteOnFailure=False
+        )
+        if results:
+            frames.append(results.to_table().to_pandas())
+
+    if len(frames) == 0:
+        return None
+    return pandas.concat(frames, ignore_index=True)
+
+
 def getParametersThatAreDoubleInNASA() -> List[str]:
     """
     Get the list of parameters names in the NASA `ps` table that have
@@ -706,3 +820,90 @@ def getStellarParameterFromSimbadByObjectID(
         )
     else:
         return None
+
+
+def getStellarParametersFromSimbadByObjectIDs(
+    objectIDs: List[int],
+    parameters: Dict[str, List[str]],
+    chunkSize: int = 500
+) -> pandas.DataFrame:
+    """
+    Get the latest (*the newest*) published stellar parameters from SIMBAD
+    for a list of objects at once. It does the same thing as
+    `utils.databases.tap.getStellarParameterFromSimbadByObjectID`, but
+    instead of one query per object per parameter there is only one query
+    per measurements table (*per `chunkSize` objects, see
+    `utils.databases.tap.queryServiceInChunks`*), and the newest values
+    (*by `bibcode`*) are chosen on the client side.
+
+    Parameters are passed as a dictionary, where keys are measurements
+    tables (*such as `mesVar` or `mesFe_h`*) and values are lists
+    of parameters from those tables.
+
+    Returns a [Pandas](https://pandas.pydata.org) table with `oid`, `table`,
+    `parameter`, `value` and `reference` columns, one row per found object
+    parameter. Parameters that SIMBAD has no values for are not
+    in the table.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import tap
+
+    params = tap.getStellarParametersFromSimbadByObjectIDs(
+        [817576, 3308165],
+        {
+            "mesVar": ["period"],
+            "mesFe_h": ["teff", "log_g", "fe_h"]
+        }
+    )
+    print(params)
+    ```
+    """
+    frames: List[pandas.DataFrame] = []
+
+    uniqueObjectIDs: List[int] = list(dict.fromkeys(objectIDs))
+    for table, params in parameters.items():
+        results = queryServiceInChunks(
+            getServiceEndpoint("simbad"),
+            " ".join((
+                f"SELECT oidref, bibcode, {', '.join(params)}",
+                f"FROM {table}",
+                "WHERE oidref IN ({values})",
+                "AND ({})".format(
+                    " OR ".join(f"{p} IS NOT NULL" for p in params)
+                )
+            )),
+            uniqueObjectIDs,
+            chunkSize
+        )
+        if results is None:
+            logger.debug(f"No values in the [{table}] table")
+            continue
+        # newest references first
+        results = results.sort_values(
+            "bibcode",
+            ascending=False,
+            kind="stable"
+        )
+        for p in params:
+            newest = results[results[p].notna()].drop_duplicates(
+                subset="oidref"
+            )
+            frames.append(
+                pandas.DataFrame(
+                    {
+                        "oid": newest["oidref"].astype(int).values,
+                        "table": table,
+                        "parameter": p,
+                        "value": newest[p].astype(object).values,
+                        "reference": newest["bibcode"].values
+                    }
+                )
+            )
+
+    if len(frames) == 0:
+        return pandas.DataFrame(
+            columns=["oid", "table", "parameter", "value", "reference"]
+        )
+    return pandas.concat(frames, ignore_index=True)
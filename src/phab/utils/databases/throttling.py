@@ -0,0 +1,58 @@
+"""
+Limiting the rate of requests to remote services, so parallel
+querying does not overwhelm them (*and does not get banned by them*).
+"""
+
+import threading
+import time
+
+from typing import Dict
+
+from ..logs.log import logger
+
+requestsPerSecond: Dict[str, float] = {
+    "mast": 5.0
+}
+"""
+Maximum number of requests per second for each service. Services that
+are not in this dictionary are not limited.
+"""
+
+_lock = threading.Lock()
+_nextRequestTime: Dict[str, float] = {}
+
+
+def wait(serviceName: str) -> None:
+    """
+    Wait (*if needed*) until one more request to the service can be sent
+    without exceeding `utils.databases.throttling.requestsPerSecond` limit.
+    It is safe to call it from several threads at once - requests will be
+    spread out evenly.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import throttling
+    import lightkurve
+
+    throttling.requestsPerSecond["mast"] = 2
+    for starName in ["LTT 1445 A", "Kepler-114", "TWA 20"]:
+        throttling.wait("mast")
+        lightkurve.search_lightcurve(starName)
+    ```
+    """
+    rate = requestsPerSecond.get(serviceName)
+    if not rate or rate <= 0:
+        return
+
+    with _lock:
+        now = time.monotonic()
+        requestTime = max(now, _nextRequestTime.get(serviceName, now))
+        _nextRequestTime[serviceName] = requestTime + 1 / rate
+
+    delay = requestTime - now
+    if delay > 0:
+        logger.debug(
+            f"Waiting {delay:.3f} s before a request to [{serviceName}]"
+        )
+        time.sleep(delay)
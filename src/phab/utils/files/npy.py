@@ -0,0 +1,205 @@
+"""
+Cache of light curves converted from FITS files, stored as NumPy `.npy`
+files. The first time a FITS file is opened, it is converted
+with the same reading routine as `utils.databases.lightcurves.fitsToPandas()`,
+and the resulting arrays are saved as one packed `.npy` file
+(*a structured array with `time`, `flux` and `fluxError` fields in native
+byte order*). The next time the file is just memory-mapped, which
+is instant and does not copy anything.
+
+A cached light curve is only used if its FITS file has not changed
+since (*checked by modification time and size or by checksum*), and
+light curves converted with different quality bitmasks and other
+conversion arguments are cached separately.
+"""
+
+import pathlib
+import os
+import json
+import hashlib
+import numpy
+import pandas
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    Literal
+)
+
+from ..databases import cache, lightcurves
+from ..files import file as fl
+from ..logs.log import logger
+
+if TYPE_CHECKING:
+    import pyarrow
+
+lightCurvesCacheDirectory: Optional[pathlib.Path] = None
+"""
+Directory for cached light curves. If it is `None`, then it is
+`light-curves` subdirectory of `utils.databases.cache.cacheDirectory`.
+"""
+
+
+def _getLightCurvesCacheDirectory() -> pathlib.Path:
+    if lightCurvesCacheDirectory is not None:
+        return lightCurvesCacheDirectory
+    return cache.cacheDirectory / "light-curves"
+
+
+def _getFitsChecksum(fitsFile: pathlib.Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(fitsFile, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def openCachedLightCurve(
+    fitsFilePath: Union[str, pathlib.Path],
+    fitsType: Optional[Literal["tess", "kepler"]] = None,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = "default",
+    dropNanTimes: bool = True,
+    convertTimesToSeconds: bool = False,
+    invalidateBy: Literal["mtime", "checksum"] = "mtime",
+    output: Literal["pandas", "numpy", "arrow"] = "numpy"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Get a light curve from a FITS file, converting it only if there is
+    no cached conversion yet (*or the FITS file has changed*). Arguments
+    are the same as in `utils.databases.lightcurves.fitsToPandas()`.
+
+    The cached conversion is considered to be outdated, if modification
+    time or size of the FITS file are different from the cached ones,
+    or, if `invalidateBy` is set to `checksum`, if its SHA-256 checksum
+    is different (*which requires reading the entire file, but survives
+    copying and touching files*).
+
+    With `numpy` output (*which is the default here*) the arrays are
+    read-only views of the memory-mapped cache file, so nothing is read
+    from disk until the values are accessed.
+
+    Example:
+
+    ``` py
+    from phab.utils.files import npy
+
+    # converted and cached
+    lc = npy.openCachedLightCurve(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess",
+        qualityBitmask="default"
+    )
+    # just memory-mapped
+    lc = npy.openCachedLightCurve(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess",
+        qualityBitmask="default"
+    )
+    #print(lc["flux"])
+    ```
+    """
+    fitsFile: Optional[pathlib.Path] = fl.fileExists(fitsFilePath)
+    if fitsFile is None:
+        raise ValueError(
+            f"Provided path to [{fitsFilePath}] seems to be wrong"
+        )
+    fitsFile = fitsFile.resolve()
+
+    conversion: Dict[str, Any] = {
+        "fits": str(fitsFile),
+        "fitsType": fitsType,
+        "qualityBitmask": qualityBitmask,
+        "dropNanTimes": dropNanTimes,
+        "convertTimesToSeconds": convertTimesToSeconds
+    }
+    cacheKey = hashlib.sha256(
+        json.dumps(conversion, sort_keys=True).encode()
+    ).hexdigest()
+    cacheDirectory = _getLightCurvesCacheDirectory()
+    npyFile = cacheDirectory / f"{cacheKey}.npy"
+    metaFile = cacheDirectory / f"{cacheKey}.json"
+
+    fitsStat = fitsFile.stat()
+    source: Dict[str, Any] = {
+        "size": fitsStat.st_size,
+        "mtime": fitsStat.st_mtime
+    }
+    if invalidateBy == "checksum":
+        source = {"sha256": _getFitsChecksum(fitsFile)}
+    elif invalidateBy != "mtime":
+        raise ValueError(f"Unknown invalidation method: {invalidateBy}")
+
+    packed: Optional[numpy.ndarray] = None
+    if not cache.enabled:
+        logger.debug("Cache is disabled, light curve is not cached")
+    elif npyFile.is_file() and metaFile.is_file():
+        meta = json.loads(metaFile.read_text())
+        if all(meta.get(k) == v for k, v in source.items()):
+            packed = numpy.load(npyFile, mmap_mode="r")
+        else:
+            logger.debug(f"Cached light curve of [{fitsFile}] is outdated")
+
+    if packed is None:
+        columns = lightcurves._readFitsFluxColumns(
+            str(fitsFile),
+            fitsType,
+            qualityBitmask,
+            dropNanTimes,
+            convertTimesToSeconds
+        )
+        packed = numpy.empty(
+            len(columns["time"]),
+            dtype=[(c, v.dtype) for c, v in columns.items()]
+        )
+        for c, v in columns.items():
+            packed[c] = v
+
+    if cache.enabled and not isinstance(packed, numpy.memmap):
+        # written to temporary files first, so other processes
+        # never see a half-written cache entry
+        cacheDirectory.mkdir(parents=True, exist_ok=True)
+        temporarySuffix = f".{os.getpid()}.tmp"
+        with open(f"{npyFile}{temporarySuffix}", "wb") as f:
+            numpy.save(f, packed)
+        os.replace(f"{npyFile}{temporarySuffix}", npyFile)
+        meta = {**conversion, **source}
+        with open(f"{metaFile}{temporarySuffix}", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{metaFile}{temporarySuffix}", metaFile)
+        logger.debug(f"Cached light curve of [{fitsFile}] in [{npyFile}]")
+
+        packed = numpy.load(npyFile, mmap_mode="r")
+
+    lc = lightcurves.fluxColumnsToOutput(
+        {c: packed[c] for c in packed.dtype.names},  # type: ignore[union-attr]
+        output
+    )
+    if output == "pandas":
+        lightcurves.validateLightCurveFluxTable(
+            lc,
+            nullableTime=not dropNanTimes
+        )
+    return lc
+
+
+def deleteCachedLightCurves() -> None:
+    """
+    Delete all cached light curves.
+
+    Example:
+
+    ``` py
+    from phab.utils.files import npy
+
+    npy.deleteCachedLightCurves()
+    ```
+    """
+    cacheDirectory = _getLightCurvesCacheDirectory()
+    if not cacheDirectory.is_dir():
+        return
+    for cachedFile in cacheDirectory.iterdir():
+        if cachedFile.suffix in [".npy", ".json", ".tmp"]:
+            cachedFile.unlink()
@@ -0,0 +1,350 @@
+"""
+Storing light curves in a [Parquet](https://parquet.apache.org) dataset,
+which is a lot faster to read than parsing the original FITS files
+over and over again.
+
+The store is a directory with Hive-style partitions by mission, target
+and sector (*`mission=TESS/target=266744225/sector=7/*.parquet`*),
+one Parquet file per ingested FITS file, plus a manifest file with the list
+of already ingested FITS files.
+
+Requires `pyarrow` package (*`pip install phab-utils[arrow]`*).
+"""
+
+import pathlib
+import os
+import concurrent.futures
+import pandas
+
+from typing import TYPE_CHECKING, Optional, Union, List, Dict, Any, Literal
+
+from .._lazy import lazyImport, importOptional
+from ..databases import lightcurves
+from ..files import file as fl
+from ..logs.log import logger
+
+if TYPE_CHECKING:
+    from astropy.io import fits as astropyFits
+else:
+    astropyFits = lazyImport("astropy.io.fits")
+
+manifestFileName: str = "_manifest.csv"
+"""
+Name of the manifest file in the store directory. It has one row
+per ingested FITS file: its path, size and modification time
+(*in integer nanoseconds, so it is compared exactly*), what
+mission/target/sector it is, how many rows it had and where its Parquet
+file is. The name starts with `_`, so the file is not considered to be
+a part of the dataset.
+"""
+
+_manifestColumns: List[str] = [
+    "fits",
+    "size",
+    "mtime",
+    "mission",
+    "target",
+    "sector",
+    "rows",
+    "parquet"
+]
+
+
+def _getFitsPartition(fitsFile: pathlib.Path) -> Dict[str, Any]:
+    """
+    Get mission, target and sector (*quarter/campaign*) of a light curve
+    from the primary header of its FITS file.
+    """
+    header = astropyFits.getheader(fitsFile, 0)
+    mission = header.get("MISSION", header.get("TELESCOP"))
+    target = next(
+        (
+            header.get(k) for k in ["TICID", "KEPLERID", "OBJECT"]
+            if header.get(k) is not None
+        ),
+        None
+    )
+    sector = next(
+        (
+            header.get(k) for k in ["SECTOR", "QUARTER", "CAMPAIGN"]
+            if header.get(k) is not None
+        ),
+        None
+    )
+    if mission is None or target is None or sector is None:
+        raise ValueError(
+            " ".join((
+                f"Could not get mission/target/sector of [{fitsFile}]",
+                "from its primary header"
+            ))
+        )
+    return {
+        "mission": str(mission).strip(),
+        "target": str(target).strip(),
+        "sector": int(sector)
+    }
+
+
+def _ingestFitsFile(
+    fitsFile: pathlib.Path,
+    storeDirectory: pathlib.Path,
+    qualityBitmask: Literal["none", "default", "hard", "hardest"]
+) -> Dict[str, Any]:
+    # this one is executed in a worker process
+    pyarrowParquet = importOptional("pyarrow.parquet", "arrow")
+
+    partition = _getFitsPartition(fitsFile)
+    columns = lightcurves._readFitsFluxColumns(
+        str(fitsFile),
+        "tess" if partition["mission"] == "TESS" else "kepler",
+        qualityBitmask,
+        dropNanTimes=True,
+        convertTimesToSeconds=False,
+        extraFitsColumns={"QUALITY": "quality"}
+    )
+
+    parquetFile = pathlib.Path(
+        f"mission={partition['mission']}",
+        f"target={partition['target']}",
+        f"sector={partition['sector']}",
+        f"{fitsFile.stem}.parquet"
+    )
+    (storeDirectory / parquetFile).parent.mkdir(parents=True, exist_ok=True)
+    pyarrowParquet.write_table(
+        importOptional("pyarrow", "arrow").table(columns),
+        storeDirectory / parquetFile
+    )
+
+    fitsStat = fitsFile.stat()
+    return {
+        "fits": str(fitsFile),
+        "size": fitsStat.st_size,
+        "mtime": fitsStat.st_mtime_ns,
+        **partition,
+        "rows": len(columns["time"]),
+        "parquet": parquetFile.as_posix()
+    }
+
+
+def readManifest(
+    storeDirectoryPath: Union[str, pathlib.Path]
+) -> pandas.DataFrame:
+    """
+    Read the manifest of a light curves Parquet store. If there is
+    no manifest yet, then the table is empty. If a FITS file was ingested
+    more than once, then only its latest row is there.
+
+    Example:
+
+    ``` py
+    from phab.utils.files import parquet
+
+    manifest = parquet.readManifest("/path/to/store")
+    #print(manifest[["mission", "target", "sector", "rows"]])
+    ```
+    """
+    manifestFile = pathlib.Path(storeDirectoryPath) / manifestFileName
+    if not manifestFile.is_file():
+        return pandas.DataFrame(columns=_manifestColumns)
+    manifest = pandas.read_csv(manifestFile, dtype={"target": str})
+    return manifest.drop_duplicates(
+        subset="fits",
+        keep="last",
+        ignore_index=True
+    )
+
+
+def ingestLightCurvesToParquet(
+    fitsDirectoryPath: Union[str, pathlib.Path],
+    storeDirectoryPath: Union[str, pathlib.Path],
+    qualityBitmask: Literal["none", "default", "hard", "hardest"] = "none",
+    fileNamePattern: str = "*_lc.fits",
+    maxWorkers: Optional[int] = None
+) -> pandas.DataFrame:
+    """
+    Find light curves FITS files (*recursively*) in the directory, convert
+    them with the same reading routine
+    as `utils.databases.lightcurves.fitsToPandas()` and write them into
+    the Parquet store. Files are converted in parallel in a pool
+    of `maxWorkers` processes (*by default as many as there are CPUs*).
+
+    Every table in the store has `time`, `flux`, `fluxError`
+    and `quality` columns. Rows with NaN times are dropped, and rows
+    are also filtered with `qualityBitmask`, which by default keeps
+    everything, as the `quality` column can be used for that later.
+
+    FITS files that are already listed in the manifest and have not changed
+    since (*same size and modification time*) are skipped, so it is cheap
+    to run the ingestion again after adding some more files to the directory.
+    Files are added to the manifest as soon as they are ingested, so
+    an interrupted ingestion will continue from where it stopped.
+
+    Returns manifest rows of the files that were ingested by this call.
+
+    Example:
+
+    ``` py
+    from phab.utils.files import parquet
+
+    ingested = parquet.ingestLightCurvesToParquet(
+        "./data",
+        "/path/to/store"
+    )
+    print(f"Ingested {len(ingested)} files")
+    ```
+    """
+    fitsDirectory: Optional[pathlib.Path] = fl.directoryExists(
+        fitsDirectoryPath
+    )
+    if fitsDirectory is None:
+        raise ValueError(
+            f"Provided path to [{fitsDirectoryPath}] seems to be wrong"
+        )
+    storeDirectory = pathlib.Path(storeDirectoryPath)
+    storeDirectory.mkdir(parents=True, exist_ok=True)
+
+    manifest = readManifest(storeDirectory)
+    alreadyIngested = {
+        (r.fits, r.size, r.mtime) for r in manifest.itertuples()
+    }
+
+    fitsFiles: List[pathlib.Path] = []
+    for fitsFile in sorted(fitsDirectory.rglob(fileNamePattern)):
+        fitsFile = fitsFile.resolve()
+        fitsStat = fitsFile.stat()
+        if (
+            (str(fitsFile), fitsStat.st_size, fitsStat.st_mtime_ns)
+            in alreadyIngested
+        ):
+            logger.debug(f"Skipping already ingested file: {fitsFile}")
+        else:
+            fitsFiles.append(fitsFile)
+    logger.debug(
+        " ".join((
+            f"Files to ingest: {len(fitsFiles)},",
+            f"already ingested: {len(alreadyIngested)}"
+        ))
+    )
+
+    manifestFile = storeDirectory / manifestFileName
+    ingested: List[Dict[str, Any]] = []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=maxWorkers
+    ) as executor:
+        futures = {
+            executor.submit(
+                _ingestFitsFile,
+                fitsFile,
+                storeDirectory,
+                qualityBitmask
+            ): fitsFile
+            for fitsFile in fitsFiles
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                manifestRow = future.result()
+            except Exception as ex:
+                logger.error(
+                    f"Failed to ingest [{futures[future]}]: {ex}"
+                )
+                continue
+            # appending right away, so an interrupted ingestion
+            # does not lose what was already done
+            pandas.DataFrame(
+                [manifestRow],
+                columns=_manifestColumns
+            ).to_csv(
+                manifestFile,
+                mode="a",
+                header=not manifestFile.is_file(),
+                index=False
+            )
+            ingested.append(manifestRow)
+
+    # rows of files that were ingested again (*because they have changed*)
+    # are replaced with the new ones
+    if set(manifest["fits"]) & {r["fits"] for r in ingested}:
+        temporaryManifestFile = manifestFile.with_suffix(".tmp")
+        readManifest(storeDirectory).to_csv(
+            temporaryManifestFile,
+            index=False
+        )
+        os.replace(temporaryManifestFile, manifestFile)
+
+    return pandas.DataFrame(ingested, columns=_manifestColumns)
+
+
+def readLightCurvesFromParquet(
+    storeDirectoryPath: Union[str, pathlib.Path],
+    missions: Optional[List[str]] = None,
+    targets: Optional[List[str]] = None,
+    sectors: Optional[List[int]] = None,
+    columns: Optional[List[str]] = None
+) -> pandas.DataFrame:
+    """
+    Read light curves from the Parquet store, optionally only for some
+    missions, targets and sectors. Thanks to partitioning, files
+    of other missions/targets/sectors are not even opened. Besides
+    the light curve columns, the resulting table has `mission`, `target`
+    and `sector` columns.
+
+    Example:
+
+    ``` py
+    from phab.utils.files import parquet
+
+    lc = parquet.readLightCurvesFromParquet(
+        "/path/to/store",
+        targets=["266744225"],
+        columns=["time", "flux", "fluxError"]
+    )
+    #print(lc)
+    ```
+    """
+    pyarrowDataset = importOptional("pyarrow.dataset", "arrow")
+    pyarrow = importOptional("pyarrow", "arrow")
+
+    storeDirectory: Optional[pathlib.Path] = fl.directoryExists(
+        storeDirectoryPath
+    )
+    if storeDirectory is None:
+        raise ValueError(
+            f"Provided path to [{storeDirectoryPath}] seems to be wrong"
+        )
+
+    dataset = pyarrowDataset.dataset(
+        storeDirectory,
+        format="parquet",
+        partitioning=pyarrowDataset.partitioning(
+            pyarrow.schema([
+                ("mission", pyarrow.string()),
+                ("target", pyarrow.string()),
+                ("sector", pyarrow.int32())
+            ]),
+            flavor="hive"
+        )
+    )
+
+    filters = None
+    for partitionColumn, values in [
+        ("mission", missions),
+        ("target", [str(t) for t in targets] if targets else targets),
+        ("sector", sectors)
+    ]:
+        if values is None:
+            continue
+        condition = pyarrowDataset.field(partitionColumn).isin(values)
+        filters = condition if filters is None else filters & condition
+
+    tbl = dataset.to_table(
+        columns=(
+            None if columns is None
+            else columns + [
+                c for c in ["mission", "target", "sector"]
+                if c not in columns
+            ]
+        ),
+        filter=filters,
+        use_threads=True
+    )
+    return tbl.to_pandas()
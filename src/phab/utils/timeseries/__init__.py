@@ -0,0 +1,3 @@
+"""
+.. include:: ../../../../documentation/utils/timeseries/index.md
+"""
@@ -0,0 +1,334 @@
+"""
+Binning (*downsampling*) light curves in time.
+
+All the binning functions take a light curve with `time`, `flux`
+and `fluxError` columns (*a Pandas table
+from `utils.databases.lightcurves.fitsToPandas()`, a dictionary of NumPy
+arrays and so on*), put every row into a bin and then aggregate every bin
+into one row. The aggregation is done for all the bins at once
+with `numpy.ufunc.reduceat()` over the rows sorted by time, so it is
+fast enough for millions of rows. Rows with NaN times or fluxes are
+not used, and empty bins are not in the result.
+
+Aggregation methods:
+
+- `mean` - mean time, mean flux and the propagated error
+`sqrt(sum(fluxError^2)) / n`;
+- `weighted` - mean time and inverse-variance weighted mean flux with
+its error `1 / sqrt(sum(1 / fluxError^2))`, using only the rows
+with finite positive errors;
+- `median` - median time, median flux and the error of the median
+estimated as `sqrt(pi / 2)` times the error of the mean.
+"""
+
+import numpy
+import pandas
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    Literal
+)
+
+from ..databases import lightcurves
+
+if TYPE_CHECKING:
+    import pyarrow
+
+
+def _getSortedColumns(lightCurve: Any) -> Dict[str, numpy.ndarray]:
+    columns: Dict[str, numpy.ndarray] = {
+        c: numpy.asarray(lightCurve[c]) for c in ["time", "flux", "fluxError"]
+    }
+    usable = ~(numpy.isnan(columns["time"]) | numpy.isnan(columns["flux"]))
+    if not usable.all():
+        columns = {c: v[usable] for c, v in columns.items()}
+    if numpy.any(columns["time"][1:] < columns["time"][:-1]):
+        order = numpy.argsort(columns["time"], kind="stable")
+        columns = {c: v[order] for c, v in columns.items()}
+    return columns
+
+
+def _hasUsableErrors(fluxError: numpy.ndarray) -> numpy.ndarray:
+    # rows that can be weighted by their errors, as a single NaN or zero
+    # error would make the whole bin NaN or infinite
+    return numpy.isfinite(fluxError) & (fluxError > 0)
+
+
+def aggregateBins(
+    columns: Dict[str, numpy.ndarray],
+    binLabels: numpy.ndarray,
+    method: Literal["mean", "weighted", "median"] = "mean"
+) -> Dict[str, numpy.ndarray]:
+    """
+    Aggregate rows of the light curve columns (*sorted by time*) into bins.
+    The `binLabels` array has a label for every row, and labels must not
+    decrease, so every bin is a contiguous range of rows. This is what
+    all the binning functions in this module end up calling, and it can
+    be used directly for bins of some other kind. With `weighted` method
+    rows with NaN, zero or negative errors are not used.
+
+    Example:
+
+    ``` py
+    from phab.utils.timeseries import binning
+    import numpy
+
+    binned = binning.aggregateBins(
+        {
+            "time": numpy.array([1.0, 2.0, 3.0, 4.0]),
+            "flux": numpy.array([10.0, 12.0, 9.0, 11.0]),
+            "fluxError": numpy.array([1.0, 1.0, 1.0, 1.0])
+        },
+        numpy.array([0, 0, 1, 1]),
+        method="mean"
+    )
+
+    print(binned["flux"])
+    # [11. 10.]
+    ```
+    """
+    if method == "weighted":
+        usable = _hasUsableErrors(columns["fluxError"])
+        if not usable.all():
+            columns = {c: v[usable] for c, v in columns.items()}
+            binLabels = binLabels[usable]
+
+    time = columns["time"]
+    flux = columns["flux"].astype(numpy.float64)
+    fluxError = columns["fluxError"].astype(numpy.float64)
+
+    if len(time) == 0:
+        return {c: v[:0] for c, v in columns.items()}
+
+    binStarts = numpy.concatenate((
+        [0],
+        numpy.flatnonzero(binLabels[1:] != binLabels[:-1]) + 1
+    ))
+    binCounts = numpy.diff(numpy.append(binStarts, len(time)))
+
+    binned: Dict[str, numpy.ndarray] = {}
+    if method == "mean":
+        binned["time"] = numpy.add.reduceat(time, binStarts) / binCounts
+        binned["flux"] = numpy.add.reduceat(flux, binStarts) / binCounts
+        binned["fluxError"] = numpy.sqrt(
+            numpy.add.reduceat(fluxError ** 2, binStarts)
+        ) / binCounts
+    elif method == "weighted":
+        weights = 1 / fluxError ** 2
+        weightsSums = numpy.add.reduceat(weights, binStarts)
+        binned["time"] = numpy.add.reduceat(time, binStarts) / binCounts
+        binned["flux"] = (
+            numpy.add.reduceat(flux * weights, binStarts) / weightsSums
+        )
+        binned["fluxError"] = 1 / numpy.sqrt(weightsSums)
+    elif method == "median":
+        lowerMiddles = binStarts + (binCounts - 1) // 2
+        upperMiddles = binStarts + binCounts // 2
+        # times are sorted already, and fluxes get sorted within every bin
+        # by sorting on both labels and fluxes
+        binned["time"] = (time[lowerMiddles] + time[upperMiddles]) / 2
+        fluxSorted = flux[numpy.lexsort((flux, binLabels))]
+        binned["flux"] = (
+            fluxSorted[lowerMiddles] + fluxSorted[upperMiddles]
+        ) / 2
+        binned["fluxError"] = numpy.sqrt(numpy.pi / 2) * numpy.sqrt(
+            numpy.add.reduceat(fluxError ** 2, binStarts)
+        ) / binCounts
+    else:
+        raise ValueError(f"Unknown aggregation method: {method}")
+
+    # keep the original types (float32 fluxes stay float32)
+    return {
+        c: binned[c].astype(columns[c].dtype, copy=False) for c in binned
+    }
+
+
+def binLightCurve(
+    lightCurve: Any,
+    binWidth: float,
+    origin: Optional[float] = None,
+    method: Literal["mean", "weighted", "median"] = "mean",
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Bin the light curve into fixed-width time bins. Bin edges are
+    `origin + k * binWidth`, where `origin` is the first time value,
+    unless set explicitly. The `binWidth` is in the same units as times
+    (*days for light curves from FITS files*).
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import binning
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    # 30-minute bins
+    binned = binning.binLightCurve(lc, binWidth=30 / (24 * 60))
+
+    #print(binned)
+    ```
+    """
+    if binWidth <= 0:
+        raise ValueError("Bin width needs to be a positive number")
+
+    columns = _getSortedColumns(lightCurve)
+    if origin is None:
+        origin = columns["time"][0] if len(columns["time"]) > 0 else 0
+    binLabels = numpy.floor((columns["time"] - origin) / binWidth)
+
+    return _binnedToOutput(aggregateBins(columns, binLabels, method), output)
+
+
+def binLightCurveByCadence(
+    lightCurve: Any,
+    binFactor: int,
+    cadence: Optional[float] = None,
+    method: Literal["mean", "weighted", "median"] = "mean",
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Bin the light curve into bins of `binFactor` cadences each, for
+    example, 20-second cadence with `binFactor` set to `6` gives 2-minute
+    bins. Bins are aligned to the cadences grid, counting from the first
+    row, so bins do not shift after gaps in data, and rows that were
+    excluded (*by quality mask, for instance*) just make some bins
+    have fewer rows. If `cadence` is not set, then it is the median
+    of time differences between rows.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import binning
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    # 2-minute cadence to 10-minute bins
+    binned = binning.binLightCurveByCadence(lc, binFactor=5)
+
+    #print(binned)
+    ```
+    """
+    if binFactor < 1:
+        raise ValueError("Bin factor needs to be a positive number")
+
+    columns = _getSortedColumns(lightCurve)
+    time = columns["time"]
+    if cadence is None:
+        cadence = (
+            float(numpy.median(numpy.diff(time))) if len(time) > 1 else 1
+        )
+    if cadence <= 0:
+        raise ValueError("Cadence needs to be a positive number")
+
+    cadenceNumbers = (
+        numpy.rint((time - time[0]) / cadence) if len(time) > 0 else time
+    )
+    binLabels = cadenceNumbers // binFactor
+
+    return _binnedToOutput(aggregateBins(columns, binLabels, method), output)
+
+
+def binLightCurveBySignalToNoise(
+    lightCurve: Any,
+    targetSignalToNoise: float,
+    maxGap: Optional[float] = None,
+    method: Literal["mean", "weighted", "median"] = "weighted",
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Bin the light curve into adaptive bins, each having (*at least*)
+    the target signal-to-noise ratio. Consecutive rows are added to a bin
+    until the sum of squared signal-to-noise ratios of its rows
+    (*which is the squared signal-to-noise ratio of the weighted mean
+    of a constant signal*) reaches the squared target. So faint/noisy
+    parts of the light curve get wider bins, and bright ones stay
+    close to the original cadence. If `maxGap` is set, then bins do not
+    span gaps in time longer than that. The last bin (*and the last bin
+    before every gap*) gets whatever rows are left, so it might not reach
+    the target.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import binning
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    binned = binning.binLightCurveBySignalToNoise(
+        lc,
+        targetSignalToNoise=5000,
+        maxGap=0.5
+    )
+
+    #print(binned)
+    ```
+    """
+    if targetSignalToNoise <= 0:
+        raise ValueError(
+            "Target signal-to-noise needs to be a positive number"
+        )
+
+    columns = _getSortedColumns(lightCurve)
+    time = columns["time"]
+    fluxError = columns["fluxError"].astype(numpy.float64)
+    snrSquared = numpy.zeros(len(time))
+    # rows with unusable errors do not add anything to a bin
+    usable = _hasUsableErrors(fluxError)
+    snrSquared[usable] = (
+        columns["flux"][usable].astype(numpy.float64) / fluxError[usable]
+    ) ** 2
+    snrSquaredSums = numpy.cumsum(snrSquared)
+    targetSnrSquared = targetSignalToNoise ** 2
+
+    segmentStarts = numpy.zeros(len(time), dtype=bool)
+    if len(time) > 0:
+        segmentStarts[0] = True
+    if maxGap is not None:
+        segmentStarts[1:] |= numpy.diff(time) > maxGap
+    segmentEnds = numpy.append(numpy.flatnonzero(segmentStarts)[1:], len(time))
+
+    # accumulation starts over in every bin, so a row with a lot of signal
+    # does not leave the next bins short of it, and every bin ends
+    # at the first row, with which it reaches the target
+    binStarts = numpy.zeros(len(time), dtype=bool)
+    for segmentStart, segmentEnd in zip(
+        numpy.flatnonzero(segmentStarts),
+        segmentEnds
+    ):
+        binStart = int(segmentStart)
+        while binStart < segmentEnd:
+            binStarts[binStart] = True
+            accumulatedBefore = (
+                snrSquaredSums[binStart - 1] if binStart > 0 else 0
+            )
+            binStart += int(numpy.searchsorted(
+                snrSquaredSums[binStart:segmentEnd],
+                accumulatedBefore + targetSnrSquared
+            )) + 1
+    binLabels = numpy.cumsum(binStarts)
+
+    return _binnedToOutput(aggregateBins(columns, binLabels, method), output)
+
+
+def _binnedToOutput(
+    binned: Dict[str, numpy.ndarray],
+    output: Literal["pandas", "numpy", "arrow"]
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    lc = lightcurves.fluxColumnsToOutput(binned, output)
+    if output == "pandas":
+        lightcurves.validateLightCurveFluxTable(lc)
+    return lc
@@ -0,0 +1,524 @@
+"""
+Keeping many light curves in memory in a compact form: all the times,
+fluxes and their errors are stored in three contiguous arrays, and light
+curves are just ranges of rows in those arrays.
+"""
+
+import numpy
+import pandas
+import pathlib
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List,
+    Tuple,
+    Sequence,
+    Callable,
+    Literal,
+    overload
+)
+
+from ..databases import lightcurves
+from ..files import file as fl
+from ..logs.log import logger
+
+if TYPE_CHECKING:
+    import pyarrow
+
+_collectionColumns: List[str] = ["time", "flux", "fluxError"]
+
+
+class LightCurveCollection:
+    """
+    A collection of light curves stored as one ragged array: `time`,
+    `flux` and `fluxError` arrays of all the light curves one after
+    another, `offsets` array with positions where every light curve
+    starts (*and the last element is the total number of rows*) and
+    `targets`/`sectors` arrays with what every light curve is.
+
+    Light curves are sorted by target and sector, so getting a light curve
+    or all light curves of a target is just slicing the arrays (*no
+    copying*), and operations over all the light curves at once, such
+    as `utils.timeseries.collection.LightCurveCollection.normalize()`,
+    work on the whole arrays. Compared to having a Pandas table
+    per light curve, there is almost no overhead per light curve.
+
+    The collection can be saved to a directory of `.npy` files and loaded
+    back memory-mapped, so loading is instant and the arrays are read
+    from disk only when (*and only the parts that are*) accessed.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries.collection import LightCurveCollection
+
+    lcs = LightCurveCollection.fromLightCurves(
+        [
+            lightcurves.fitsToPandas(
+                "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+                fitsType="tess"
+            )
+        ],
+        targets=["TIC 266744225"],
+        sectors=[7]
+    )
+
+    for target in lcs.getTargets():
+        lc = lcs.getTarget(target)
+        print(f"{target}: {len(lc['time'])} rows")
+
+    lcs.save("/path/to/collection")
+    lcsAgain = LightCurveCollection.load("/path/to/collection")
+    ```
+    """
+
+    def __init__(
+        self,
+        time: numpy.ndarray,
+        flux: numpy.ndarray,
+        fluxError: numpy.ndarray,
+        offsets: numpy.ndarray,
+        targets: numpy.ndarray,
+        sectors: numpy.ndarray
+    ):
+        if not (len(time) == len(flux) == len(fluxError)):
+            raise ValueError(
+                " ".join((
+                    "Time, flux and flux error arrays need to be",
+                    "of the same length"
+                ))
+            )
+        if (
+            len(offsets) != len(targets) + 1
+            or
+            len(targets) != len(sectors)
+            or
+            offsets[0] != 0
+            or
+            offsets[-1] != len(time)
+        ):
+            raise ValueError(
+                " ".join((
+                    "Offsets need to start with 0, end with the number",
+                    "of rows and have one more element than there are",
+                    "targets and sectors"
+                ))
+            )
+        self.time = time
+        self.flux = flux
+        self.fluxError = fluxError
+        self.offsets = offsets
+        self.targets = targets
+        self.sectors = sectors
+
+        # light curves of every target go one after another
+        # (targets are sorted), so a target is a range of light curves
+        targetsStarts = numpy.flatnonzero(
+            numpy.concatenate(([True], targets[1:] != targets[:-1]))
+        ) if len(targets) > 0 else numpy.array([], dtype=int)
+        targetsEnds = numpy.append(targetsStarts[1:], len(targets))
+        self._targetsRanges: Dict[str, Tuple[int, int]] = {
+            str(targets[s]): (int(s), int(e))
+            for s, e in zip(targetsStarts, targetsEnds)
+        }
+        if len(self._targetsRanges) != len(targetsStarts):
+            raise ValueError(
+                " ".join((
+                    "Light curves of every target need to go one after",
+                    "another, but some targets are split into several runs"
+                ))
+            )
+
+    @classmethod
+    def fromLightCurves(
+        cls,
+        lightCurves: Sequence[Any],
+        targets: Sequence[str],
+        sectors: Optional[Sequence[int]] = None,
+        fluxType: Any = numpy.float32
+    ) -> "LightCurveCollection":
+        """
+        Create a collection from a list of light curves, each being
+        anything that gives `time`, `flux` and `fluxError` columns by name
+        (*a Pandas table from `utils.databases.lightcurves.fitsToPandas()`,
+        a dictionary of NumPy arrays and so on*), and lists of their
+        targets and sectors. Times are stored as `float64`, fluxes and
+        their errors as `fluxType`.
+
+        Example:
+
+        ``` py
+        from phab.utils.timeseries.collection import LightCurveCollection
+
+        lcs = LightCurveCollection.fromLightCurves(
+            [lc1, lc2, lc3],
+            targets=["TIC 266744225", "TIC 266744225", "TIC 1234567"],
+            sectors=[7, 34, 12]
+        )
+        ```
+        """
+        if sectors is None:
+            sectors = [0] * len(targets)
+        if not (len(lightCurves) == len(targets) == len(sectors)):
+            raise ValueError(
+                " ".join((
+                    "There need to be as many targets and sectors",
+                    "as there are light curves"
+                ))
+            )
+
+        order = sorted(
+            range(len(lightCurves)),
+            key=lambda i: (str(targets[i]), sectors[i])  # type: ignore[index]
+        )
+        lengths = numpy.array(
+            [len(lightCurves[i]["time"]) for i in order],
+            dtype=numpy.int64
+        )
+        offsets = numpy.concatenate(([0], numpy.cumsum(lengths)))
+
+        time = numpy.empty(offsets[-1], dtype=numpy.float64)
+        flux = numpy.empty(offsets[-1], dtype=fluxType)
+        fluxError = numpy.empty(offsets[-1], dtype=fluxType)
+        for n, i in enumerate(order):
+            start, end = offsets[n], offsets[n + 1]
+            time[start:end] = lightCurves[i]["time"]
+            flux[start:end] = lightCurves[i]["flux"]
+            fluxError[start:end] = lightCurves[i]["fluxError"]
+
+        return cls(
+            time,
+            flux,
+            fluxError,
+            offsets,
+            numpy.array([str(targets[i]) for i in order]),
+            numpy.array([sectors[i] for i in order], dtype=numpy.int64)
+        )
+
+    def __len__(self) -> int:
+        """
+        Number of light curves in the collection.
+        """
+        return len(self.targets)
+
+    def getTargets(self) -> List[str]:
+        """
+        List of (*unique*) targets in the collection.
+        """
+        return list(self._targetsRanges.keys())
+
+    @overload
+    def getLightCurve(
+        self,
+        lightCurveIndex: int,
+        output: Literal["numpy"] = ...
+    ) -> Dict[str, numpy.ndarray]:
+        ...
+
+    @overload
+    def getLightCurve(
+        self,
+        lightCurveIndex: int,
+        output: Literal["pandas"]
+    ) -> pandas.DataFrame:
+        ...
+
+    @overload
+    def getLightCurve(
+        self,
+        lightCurveIndex: int,
+        output: Literal["arrow"]
+    ) -> "pyarrow.Table":
+        ...
+
+    @overload
+    def getLightCurve(
+        self,
+        lightCurveIndex: int,
+        output: Literal["pandas", "numpy", "arrow"] = ...
+    ) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+        ...
+
+    def getLightCurve(
+        self,
+        lightCurveIndex: int,
+        output: Literal["pandas", "numpy", "arrow"] = "numpy"
+    ) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+        """
+        Get one light curve (*by its position in the collection*). With
+        `numpy` output the arrays are views of the collection arrays.
+        """
+        start = self.offsets[lightCurveIndex]
+        end = self.offsets[lightCurveIndex + 1]
+        return lightcurves.fluxColumnsToOutput(
+            {
+                "time": self.time[start:end],
+                "flux": self.flux[start:end],
+                "fluxError": self.fluxError[start:end]
+            },
+            output
+        )
+
+    @overload
+    def getTarget(
+        self,
+        target: str,
+        output: Literal["numpy"] = ...
+    ) -> Dict[str, numpy.ndarray]:
+        ...
+
+    @overload
+    def getTarget(
+        self,
+        target: str,
+        output: Literal["pandas"]
+    ) -> pandas.DataFrame:
+        ...
+
+    @overload
+    def getTarget(
+        self,
+        target: str,
+        output: Literal["arrow"]
+    ) -> "pyarrow.Table":
+        ...
+
+    @overload
+    def getTarget(
+        self,
+        target: str,
+        output: Literal["pandas", "numpy", "arrow"] = ...
+    ) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+        ...
+
+    def getTarget(
+        self,
+        target: str,
+        output: Literal["pandas", "numpy", "arrow"] = "numpy"
+    ) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+        """
+        Get all the light curves (*sectors*) of a target as one light
+        curve. With `numpy` output the arrays are views of the collection
+        arrays.
+        """
+        if target not in self._targetsRanges:
+            raise ValueError(f"There is no [{target}] in the collection")
+        first, last = self._targetsRanges[target]
+        start = self.offsets[first]
+        end = self.offsets[last]
+        return lightcurves.fluxColumnsToOutput(
+            {
+                "time": self.time[start:end],
+                "flux": self.flux[start:end],
+                "fluxError": self.fluxError[start:end]
+            },
+            output
+        )
+
+    def getIndex(self) -> pandas.DataFrame:
+        """
+        Table of light curves in the collection: target, sector
+        and the number of rows.
+        """
+        return pandas.DataFrame(
+            {
+                "target": self.targets,
+                "sector": self.sectors,
+                "rows": numpy.diff(self.offsets)
+            }
+        )
+
+    def getLightCurveIndexes(self) -> numpy.ndarray:
+        """
+        Array with the index of the light curve for every row, which can be
+        used as labels for grouping rows by light curves.
+        """
+        return numpy.repeat(
+            numpy.arange(len(self.targets)),
+            numpy.diff(self.offsets)
+        )
+
+    def reduce(
+        self,
+        ufunc: numpy.ufunc,
+        column: Literal["time", "flux", "fluxError"] = "flux"
+    ) -> numpy.ndarray:
+        """
+        Reduce the column of every light curve with a NumPy universal
+        function, for all light curves at once. For example,
+        `numpy.maximum` gives the maximum flux of every light curve.
+        Empty light curves get NaN.
+
+        Example:
+
+        ``` py
+        import numpy
+
+        # ...
+
+        maxFluxes = lcs.reduce(numpy.maximum, "flux")
+        ```
+        """
+        values = getattr(self, column)
+        lengths = numpy.diff(self.offsets)
+        notEmpty = lengths > 0
+        result = numpy.full(len(self.targets), numpy.nan)
+        if numpy.any(notEmpty):
+            result[notEmpty] = ufunc.reduceat(
+                values,
+                self.offsets[:-1][notEmpty]
+            )
+        return result
+
+    def median(
+        self,
+        column: Literal["time", "flux", "fluxError"] = "flux"
+    ) -> numpy.ndarray:
+        """
+        Median of the column of every light curve (*ignoring NaNs*),
+        for all light curves at once.
+        """
+        values = getattr(self, column)
+        lightCurveIndexes = self.getLightCurveIndexes()
+        # NaNs are sorted to the end of every light curve
+        sortedValues = values[numpy.lexsort((values, lightCurveIndexes))]
+        notNanCounts = numpy.bincount(
+            lightCurveIndexes,
+            weights=~numpy.isnan(values),
+            minlength=len(self.targets)
+        ).astype(numpy.int64)
+
+        result = numpy.full(len(self.targets), numpy.nan)
+        notEmpty = notNanCounts > 0
+        starts = self.offsets[:-1][notEmpty]
+        counts = notNanCounts[notEmpty]
+        result[notEmpty] = (
+            sortedValues[starts + (counts - 1) // 2].astype(numpy.float64)
+            +
+            sortedValues[starts + counts // 2]
+        ) / 2
+        return result
+
+    def mean(
+        self,
+        column: Literal["time", "flux", "fluxError"] = "flux"
+    ) -> numpy.ndarray:
+        """
+        Mean of the column of every light curve (*ignoring NaNs*),
+        for all light curves at once.
+        """
+        values = getattr(self, column)
+        lightCurveIndexes = self.getLightCurveIndexes()
+        notNan = ~numpy.isnan(values)
+        sums = numpy.bincount(
+            lightCurveIndexes,
+            weights=numpy.where(notNan, values, 0),
+            minlength=len(self.targets)
+        )
+        notNanCounts = numpy.bincount(
+            lightCurveIndexes,
+            weights=notNan,
+            minlength=len(self.targets)
+        )
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return sums / notNanCounts
+
+    def normalize(
+        self,
+        method: Literal["median", "mean"] = "median"
+    ) -> "LightCurveCollection":
+        """
+        Get a new collection where fluxes and their errors of every light
+        curve are divided by the median (*or mean*) flux of that light
+        curve.
+        """
+        factors: numpy.ndarray
+        if method == "median":
+            factors = self.median("flux")
+        elif method == "mean":
+            factors = self.mean("flux")
+        else:
+            raise ValueError(f"Unknown normalization method: {method}")
+        rowsFactors = numpy.repeat(
+            factors.astype(self.flux.dtype),
+            numpy.diff(self.offsets)
+        )
+        return LightCurveCollection(
+            self.time,
+            self.flux / rowsFactors,
+            self.fluxError / rowsFactors,
+            self.offsets,
+            self.targets,
+            self.sectors
+        )
+
+    def apply(
+        self,
+        func: Callable[[Dict[str, numpy.ndarray]], Any]
+    ) -> List[Any]:
+        """
+        Call a function for every light curve (*a dictionary of arrays
+        views*) and get the list of results. This one is a loop, so prefer
+        vectorized operations, when possible.
+        """
+        return [
+            func(self.getLightCurve(i))  # type: ignore[arg-type]
+            for i in range(len(self.targets))
+        ]
+
+    def save(self, directoryPath: Union[str, pathlib.Path]) -> None:
+        """
+        Save the collection as `.npy` files in the directory (*which
+        is created, if it does not exist*).
+        """
+        directory = pathlib.Path(directoryPath)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in [
+            *_collectionColumns,
+            "offsets",
+            "targets",
+            "sectors"
+        ]:
+            numpy.save(directory / f"{name}.npy", getattr(self, name))
+        logger.debug(
+            " ".join((
+                f"Saved {len(self.targets)} light curves",
+                f"with {len(self.time)} rows to {directory}"
+            ))
+        )
+
+    @classmethod
+    def load(
+        cls,
+        directoryPath: Union[str, pathlib.Path],
+        mmapMode: Optional[Literal["r", "r+", "c"]] = "r"
+    ) -> "LightCurveCollection":
+        """
+        Load a collection saved with
+        `utils.timeseries.collection.LightCurveCollection.save()`.
+        By default the arrays are memory-mapped read-only, set `mmapMode`
+        to `None` to read them into memory instead.
+        """
+        directory: Optional[pathlib.Path] = fl.directoryExists(directoryPath)
+        if directory is None:
+            raise ValueError(
+                f"Provided path to [{directoryPath}] seems to be wrong"
+            )
+        arrays: Dict[str, numpy.ndarray] = {
+            name: numpy.load(
+                directory / f"{name}.npy",
+                mmap_mode=mmapMode if name in _collectionColumns else None
+            )
+            for name in [
+                *_collectionColumns,
+                "offsets",
+                "targets",
+                "sectors"
+            ]
+        }
+        return cls(**arrays)
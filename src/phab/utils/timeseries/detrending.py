@@ -0,0 +1,495 @@
+"""
+Detrending and normalization of light curves, such as before looking
+for outliers with `utils.math.statistics.findOutliers()` or for flares.
+
+Light curves are split into segments at gaps in time (*for example,
+between TESS orbits or sectors*), and the trend is calculated
+for every segment separately, so it does not leak over the gaps. Trend
+windows are set in the units of times (*days for light curves from FITS
+files*) and converted to a number of rows using the typical cadence
+of the segment, so within a segment rows are expected to be (*mostly*)
+evenly spaced.
+
+Trends are calculated with running median (*`scipy.ndimage.median_filter()`*)
+or Savitzky-Golay filter (*`scipy.signal.savgol_filter()`*) over whole
+segments arrays, and detrended light curves are fluxes and their errors
+divided by the trend, so they are also normalized.
+"""
+
+import concurrent.futures
+import numpy
+import pandas
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List,
+    Tuple,
+    Literal
+)
+
+from .._lazy import lazyImport
+from ..databases import lightcurves
+from ..logs.log import logger
+from . import sharing
+from .collection import LightCurveCollection
+
+if TYPE_CHECKING:
+    import pyarrow
+    from scipy import ndimage as scipyNdimage
+    from scipy import signal as scipySignal
+else:
+    scipyNdimage = lazyImport("scipy.ndimage")
+    scipySignal = lazyImport("scipy.signal")
+
+
+def getSegmentLabels(
+    time: numpy.ndarray,
+    maxGap: float = 0.5
+) -> numpy.ndarray:
+    """
+    Get a segment label for every row of the time array (*sorted
+    by time*): a new segment starts after every gap that is longer
+    than `maxGap`. Labels start with `0` and do not decrease, so every
+    segment is a contiguous range of rows, and the labels can be used
+    with `utils.timeseries.binning.aggregateBins()`.
+
+    Example:
+
+    ``` py
+    import numpy
+
+    from phab.utils.timeseries import detrending
+
+    labels = detrending.getSegmentLabels(
+        numpy.array([1.0, 1.1, 1.2, 5.0, 5.1, 9.0]),
+        maxGap=1
+    )
+    print(labels)
+    # [0 0 0 1 1 2]
+    ```
+    """
+    if maxGap <= 0:
+        raise ValueError("Maximum gap needs to be a positive number")
+    time = numpy.asarray(time)
+    if len(time) == 0:
+        return numpy.array([], dtype=numpy.int64)
+    timeDifferences = numpy.diff(time)
+    if numpy.any(timeDifferences < 0):
+        raise ValueError("Times need to be sorted")
+    return numpy.concatenate((
+        [0],
+        numpy.cumsum(timeDifferences > maxGap)
+    )).astype(numpy.int64)
+
+
+def _getRowsMedians(
+    values: numpy.ndarray,
+    labels: numpy.ndarray
+) -> numpy.ndarray:
+    # median of every group of rows (ignoring NaNs) for every row,
+    # labels do not need to be sorted
+    uniqueLabels, groupIndexes = numpy.unique(labels, return_inverse=True)
+    # NaNs are sorted to the end of every group
+    order = numpy.lexsort((values, groupIndexes))
+    sortedValues = values[order]
+    groupsStarts = numpy.searchsorted(
+        groupIndexes[order],
+        numpy.arange(len(uniqueLabels))
+    )
+    notNanCounts = numpy.bincount(
+        groupIndexes,
+        weights=~numpy.isnan(values),
+        minlength=len(uniqueLabels)
+    ).astype(numpy.int64)
+
+    medians = numpy.full(len(uniqueLabels), numpy.nan)
+    notEmpty = notNanCounts > 0
+    starts = groupsStarts[notEmpty]
+    counts = notNanCounts[notEmpty]
+    medians[notEmpty] = (
+        sortedValues[starts + (counts - 1) // 2].astype(numpy.float64)
+        +
+        sortedValues[starts + counts // 2]
+    ) / 2
+    return medians[groupIndexes]
+
+
+def normalizeLightCurve(
+    lightCurve: Any,
+    sectorLabels: Optional[numpy.ndarray] = None,
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Divide fluxes and their errors by the median flux of every sector.
+    The `sectorLabels` array has a sector (*or any other label*)
+    for every row, and if it is not set, then the whole light curve is
+    one sector. Rows keep their order.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import detrending
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    normalized = detrending.normalizeLightCurve(lc)
+
+    #print(normalized["flux"].median())
+    # 1.0
+    ```
+    """
+    columns: Dict[str, numpy.ndarray] = {
+        c: numpy.asarray(lightCurve[c]) for c in ["time", "flux", "fluxError"]
+    }
+    if sectorLabels is None:
+        sectorLabels = numpy.zeros(len(columns["time"]), dtype=numpy.int64)
+    elif len(sectorLabels) != len(columns["time"]):
+        raise ValueError(
+            " ".join((
+                f"Sector labels ({len(sectorLabels)}) need to be",
+                f"for every row ({len(columns['time'])})"
+            ))
+        )
+    medians = _getRowsMedians(
+        columns["flux"],
+        numpy.asarray(sectorLabels)
+    ).astype(columns["flux"].dtype)
+    return _detrendedToOutput(
+        {
+            "time": columns["time"],
+            "flux": columns["flux"] / medians,
+            "fluxError": columns["fluxError"] / medians
+        },
+        output
+    )
+
+
+def _getWindowRows(
+    time: numpy.ndarray,
+    windowLength: float,
+    maxRows: int
+) -> int:
+    cadence = numpy.median(numpy.diff(time)) if len(time) > 1 else 0
+    windowRows = (
+        int(round(windowLength / cadence)) if cadence > 0 else maxRows
+    )
+    # filters need an odd window that fits into the segment
+    windowRows = min(windowRows, maxRows)
+    return max(windowRows - (1 - windowRows % 2), 1)
+
+
+def getTrend(
+    time: numpy.ndarray,
+    flux: numpy.ndarray,
+    windowLength: float = 0.5,
+    method: Literal["median", "savgol"] = "median",
+    maxGap: float = 0.5,
+    polynomialOrder: int = 2
+) -> numpy.ndarray:
+    """
+    Calculate the trend of fluxes with running median or Savitzky-Golay
+    filter (*with polynomials of `polynomialOrder`*) with windows
+    of `windowLength` (*in the units of times*). The trend is calculated
+    for every segment (*see `utils.timeseries.detrending.getSegmentLabels()`*)
+    separately, and segments shorter than the window get the window
+    of their length. Rows with NaN fluxes are not used, and their
+    trend values are interpolated. Rows do not need to be sorted
+    by time, but rows with NaN times get NaN trend.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import detrending
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    # 12-hour running median
+    trend = detrending.getTrend(lc["time"], lc["flux"], windowLength=0.5)
+    ```
+    """
+    if windowLength <= 0:
+        raise ValueError("Window length needs to be a positive number")
+    if method not in ["median", "savgol"]:
+        raise ValueError(f"Unknown detrending method: {method}")
+
+    time = numpy.asarray(time, dtype=numpy.float64)
+    flux = numpy.asarray(flux, dtype=numpy.float64)
+    trend = numpy.full(len(time), numpy.nan)
+
+    usable = numpy.isfinite(time) & numpy.isfinite(flux)
+    if not numpy.any(usable):
+        return trend
+    rows = numpy.flatnonzero(numpy.isfinite(time))
+    rows = rows[numpy.argsort(time[rows], kind="stable")]
+    rowsUsable = usable[rows]
+
+    segmentLabels = getSegmentLabels(time[rows], maxGap)
+    segmentStarts = numpy.flatnonzero(
+        numpy.concatenate(([True], segmentLabels[1:] != segmentLabels[:-1]))
+    )
+    segmentEnds = numpy.append(segmentStarts[1:], len(rows))
+    for start, end in zip(segmentStarts, segmentEnds):
+        segmentRows = rows[start:end]
+        fitRows = segmentRows[rowsUsable[start:end]]
+        if len(fitRows) == 0:
+            continue
+        segmentTime = time[fitRows]
+        segmentFlux = flux[fitRows]
+        windowRows = _getWindowRows(segmentTime, windowLength, len(fitRows))
+        if method == "median":
+            segmentTrend = scipyNdimage.median_filter(
+                segmentFlux,
+                size=windowRows,
+                mode="nearest"
+            )
+        elif windowRows > polynomialOrder:
+            segmentTrend = scipySignal.savgol_filter(
+                segmentFlux,
+                windowRows,
+                polynomialOrder,
+                mode="interp"
+            )
+        else:
+            # too few rows for the polynomial
+            segmentTrend = numpy.full(len(fitRows), numpy.median(segmentFlux))
+        if len(fitRows) == len(segmentRows):
+            trend[segmentRows] = segmentTrend
+        else:
+            trend[segmentRows] = numpy.interp(
+                time[segmentRows],
+                segmentTime,
+                segmentTrend
+            )
+    return trend
+
+
+def detrendLightCurve(
+    lightCurve: Any,
+    windowLength: float = 0.5,
+    method: Literal["median", "savgol"] = "median",
+    maxGap: float = 0.5,
+    polynomialOrder: int = 2,
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Detrend a light curve (*with `time`, `flux` and `fluxError`
+    columns*): divide fluxes and their errors by the trend
+    from `utils.timeseries.detrending.getTrend()`. The result has
+    the same rows in the same order, and fluxes keep their type.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import detrending
+    from phab.utils.math import statistics
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    detrended = detrending.detrendLightCurve(
+        lc,
+        windowLength=0.5,
+        method="savgol"
+    )
+    outliers = statistics.findOutliers(detrended["flux"])
+    ```
+    """
+    columns: Dict[str, numpy.ndarray] = {
+        c: numpy.asarray(lightCurve[c]) for c in ["time", "flux", "fluxError"]
+    }
+    trend = getTrend(
+        columns["time"],
+        columns["flux"],
+        windowLength,
+        method,
+        maxGap,
+        polynomialOrder
+    ).astype(columns["flux"].dtype)
+    return _detrendedToOutput(
+        {
+            "time": columns["time"],
+            "flux": columns["flux"] / trend,
+            "fluxError": columns["fluxError"] / trend
+        },
+        output
+    )
+
+
+def _fillTrends(
+    time: numpy.ndarray,
+    flux: numpy.ndarray,
+    offsets: numpy.ndarray,
+    trend: numpy.ndarray,
+    firstLightCurve: int,
+    lastLightCurve: int,
+    windowLength: float,
+    method: Literal["median", "savgol"],
+    maxGap: float,
+    polynomialOrder: int
+) -> None:
+    for start, end in zip(
+        offsets[firstLightCurve:lastLightCurve],
+        offsets[firstLightCurve + 1:lastLightCurve + 1]
+    ):
+        trend[start:end] = getTrend(
+            time[start:end],
+            flux[start:end],
+            windowLength,
+            method,
+            maxGap,
+            polynomialOrder
+        )
+
+
+def _fillSharedTrends(
+    handle: sharing.SharedArraysHandle,
+    firstLightCurve: int,
+    lastLightCurve: int,
+    windowLength: float,
+    method: Literal["median", "savgol"],
+    maxGap: float,
+    polynomialOrder: int
+) -> None:
+    arrays = handle.attach()
+    _fillTrends(
+        arrays["time"],
+        arrays["flux"],
+        arrays["offsets"],
+        arrays["trend"],
+        firstLightCurve,
+        lastLightCurve,
+        windowLength,
+        method,
+        maxGap,
+        polynomialOrder
+    )
+
+
+def detrendCollection(
+    lightCurves: LightCurveCollection,
+    windowLength: float = 0.5,
+    method: Literal["median", "savgol"] = "median",
+    maxGap: float = 0.5,
+    polynomialOrder: int = 2,
+    maxWorkers: Optional[int] = 1,
+    lightCurvesPerTask: int = 64
+) -> LightCurveCollection:
+    """
+    Get a new collection with every light curve (*sector*) detrended
+    as in `utils.timeseries.detrending.detrendLightCurve()`. By default
+    everything is done in the current process, and with `maxWorkers`
+    set to something else light curves are detrended in a pool
+    of `maxWorkers` processes (*`None` means as many as there are CPUs*),
+    `lightCurvesPerTask` light curves per task. Workers get the light
+    curves and put the trends through shared memory (*see
+    `utils.timeseries.sharing`*), so nothing is pickled.
+
+    Example:
+
+    ``` py
+    from phab.utils.timeseries import detrending
+    from phab.utils.timeseries.collection import LightCurveCollection
+
+    lcs = LightCurveCollection.load("/path/to/collection")
+    detrended = detrending.detrendCollection(lcs, maxWorkers=None)
+    detrended.save("/path/to/detrended-collection")
+    ```
+    """
+    if lightCurvesPerTask < 1:
+        raise ValueError("Light curves per task count needs to be positive")
+
+    # tasks are ranges of light curves, so every task works
+    # on contiguous slices of the collection arrays
+    tasks: List[Tuple[int, int]] = [
+        (i, min(i + lightCurvesPerTask, len(lightCurves)))
+        for i in range(0, len(lightCurves), lightCurvesPerTask)
+    ]
+
+    trend: numpy.ndarray
+    if maxWorkers == 1:
+        trend = numpy.empty(len(lightCurves.time), dtype=numpy.float64)
+        for first, last in tasks:
+            _fillTrends(
+                lightCurves.time,
+                lightCurves.flux,
+                lightCurves.offsets,
+                trend,
+                first,
+                last,
+                windowLength,
+                method,
+                maxGap,
+                polynomialOrder
+            )
+    else:
+        logger.debug(
+            " ".join((
+                f"Detrending {len(lightCurves)} light curves",
+                f"in {len(tasks)} tasks"
+            ))
+        )
+        # workers read light curves from shared memory and write
+        # trends there too, so no arrays are pickled either way
+        with sharing.SharedArrays(
+            {
+                "time": lightCurves.time,
+                "flux": lightCurves.flux,
+                "offsets": lightCurves.offsets,
+                "trend": numpy.empty(
+                    len(lightCurves.time),
+                    dtype=numpy.float64
+                )
+            }
+        ) as shared:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=maxWorkers
+            ) as executor:
+                # to get exceptions of the tasks, if there are any
+                list(
+                    executor.map(
+                        _fillSharedTrends,
+                        [shared.handle] * len(tasks),
+                        [first for first, _ in tasks],
+                        [last for _, last in tasks],
+                        [windowLength] * len(tasks),
+                        [method] * len(tasks),
+                        [maxGap] * len(tasks),
+                        [polynomialOrder] * len(tasks)
+                    )
+                )
+            trend = shared.arrays["trend"].copy()
+
+    trend = trend.astype(lightCurves.flux.dtype)
+    return LightCurveCollection(
+        lightCurves.time,
+        lightCurves.flux / trend,
+        lightCurves.fluxError / trend,
+        lightCurves.offsets,
+        lightCurves.targets,
+        lightCurves.sectors
+    )
+
+
+def _detrendedToOutput(
+    detrended: Dict[str, numpy.ndarray],
+    output: Literal["pandas", "numpy", "arrow"]
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    lc = lightcurves.fluxColumnsToOutput(detrended, output)
+    if output == "pandas":
+        lightcurves.validateLightCurveFluxTable(
+            lc,
+            nullableTime=bool(numpy.isnan(detrended["time"]).any())
+        )
+    return lc
@@ -0,0 +1,420 @@
+"""
+Lomb-Scargle periodograms for many light curves at once, such as
+for screening a list of targets for rotation periods.
+
+All the periodograms are calculated on the same (*shared*) regular
+frequency grid with the fast `O(N log N)` method
+of `astropy.timeseries.LombScargle`, and targets are processed
+in parallel processes. Only the top peaks of every periodogram are
+returned, so the result is one small table for the whole list of targets.
+
+Periods are in the units of the light curves times: days for light curves
+from `utils.databases.lightcurves.fitsToPandas()`, unless times were
+converted to seconds.
+"""
+
+import concurrent.futures
+import numpy
+import pandas
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List,
+    Tuple
+)
+
+from .._lazy import lazyImport
+from ..logs.log import logger
+from . import sharing
+from .collection import LightCurveCollection
+
+if TYPE_CHECKING:
+    from astropy import timeseries as astropyTimeseries
+else:
+    astropyTimeseries = lazyImport("astropy.timeseries")
+
+_peaksColumns: List[str] = ["peak", "period", "frequency", "power"]
+
+
+def getFrequencyGrid(
+    timeBaseline: float,
+    minimumPeriod: float,
+    maximumPeriod: Optional[float] = None,
+    samplesPerPeak: int = 5
+) -> numpy.ndarray:
+    """
+    Get a regular frequency grid for periodograms of light curves
+    with the given time baseline (*the longest one, if the grid is shared
+    by several light curves*). Frequencies go from `1 / maximumPeriod`
+    (*by default the maximum period is half of the baseline*)
+    to `1 / minimumPeriod` with the step of `1 / (samplesPerPeak *
+    timeBaseline)`, so every periodogram peak is sampled `samplesPerPeak`
+    times.
+
+    Example:
+
+    ``` py
+    from phab.utils.timeseries import periodograms
+
+    frequencies = periodograms.getFrequencyGrid(
+        timeBaseline=27,
+        minimumPeriod=0.1
+    )
+    print(f"{len(frequencies)} frequencies")
+    ```
+    """
+    if timeBaseline <= 0:
+        raise ValueError("Time baseline needs to be positive")
+    if maximumPeriod is None:
+        maximumPeriod = timeBaseline / 2
+    if not (0 < minimumPeriod < maximumPeriod):
+        raise ValueError(
+            " ".join((
+                f"Minimum period ({minimumPeriod}) needs to be positive",
+                f"and less than the maximum period ({maximumPeriod})"
+            ))
+        )
+    step = 1 / (samplesPerPeak * timeBaseline)
+    minimumFrequency = 1 / maximumPeriod
+    frequenciesCount = int(
+        numpy.floor((1 / minimumPeriod - minimumFrequency) / step)
+    ) + 1
+    return minimumFrequency + step * numpy.arange(frequenciesCount)
+
+
+def _getUsableColumns(
+    lightCurve: Any,
+    useFluxErrors: bool
+) -> Dict[str, numpy.ndarray]:
+    columns: Dict[str, numpy.ndarray] = {
+        "time": numpy.asarray(lightCurve["time"], dtype=numpy.float64),
+        "flux": numpy.asarray(lightCurve["flux"], dtype=numpy.float64)
+    }
+    if useFluxErrors:
+        columns["fluxError"] = numpy.asarray(
+            lightCurve["fluxError"],
+            dtype=numpy.float64
+        )
+    usable = numpy.logical_and.reduce(
+        [numpy.isfinite(v) for v in columns.values()]
+    )
+    if not usable.all():
+        columns = {c: v[usable] for c, v in columns.items()}
+    return columns
+
+
+def getPeriodogramPeaks(
+    lightCurve: Any,
+    frequencies: numpy.ndarray,
+    peaksCount: int = 3,
+    useFluxErrors: bool = True
+) -> pandas.DataFrame:
+    """
+    Calculate Lomb-Scargle periodogram of a light curve (*with `time`,
+    `flux` and `fluxError` columns*) on a regular frequency grid (*such
+    as one from `utils.timeseries.periodograms.getFrequencyGrid()`*)
+    and get its `peaksCount` highest peaks (*local maxima of power*).
+    Rows with NaN values are not used.
+
+    Resulting table has `peak` (*rank of the peak, starting from 1*),
+    `period`, `frequency` and `power` columns.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import periodograms
+
+    lc = lightcurves.fitsToPandas(
+        "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+        fitsType="tess"
+    )
+    frequencies = periodograms.getFrequencyGrid(
+        timeBaseline=lc["time"].max() - lc["time"].min(),
+        minimumPeriod=0.1
+    )
+    peaks = periodograms.getPeriodogramPeaks(lc, frequencies)
+    print(peaks)
+    ```
+    """
+    return pandas.DataFrame(
+        _getPeaks(
+            _getUsableColumns(lightCurve, useFluxErrors),
+            frequencies,
+            peaksCount
+        ),
+        columns=_peaksColumns
+    )
+
+
+def _getPeaks(
+    columns: Dict[str, numpy.ndarray],
+    frequencies: numpy.ndarray,
+    peaksCount: int
+) -> List[Dict[str, Any]]:
+    if len(columns["time"]) < 3:
+        return []
+    power = astropyTimeseries.LombScargle(
+        columns["time"],
+        columns["flux"],
+        columns.get("fluxError")
+    ).power(
+        frequencies,
+        method="fast",
+        assume_regular_frequency=True
+    )
+    # local maxima, so one wide peak does not take all the top places
+    isPeak = numpy.concatenate((
+        [power[0] > power[1]] if len(power) > 1 else [True],
+        (power[1:-1] > power[:-2]) & (power[1:-1] >= power[2:]),
+        [power[-1] > power[-2]] if len(power) > 1 else []
+    ))
+    peaks = numpy.flatnonzero(isPeak & numpy.isfinite(power))
+    if len(peaks) > peaksCount:
+        peaks = peaks[
+            numpy.argpartition(power[peaks], -peaksCount)[-peaksCount:]
+        ]
+    peaks = peaks[numpy.argsort(power[peaks])[::-1]]
+    return [
+        {
+            "peak": rank + 1,
+            "period": 1 / frequencies[p],
+            "frequency": frequencies[p],
+            "power": power[p]
+        }
+        for rank, p in enumerate(peaks)
+    ]
+
+
+def _getTargetLightCurve(
+    lightCurves: Union[Dict[str, Any], LightCurveCollection],
+    target: str
+) -> Any:
+    if isinstance(lightCurves, LightCurveCollection):
+        return lightCurves.getTarget(target)
+    return lightCurves[target]
+
+
+def _getFluxType(lightCurves: Dict[str, Any]) -> Any:
+    # fluxes are shared with workers in their own precision, as a large
+    # flux level leaves too few significant digits in `float32` for small
+    # variations on top of it
+    for lc in lightCurves.values():
+        for column in ["flux", "fluxError"]:
+            columnType = numpy.asarray(lc[column]).dtype
+            if not (
+                numpy.issubdtype(columnType, numpy.floating)
+                and
+                columnType.itemsize <= 4
+            ):
+                return numpy.float64
+    return numpy.float32
+
+
+def _getPeaksForTargets(
+    lightCurves: Union[Dict[str, Any], LightCurveCollection],
+    targets: List[str],
+    frequencyGrid: Tuple[float, float, int],
+    peaksCount: int,
+    useFluxErrors: bool
+) -> List[Dict[str, Any]]:
+    # the grid is passed as its parameters, so it is not pickled
+    # for every task
+    minimumFrequency, step, frequenciesCount = frequencyGrid
+    frequencies = minimumFrequency + step * numpy.arange(frequenciesCount)
+    peaks: List[Dict[str, Any]] = []
+    for target in targets:
+        try:
+            targetPeaks = _getPeaks(
+                _getUsableColumns(
+                    _getTargetLightCurve(lightCurves, target),
+                    useFluxErrors
+                ),
+                frequencies,
+                peaksCount
+            )
+        except Exception as ex:
+            logger.error(f"Failed to get periodogram of [{target}]: {ex}")
+            continue
+        if not targetPeaks:
+            logger.debug(f"Not enough data for periodogram of [{target}]")
+        peaks.extend({"target": target, **p} for p in targetPeaks)
+    return peaks
+
+
+def _getPeaksForSharedTargets(
+    handle: sharing.SharedArraysHandle,
+    targets: List[str],
+    frequencyGrid: Tuple[float, float, int],
+    peaksCount: int,
+    useFluxErrors: bool
+) -> List[Dict[str, Any]]:
+    return _getPeaksForTargets(
+        sharing.attachLightCurves(handle),
+        targets,
+        frequencyGrid,
+        peaksCount,
+        useFluxErrors
+    )
+
+
+def getPeriodogramsPeaks(
+    lightCurves: Union[Dict[str, Any], LightCurveCollection],
+    minimumPeriod: float = 0.1,
+    maximumPeriod: Optional[float] = None,
+    samplesPerPeak: int = 5,
+    peaksCount: int = 3,
+    useFluxErrors: bool = True,
+    maxWorkers: Optional[int] = None,
+    targetsPerTask: int = 16
+) -> pandas.DataFrame:
+    """
+    Calculate Lomb-Scargle periodograms of many light curves and get
+    the `peaksCount` highest peaks of every one of them. Light curves can
+    be a dictionary of targets and their light curves (*Pandas tables
+    from `utils.databases.lightcurves.fitsToPandas()`, dictionaries
+    of NumPy arrays and so on*) or
+    a `utils.timeseries.collection.LightCurveCollection`, in which case
+    all the sectors of a target are one light curve.
+
+    All the periodograms share one frequency grid
+    from `utils.timeseries.periodograms.getFrequencyGrid()` for the longest
+    time baseline among the light curves, so peaks of different targets
+    can be compared directly. Targets are processed in parallel
+    in a pool of `maxWorkers` processes (*by default as many as there
+    are CPUs*), `targetsPerTask` targets per task, and with `maxWorkers`
+    set to `1` everything is done in the current process. Workers get
+    the light curves through shared memory
+    (*see `utils.timeseries.sharing`*), so they are not pickled.
+
+    Resulting table has a row per peak: `target`, `peak` (*rank of the peak
+    of the target, starting from 1*), `period`, `frequency` and `power`.
+    Targets without enough data and targets that failed are not there.
+
+    Example:
+
+    ``` py
+    from phab.utils.timeseries import periodograms
+    from phab.utils.timeseries.collection import LightCurveCollection
+
+    lcs = LightCurveCollection.load("/path/to/collection")
+    peaks = periodograms.getPeriodogramsPeaks(
+        lcs,
+        minimumPeriod=0.2,
+        maximumPeriod=14
+    )
+    # the most likely rotation periods
+    print(peaks.query("peak == 1"))
+    ```
+    """
+    if peaksCount < 1:
+        raise ValueError("Peaks count needs to be positive")
+    if targetsPerTask < 1:
+        raise ValueError("Targets per task count needs to be positive")
+
+    targets: List[str]
+    timeBaseline = 0.0
+    if isinstance(lightCurves, LightCurveCollection):
+        targets = lightCurves.getTargets()
+        # only the rows that will be used for periodograms count
+        # for the baseline, and all the sectors of a target
+        # are one light curve
+        usable = numpy.isfinite(lightCurves.flux)
+        if useFluxErrors:
+            usable &= numpy.isfinite(lightCurves.fluxError)
+        usableTimes = LightCurveCollection(
+            numpy.where(usable, lightCurves.time, numpy.nan),
+            lightCurves.flux,
+            lightCurves.fluxError,
+            lightCurves.offsets,
+            lightCurves.targets,
+            lightCurves.sectors
+        )
+        targetsTimes = (
+            usableTimes.getTarget(t)["time"]
+            for t in targets
+        )
+    else:
+        # keep the order of the dictionary
+        targets = [str(t) for t in lightCurves.keys()]
+        lightCurves = {str(t): lc for t, lc in lightCurves.items()}
+        targetsTimes = (
+            _getUsableColumns(lc, useFluxErrors)["time"]
+            for lc in lightCurves.values()
+        )
+    for targetTime in targetsTimes:
+        timeBaseline = max(
+            timeBaseline,
+            float(
+                numpy.fmax.reduce(targetTime, initial=-numpy.inf)
+                -
+                numpy.fmin.reduce(targetTime, initial=numpy.inf)
+            )
+        )
+    if timeBaseline <= 0:
+        logger.warning("There is no data for periodograms")
+        return pandas.DataFrame(columns=["target", *_peaksColumns])
+    frequencies = getFrequencyGrid(
+        timeBaseline,
+        minimumPeriod,
+        maximumPeriod,
+        samplesPerPeak
+    )
+    frequencyGrid: Tuple[float, float, int] = (
+        float(frequencies[0]),
+        1 / (samplesPerPeak * timeBaseline),
+        len(frequencies)
+    )
+    logger.debug(
+        " ".join((
+            f"Periodograms of {len(targets)} targets",
+            f"on a grid of {len(frequencies)} frequencies"
+        ))
+    )
+
+    tasks = [
+        targets[i:i + targetsPerTask]
+        for i in range(0, len(targets), targetsPerTask)
+    ]
+    peaks: List[Dict[str, Any]] = []
+    if maxWorkers == 1:
+        for task in tasks:
+            peaks.extend(
+                _getPeaksForTargets(
+                    lightCurves,
+                    task,
+                    frequencyGrid,
+                    peaksCount,
+                    useFluxErrors
+                )
+            )
+    else:
+        lcs: LightCurveCollection = (
+            lightCurves if isinstance(lightCurves, LightCurveCollection)
+            else LightCurveCollection.fromLightCurves(
+                list(lightCurves.values()),
+                targets=list(lightCurves.keys()),
+                fluxType=_getFluxType(lightCurves)
+            )
+        )
+        with sharing.shareLightCurves(lcs) as shared:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=maxWorkers
+            ) as executor:
+                # results are collected in the order of tasks,
+                # so the order of targets is kept
+                for taskPeaks in executor.map(
+                    _getPeaksForSharedTargets,
+                    [shared.handle] * len(tasks),
+                    tasks,
+                    [frequencyGrid] * len(tasks),
+                    [peaksCount] * len(tasks),
+                    [useFluxErrors] * len(tasks)
+                ):
+                    peaks.extend(taskPeaks)
+
+    return pandas.DataFrame(peaks, columns=["target", *_peaksColumns])
@@ -0,0 +1,317 @@
+"""
+Handing light curves over to worker processes through shared memory
+instead of pickling them, so the arrays exist only once, no matter
+how many workers read them.
+
+Arrays are copied into one `multiprocessing.shared_memory.SharedMemory`
+block owned by the current process, and workers get only a small handle
+with the block name and the arrays layout. Workers attach to the block
+once per process (*attachments are reused by the next tasks*) and get
+NumPy views of it.
+
+The block is released (*unlinked*) when the owner is closed, which
+happens on leaving the `with` block, when the owner is garbage-collected
+or, at the latest, when the interpreter exits. Memory of the block is
+unmapped only when no arrays use it anymore, so views never outlive it.
+Workers are expected to be started by `multiprocessing` (*such as
+a process pool*) from the owner process, so if the owner process
+crashes, the block is still released by the `multiprocessing` resource
+tracker.
+"""
+
+import weakref
+import numpy
+
+from multiprocessing import shared_memory
+from typing import (
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List,
+    Tuple
+)
+
+from ..logs.log import logger
+from .collection import LightCurveCollection
+
+_arraysAlignment: int = 64
+
+# type, shape and offset (in bytes) of every array in a block
+_Layout = Dict[str, Tuple[str, Tuple[int, ...], int]]
+
+# blocks attached in this process, reused by all the tasks
+# that get the same handle
+_attached: Dict[
+    str,
+    Tuple[shared_memory.SharedMemory, Dict[str, numpy.ndarray]]
+] = {}
+
+
+class SharedArraysHandle:
+    """
+    A handle of a shared memory block with arrays, which is what is
+    passed to worker processes. It is tiny to pickle: just the block name
+    and type, shape and position of every array.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        layout: _Layout
+    ):
+        self.name = name
+        self.layout = layout
+
+    def attach(self) -> Dict[str, numpy.ndarray]:
+        """
+        Get the arrays of the block as NumPy views of the shared memory.
+        The block is attached only once per process, and the next calls
+        with the same handle return the same views.
+
+        Example:
+
+        ``` py
+        def task(handle):
+            arrays = handle.attach()
+            return arrays["flux"].sum()
+        ```
+        """
+        attached = _attached.get(self.name)
+        if attached is None:
+            sharedMemory = shared_memory.SharedMemory(name=self.name)
+            attached = (
+                sharedMemory,
+                _getArraysViews(sharedMemory, self.layout)
+            )
+            _attached[self.name] = attached
+        return attached[1]
+
+    def __repr__(self) -> str:
+        return f"SharedArraysHandle({self.name}, {list(self.layout)})"
+
+
+class _SharedBuffer:
+    # bytes of a shared memory block for NumPy, which keep the block
+    # mapped for as long as there are arrays based on them
+    def __init__(self, sharedMemory: shared_memory.SharedMemory):
+        self.sharedMemory = sharedMemory
+        address = numpy.ndarray(
+            (sharedMemory.size,),
+            dtype=numpy.uint8,
+            buffer=sharedMemory.buf
+        ).__array_interface__["data"][0]
+        self.__array_interface__ = {
+            "version": 3,
+            "data": (address, False),
+            "shape": (sharedMemory.size,),
+            "typestr": "|u1"
+        }
+
+
+def _getArraysViews(
+    sharedMemory: shared_memory.SharedMemory,
+    layout: _Layout
+) -> Dict[str, numpy.ndarray]:
+    # arrays made directly on the block buffer reference only its mmap,
+    # which closing the block unmaps, so instead every view has
+    # the buffer object in its base chain, and the block cannot be closed
+    # while any of the views is alive
+    sharedBytes = numpy.asarray(_SharedBuffer(sharedMemory))
+    views: Dict[str, numpy.ndarray] = {}
+    for name, (dtype, shape, offset) in layout.items():
+        arrayType = numpy.dtype(dtype)
+        views[name] = sharedBytes[
+            offset:offset + arrayType.itemsize * int(numpy.prod(shape))
+        ].view(arrayType).reshape(shape)
+    return views
+
+
+def _detach(name: str) -> None:
+    # the block is not closed here, as views given out earlier
+    # might still be in use: it is closed when the last of them is gone
+    _attached.pop(name, None)
+
+
+def _release(sharedMemory: shared_memory.SharedMemory) -> None:
+    _detach(sharedMemory.name)
+    try:
+        sharedMemory.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedArrays:
+    """
+    Owner of a shared memory block with a copy of the arrays. Pass
+    `handle` to worker processes, and close the owner (*or leave
+    the `with` block*) when the workers are done. Arrays need to have
+    a fixed-size type, so object arrays cannot be shared.
+
+    Example:
+
+    ``` py
+    import concurrent.futures
+    import numpy
+
+    from phab.utils.timeseries.sharing import SharedArrays
+
+    def fluxSum(handle, start, end):
+        return handle.attach()["flux"][start:end].sum()
+
+    flux = numpy.random.default_rng().normal(1, 0.01, 10_000_000)
+    with SharedArrays({"flux": flux}) as shared:
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            sums = list(executor.map(
+                fluxSum,
+                [shared.handle] * 10,
+                range(0, 10_000_000, 1_000_000),
+                range(1_000_000, 10_000_001, 1_000_000)
+            ))
+    ```
+    """
+
+    def __init__(self, arrays: Dict[str, Any]):
+        layout: _Layout = {}
+        size = 0
+        for name, values in arrays.items():
+            array = numpy.asarray(values)
+            if array.dtype.hasobject:
+                raise ValueError(
+                    f"Array [{name}] has objects, so it cannot be shared"
+                )
+            layout[name] = (array.dtype.str, array.shape, size)
+            size += -(-array.nbytes // _arraysAlignment) * _arraysAlignment
+        # zero size blocks are not allowed
+        sharedMemory = shared_memory.SharedMemory(
+            create=True,
+            size=max(size, 1)
+        )
+        # released even if the owner is never closed explicitly
+        self._finalizer = weakref.finalize(
+            self,
+            _release,
+            sharedMemory
+        )
+        self.handle = SharedArraysHandle(sharedMemory.name, layout)
+        self.arrays: Dict[str, numpy.ndarray] = _getArraysViews(
+            sharedMemory,
+            layout
+        )
+        for name, values in arrays.items():
+            self.arrays[name][...] = values
+        logger.debug(
+            " ".join((
+                f"Shared {len(arrays)} arrays of {size} bytes",
+                f"in [{self.handle.name}]"
+            ))
+        )
+
+    def close(self) -> None:
+        """
+        Release the shared memory block: it can no longer be attached
+        to, and its memory is freed as soon as there are no arrays
+        using it (*views taken from `arrays` before closing stay valid*).
+        Closing it again does nothing.
+        """
+        self.arrays = {}
+        self._finalizer()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def shareLightCurves(
+    lightCurves: Union[Dict[str, Any], LightCurveCollection]
+) -> SharedArrays:
+    """
+    Put light curves into shared memory. Light curves can be
+    a `utils.timeseries.collection.LightCurveCollection` or a dictionary
+    of targets and their light curves (*Pandas tables
+    from `utils.databases.lightcurves.fitsToPandas()`, dictionaries
+    of NumPy arrays and so on*), which is made into a collection first.
+    Workers get the collection back
+    with `utils.timeseries.sharing.attachLightCurves()`.
+
+    Example:
+
+    ``` py
+    import concurrent.futures
+    import numpy
+
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import sharing
+
+    def fluxMedian(handle, target):
+        lcs = sharing.attachLightCurves(handle)
+        return float(numpy.nanmedian(lcs.getTarget(target)["flux"]))
+
+    lcs = {
+        "TIC 266744225": lightcurves.fitsToPandas(
+            "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+            fitsType="tess"
+        )
+    }
+    with sharing.shareLightCurves(lcs) as shared:
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            medians = list(executor.map(
+                fluxMedian,
+                [shared.handle] * len(lcs),
+                lcs.keys()
+            ))
+    ```
+    """
+    if not isinstance(lightCurves, LightCurveCollection):
+        lightCurves = LightCurveCollection.fromLightCurves(
+            list(lightCurves.values()),
+            targets=list(lightCurves.keys())
+        )
+    return SharedArrays({
+        "time": lightCurves.time,
+        "flux": lightCurves.flux,
+        "fluxError": lightCurves.fluxError,
+        "offsets": lightCurves.offsets,
+        "targets": lightCurves.targets,
+        "sectors": lightCurves.sectors
+    })
+
+
+def attachLightCurves(handle: SharedArraysHandle) -> LightCurveCollection:
+    """
+    Get a collection of light curves shared
+    with `utils.timeseries.sharing.shareLightCurves()`. Its arrays are views
+    of the shared memory, so nothing is copied, and the collection should
+    only be read (*writing to it changes the light curves for everyone*).
+    """
+    arrays = handle.attach()
+    return LightCurveCollection(
+        arrays["time"],
+        arrays["flux"],
+        arrays["fluxError"],
+        arrays["offsets"],
+        arrays["targets"],
+        arrays["sectors"]
+    )
+
+
+def getAttachedBlocks() -> List[str]:
+    """
+    Names of shared memory blocks attached in this process.
+    """
+    return list(_attached.keys())
+
+
+def detachAll(names: Optional[List[str]] = None) -> None:
+    """
+    Detach shared memory blocks (*all of them or the ones
+    in `names`*) attached in this process, such as in a long-living
+    worker that is done with some blocks. Views that were already
+    taken stay valid, and a block is unmapped when the last of them
+    is gone. Blocks stay available to other processes until their owner
+    releases them.
+    """
+    for name in list(_attached.keys()) if names is None else names:
+        _detach(name)
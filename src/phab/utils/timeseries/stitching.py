@@ -0,0 +1,227 @@
+"""
+Stitching light curves of several sectors (*quarters, campaigns*) into one.
+"""
+
+import numpy
+import pandas
+import pathlib
+
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Any,
+    Union,
+    Dict,
+    List,
+    Sequence,
+    Literal
+)
+
+from ..databases import lightcurves
+from ..logs.log import logger
+
+if TYPE_CHECKING:
+    import pyarrow
+
+_stitchedColumns: List[str] = ["time", "flux", "fluxError"]
+
+
+def _prepareSector(lightCurve: Any) -> Dict[str, numpy.ndarray]:
+    sector: Dict[str, numpy.ndarray] = {
+        c: numpy.asarray(lightCurve[c]) for c in _stitchedColumns
+    }
+    if numpy.isnan(sector["time"]).any():
+        raise ValueError(
+            " ".join((
+                "Light curves with NaN times cannot be stitched,",
+                "drop those rows first"
+            ))
+        )
+    # sectors are sorted already in most cases, and then it is just a check
+    if numpy.any(sector["time"][1:] < sector["time"][:-1]):
+        order = numpy.argsort(sector["time"], kind="stable")
+        sector = {c: v[order] for c, v in sector.items()}
+    return sector
+
+
+def stitchLightCurves(
+    lightCurves: Sequence[Any],
+    normalization: Optional[Literal["median", "mean"]] = "median",
+    chunkSize: int = 1000000,
+    outputDirectoryPath: Optional[Union[str, pathlib.Path]] = None,
+    output: Literal["pandas", "numpy", "arrow"] = "pandas"
+) -> Union[pandas.DataFrame, Dict[str, numpy.ndarray], "pyarrow.Table"]:
+    """
+    Stitch light curves of several sectors into one light curve sorted
+    by time. Every light curve can be anything that gives `time`, `flux`
+    and `fluxError` columns by name: a Pandas table
+    from `utils.databases.lightcurves.fitsToPandas()`, a dictionary
+    of (*possibly memory-mapped*) NumPy arrays, a PyArrow table and so on.
+    Times must not be NaN.
+
+    Before stitching, fluxes and their errors of every sector are divided
+    by the median (*or mean*) flux of that sector, unless `normalization`
+    is `None`.
+
+    Sectors are merged with a k-way merge in chunks of `chunkSize` rows
+    per sector, and rows are written directly to the pre-allocated
+    resulting arrays, so there are no concatenated intermediate copies
+    of all the sectors. Sectors that do not overlap in time (*which is
+    the usual case*) are simply copied one after another, and overlapping
+    ones (*for example, 20-second and 2-minute cadence light curves of the
+    same sector*) are interleaved. If `outputDirectoryPath` is set, then
+    the resulting arrays are memory-mapped `.npy` files in that directory,
+    so together with memory-mapped sectors the light curve never needs to
+    fit in memory. In that case it makes sense to set `output` to `numpy`,
+    as Pandas and PyArrow tables are created in memory.
+
+    Example:
+
+    ``` py
+    from phab.utils.databases import lightcurves
+    from phab.utils.timeseries import stitching
+
+    sectors = [
+        lightcurves.fitsToPandas(
+            f,
+            fitsType="tess",
+            qualityBitmask="default"
+        )
+        for f in [
+            "./data/tess2019006130736-s0007-0000000266744225-0131-s_lc.fits",
+            "/path/to/some/other/sector_lc.fits"
+        ]
+    ]
+
+    lc = stitching.stitchLightCurves(sectors, normalization="median")
+
+    #print(lc)
+    ```
+    """
+    if chunkSize < 1:
+        raise ValueError("Chunk size needs to be a positive number")
+
+    sectors: List[Dict[str, numpy.ndarray]] = []
+    factors: List[Any] = []
+    for lightCurve in lightCurves:
+        sector = _prepareSector(lightCurve)
+        if len(sector["time"]) == 0:
+            continue
+        factor: Any = 1
+        if normalization is not None:
+            if normalization == "median":
+                factor = numpy.nanmedian(sector["flux"])
+            elif normalization == "mean":
+                factor = numpy.nanmean(sector["flux"])
+            else:
+                raise ValueError(
+                    f"Unknown normalization method: {normalization}"
+                )
+            # keep the fluxes type, otherwise float32 becomes float64
+            factor = sector["flux"].dtype.type(factor)
+        sectors.append(sector)
+        factors.append(factor)
+
+    # sectors go in the order of their start times, which also
+    # keeps rows with equal times in that order
+    sectorsOrder = sorted(
+        range(len(sectors)),
+        key=lambda s: sectors[s]["time"][0]
+    )
+    sectors = [sectors[s] for s in sectorsOrder]
+    factors = [factors[s] for s in sectorsOrder]
+
+    totalLength: int = sum(len(s["time"]) for s in sectors)
+    logger.debug(
+        f"Stitching {len(sectors)} sectors with {totalLength} rows in total"
+    )
+
+    outputDirectory: Optional[pathlib.Path] = None
+    if outputDirectoryPath is not None:
+        outputDirectory = pathlib.Path(outputDirectoryPath)
+        outputDirectory.mkdir(parents=True, exist_ok=True)
+    stitched: Dict[str, numpy.ndarray] = {}
+    for c in _stitchedColumns:
+        dtype = (
+            numpy.result_type(*[s[c].dtype for s in sectors])
+            if sectors
+            else (numpy.float64 if c == "time" else numpy.float32)
+        )
+        if outputDirectory is not None:
+            stitched[c] = numpy.lib.format.open_memmap(
+                outputDirectory / f"{c}.npy",
+                mode="w+",
+                dtype=dtype,
+                shape=(totalLength,)
+            )
+        else:
+            stitched[c] = numpy.empty(totalLength, dtype=dtype)
+
+    cursors: List[int] = [0] * len(sectors)
+
+    def chunkEnd(s: int) -> Any:
+        return sectors[s]["time"][
+            min(cursors[s] + chunkSize, len(sectors[s]["time"])) - 1
+        ]
+
+    active: List[int] = []
+    nextSector: int = 0
+    position: int = 0
+    while position < totalLength:
+        if not active:
+            active.append(nextSector)
+            nextSector += 1
+
+        # everything up to the end of the shortest chunk among the active
+        # sectors can be written out, as nothing in the remaining rows
+        # of the active sectors can go before that, and sectors that start
+        # before that boundary become active too
+        boundary = min(chunkEnd(s) for s in active)
+        while (
+            nextSector < len(sectors)
+            and
+            sectors[nextSector]["time"][0] <= boundary
+        ):
+            active.append(nextSector)
+            boundary = min(boundary, chunkEnd(nextSector))
+            nextSector += 1
+
+        pieces: List[Dict[str, numpy.ndarray]] = []
+        for s in active:
+            cursor = cursors[s]
+            window = sectors[s]["time"][cursor:cursor + chunkSize]
+            end = cursor + int(
+                numpy.searchsorted(window, boundary, side="right")
+            )
+            if end == cursor:
+                continue
+            piece = {c: sectors[s][c][cursor:end] for c in _stitchedColumns}
+            if normalization is not None:
+                piece["flux"] = piece["flux"] / factors[s]
+                piece["fluxError"] = piece["fluxError"] / factors[s]
+            pieces.append(piece)
+            cursors[s] = end
+        active = [s for s in active if cursors[s] < len(sectors[s]["time"])]
+
+        piecesLength = sum(len(p["time"]) for p in pieces)
+        if len(pieces) == 1:
+            for c in _stitchedColumns:
+                stitched[c][position:position + piecesLength] = pieces[0][c]
+        else:
+            order = numpy.argsort(
+                numpy.concatenate([p["time"] for p in pieces]),
+                kind="stable"
+            )
+            for c in _stitchedColumns:
+                stitched[c][position:position + piecesLength] = \
+                    numpy.concatenate([p[c] for p in pieces])[order]
+        position += piecesLength
+
+    if outputDirectory is not None:
+        for c in _stitchedColumns:
+            stitched[c].flush()  # type: ignore[attr-defined]
+
+    lc = lightcurves.fluxColumnsToOutput(stitched, output)
+    if output == "pandas":
+        lightcurves.validateLightCurveFluxTable(lc)
+    return lc